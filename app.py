@@ -2,19 +2,25 @@ from flask_login import LoginManager, login_user, logout_user, login_required, c
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import func, or_
 from sqlalchemy.exc import OperationalError, DisconnectionError
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, session, g,flash
+from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, session, g,flash, Response, stream_with_context, make_response
 from flask_cors import CORS
 import jwt
 from functools import wraps
 from datetime import datetime, timedelta
+import multiprocessing
 import time
 from config import Config
-from models import db, User, Progress, UserSurvey, Poem, Syllabus, VocabularyWord
-from services.syllabus import load_day_statements
-from services.stt import transcribe_audio
-from services.tts import generate_tts
+from models import db, User, Progress, UserSurvey, Syllabus, VocabularyWord, day_number
+from services.syllabus import load_day_statements, get_syllabus_index
+from services.stt_pool import stt_pool, QueueFull
+from services.whisper_registry import preload_models
+from services.tts import generate_tts, cleanup_tts, TTS_HTTP_MAX_AGE
+from services import daily_content, leaderboard, poem_catalog, question_bank, static_assets
+from services import dashboard as dashboard_view
+from services.credit_ledger import apply_client_batch, add_credits as ledger_add_credits, CreditError
+from services.progress import get_current_progress, get_current_day, get_progress_snapshot
 from flask import session
-import os, random, requests
+import os, random, requests, uuid
 from datetime import datetime, timedelta, timezone
 from werkzeug.security import generate_password_hash
 import psycopg2
@@ -28,7 +34,7 @@ from sqlalchemy import create_engine
 from services.sync import run_full_sync
 import tempfile
 from core.guide_helper import BoonyGuide
-from core.openai_helper import call_openai, ENGLISH_TUTOR_PROMPTS,client
+from core.openai_helper import call_openai, cached_completion, llm_cache, ENGLISH_TUTOR_PROMPTS,client
 from services.pronunciation import detect_mispronounced_words
 from flask import request, redirect, url_for
 from flask import send_from_directory
@@ -58,15 +64,13 @@ import tempfile
 # ----------------------
 app = Flask(__name__, instance_relative_config=True, static_url_path="/static")
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024
-# Disable static file caching during development
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-app.jinja_env.cache = {}
 
 # allowed audio extensions (हम इन्हें चेक करेंगे)
 ALLOWED_AUDIO_EXTENSIONS = {"wav", "mp3", "m4a","webm"}
 app.config.from_object(Config)
 app.secret_key = "super-secret-key"   # change in production
+# Template reload / bytecode cache / static fingerprints per APP_PROFILE
+static_assets.init_app(app)
 
 # Enable CORS for mobile app
 CORS(app, origins=["*"])
@@ -108,21 +112,18 @@ public_api = Blueprint('public_api', __name__)
 def public_analyze_speech():
     """
     Enhanced speech analysis endpoint:
-    - Converts audio to 16kHz mono WAV
+    - Decodes the upload in memory to 16kHz mono float32
     - Transcribes speech via STT
-    - Computes word-level fuzzy accuracy + sentence similarity
+    - Aligns spoken vs expected words once and scores them at phoneme level
     - Returns mispronounced words and user-friendly feedback
     """
-    import os, tempfile, traceback
-    from difflib import SequenceMatcher
-    try:
-        from pydub import AudioSegment
-        from rapidfuzz import fuzz
-    except ImportError:
-        return jsonify({"ok": False, "error_code": "DEPENDENCY_MISSING",
-                        "message": "pydub and rapidfuzz are required"}), 500
+    import traceback
+    from services.audio_ingest import decode_audio_bytes, AudioDecodeError
+    from services.pronunciation import score_pronunciation
 
     try:
+        request_started = time.perf_counter()
+
         # 1️⃣ Request validation
         audio_file = request.files.get("audio")
         if not audio_file:
@@ -140,82 +141,55 @@ def public_analyze_speech():
             return jsonify({"ok": False, "error_code": "BAD_FORMAT",
                             "message": "Allowed formats: wav, mp3, m4a"}), 400
 
-        # 2️⃣ Save temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}") as tf:
-            audio_path = tf.name
-            audio_file.save(audio_path)
-
-        # 3️⃣ Convert to 16kHz mono WAV
-        converted_path = audio_path.rsplit(".", 1)[0] + "_16k.wav"
+        # 2️⃣ Decode upload bytes straight to 16kHz mono (ffmpeg temp files only as a fallback)
+        stage_started = time.perf_counter()
+        audio_bytes = audio_file.read()
+        timings = {"read_ms": round((time.perf_counter() - stage_started) * 1000, 1)}
         try:
-            audio = AudioSegment.from_file(audio_path)
-            audio = audio.set_channels(1).set_frame_rate(16000)
-            audio.export(converted_path, format="wav")
-        except Exception as e:
-            converted_path = audio_path  # fallback to original
-        finally:
-            try: os.remove(audio_path)
-            except: pass
-
-        # 4️⃣ Transcribe
-        stt_func = None
+            audio, decode_info = decode_audio_bytes(audio_bytes, ext)
+        except AudioDecodeError as e:
+            return jsonify({"ok": False, "error_code": "BAD_AUDIO",
+                            "message": f"Could not decode audio: {e}"}), 400
+        timings.update(decode_info["timings"])
+
+        # 3️⃣ Transcribe (in the STT worker pool, off the request thread's CPU)
+        stage_started = time.perf_counter()
         try:
-            from services.stt import transcribe_audio_file
-            stt_func = transcribe_audio_file
-        except ImportError:
-            try:
-                from services.stt import transcribe_audio
-                stt_func = transcribe_audio
-            except ImportError:
-                return jsonify({"ok": False, "error_code": "NO_STT",
-                                "message": "STT function not configured"}), 500
-
-        try:
-            user_text = stt_func(converted_path) or ""
+            user_text = stt_pool.transcribe(audio) or ""
+        except QueueFull:
+            return jsonify({"ok": False, "error_code": "STT_BUSY",
+                            "message": "Speech service is busy. Please try again in a moment."}), 503, {"Retry-After": "5"}
+        except TimeoutError:
+            return jsonify({"ok": False, "error_code": "STT_TIMEOUT",
+                            "message": "Transcription took too long. Please try again."}), 504
         except Exception as e:
             tb = traceback.format_exc()
             return jsonify({"ok": False, "error_code": "TRANSCRIPTION_FAILED",
                             "message": str(e), "trace": tb}), 500
-        finally:
-            try: os.remove(converted_path)
-            except: pass
+        timings["transcribe_ms"] = round((time.perf_counter() - stage_started) * 1000, 1)
+        print(f"⏱️ analyze_speech [{decode_info['decoder']}, {decode_info['duration_s']}s audio]: {timings}")
 
         if not user_text.strip():
             return jsonify({"ok": False, "error_code": "NO_SPEECH",
                             "message": "No speech detected. Try again."}), 400
 
-        # 5️⃣ Pronunciation analysis
+        # 4️⃣ Pronunciation analysis (one alignment feeds accuracy, mismatches and corrections)
+        stage_started = time.perf_counter()
         try:
-            from services.pronunciation import detect_mispronounced_words
-            pronunciation_result = detect_mispronounced_words(user_text, expected_text)
-        except Exception:
-            pronunciation_result = {"status": "unknown", "mispronounced": []}
-
-        # 6️⃣ Word-level fuzzy accuracy
-        def _clean_words(s):
-            return [w.strip(".,!?;:").lower() for w in s.strip().split() if w.strip()]
-
-        expected_words = _clean_words(expected_text)
-        user_words = _clean_words(user_text)
-
-        total = len(expected_words) or 1
-        correct = 0
-        mismatches = []
-
-        for i, w in enumerate(expected_words):
-            if i < len(user_words):
-                sim = fuzz.ratio(w, user_words[i]) / 100  # fuzzy similarity
-                if sim >= 0.7:
-                    correct += 1
-                else:
-                    mismatches.append({"expected": w, "spoken": user_words[i], "similarity": round(sim,2)})
-            else:
-                mismatches.append({"expected": w, "spoken": "", "similarity": 0.0})
+            scored = score_pronunciation(user_text, expected_text)
+        except Exception as e:
+            tb = traceback.format_exc()
+            return jsonify({"ok": False, "error_code": "SCORING_FAILED",
+                            "message": str(e), "trace": tb}), 500
+        timings["scoring_ms"] = round((time.perf_counter() - stage_started) * 1000, 1)
 
-        word_accuracy = round((correct / total) * 100, 1)
-        sentence_similarity = round(SequenceMatcher(None, expected_text.lower(), user_text.lower()).ratio() * 100, 1)
+        # 5️⃣ Word-level accuracy
+        mismatches = scored.mismatches()
+        correct = scored.correct_words
+        word_accuracy = round(scored.word_accuracy, 1)
+        sentence_similarity = round(scored.sentence_similarity * 100, 1)
 
-        # 7️⃣ Feedback
+        # 6️⃣ Feedback
         if word_accuracy >= 90:
             feedback = "Excellent pronunciation! 👏"
         elif word_accuracy >= 75:
@@ -225,32 +199,25 @@ def public_analyze_speech():
         else:
             feedback = "Let's slow down and try again. Repeat each word clearly."
 
-        # 8️⃣ Return result
-        from services.pronunciation import get_pronunciation_corrections, get_pronunciation_audio_text
-
-        corrections = get_pronunciation_corrections(user_text, expected_text)
+        # 7️⃣ Return result
+        corrections = scored.corrections()
 
-        # Add audio tips
-        for c in corrections:
-            expected_word = c.get("expected_word", "")
-            if expected_word not in ["[missing]", "[none]"]:
-                c["audio_tip"] = get_pronunciation_audio_text(expected_word)
-            else:
-                c["audio_tip"] = ""
+        timings["total_ms"] = round((time.perf_counter() - request_started) * 1000, 1)
 
         return jsonify({
             "ok": True,
             "transcription": user_text,
             "expected_text": expected_text,
+            "timings": timings,
             "analysis": {
                 "word_accuracy": word_accuracy,
                 "sentence_similarity": sentence_similarity,
-                "total_words": len(expected_words),
+                "total_words": len(scored.expected_words),
                 "correct_words": correct,
-                "incorrect_words": len(expected_words) - correct,
+                "incorrect_words": len(scored.expected_words) - correct,
                 "mismatches": mismatches,
-                "pronunciation_status": pronunciation_result.get("status"),
-                "pronunciation_mispronounced": pronunciation_result.get("mispronounced", []),
+                "pronunciation_status": scored.status,
+                "pronunciation_mispronounced": scored.mispronounced,
                 "feedback": feedback
             },
             "corrections": corrections
@@ -276,48 +243,21 @@ def analyze_mispronounced_words():
         if not transcribed_text or not expected_text:
             return jsonify({"ok": False, "error": "Both transcribed_text and expected_text are required"}), 400
 
-        # Import pronunciation analysis functions
-        from services.pronunciation import (
-            detect_mispronounced_words,
-            get_pronunciation_corrections,
-            get_pronunciation_audio_text  # <-- new helper
-        )
-
-        # Analyze mispronounced words
-        pronunciation_result = detect_mispronounced_words(transcribed_text, expected_text)
+        from services.pronunciation import score_pronunciation
 
-        # Get detailed corrections
-        corrections = get_pronunciation_corrections(transcribed_text, expected_text)
-
-        # Add audio_tip for each correction
-        for c in corrections:
-            expected_word = c.get("expected_word", "")
-            if expected_word not in ["[missing]", "[none]"]:
-                c["audio_tip"] = get_pronunciation_audio_text(expected_word)
-            else:
-                c["audio_tip"] = ""
-
-        # Word-level accuracy
-        expected_words = expected_text.lower().split()
-        transcribed_words = transcribed_text.lower().split()
-        correct_words = 0
-        total_words = len(expected_words)
-
-        import difflib
-        for i, expected_word in enumerate(expected_words):
-            if i < len(transcribed_words):
-                similarity = difflib.SequenceMatcher(None, expected_word, transcribed_words[i]).ratio()
-                if similarity >= 0.8:
-                    correct_words += 1
-
-        word_accuracy = (correct_words / total_words * 100) if total_words > 0 else 0
-        sentence_similarity = difflib.SequenceMatcher(None, expected_text.lower(), transcribed_text.lower()).ratio() * 100
+        # Align once; status, accuracy and corrections all come from the same result
+        scored = score_pronunciation(transcribed_text, expected_text)
+        corrections = scored.corrections()
+        correct_words = scored.correct_words
+        total_words = len(scored.expected_words)
+        word_accuracy = scored.word_accuracy
+        sentence_similarity = scored.sentence_similarity * 100
 
         return jsonify({
             "ok": True,
             "analysis": {
-                "status": pronunciation_result.get("status", "unknown"),
-                "mispronounced_words": pronunciation_result.get("mispronounced", []),
+                "status": scored.status,
+                "mispronounced_words": scored.mispronounced,
                 "word_accuracy": round(word_accuracy, 2),
                 "sentence_similarity": round(sentence_similarity, 2),
                 "total_words": total_words,
@@ -394,15 +334,27 @@ def handle_database_errors(error):
             return redirect(url_for('login', error='connection_lost'))
     return str(error), 500
 
-# Safety net for first boot
-with app.app_context():
-    db.create_all()
-    # Try sync if using SQLite last time and Supabase is now available
-    try:
-        # run_full_sync()  # Temporarily disabled to debug KeyError
-        print("✅ Sync temporarily disabled for debugging")
-    except Exception as e:
-        print("⚠️ Sync skipped:", e)
+# Safety net for first boot. STT pool workers (services/stt_pool.py) are spawned
+# processes that re-import this module; they must not repeat any of this.
+if multiprocessing.parent_process() is None:
+    with app.app_context():
+        db.create_all()
+        # WHISPER_PRELOAD=base loads the shared model now instead of on the first request
+        preload_models()
+        # Trim the TTS cache and legacy tts_<uuid> files without delaying startup
+        import threading
+        threading.Thread(target=cleanup_tts, kwargs={"older_than_seconds": 3600}, daemon=True).start()
+        # Fetch today's thought in the background so the first dashboard already has it
+        daily_content.thought_of_day.refresh_async()
+        # prod: compile every template now rather than on each page's first view
+        if app.config.get("PRECOMPILE_TEMPLATES"):
+            static_assets.precompile_templates(app)
+        # Try sync if using SQLite last time and Supabase is now available
+        try:
+            # run_full_sync()  # Temporarily disabled to debug KeyError
+            print("✅ Sync temporarily disabled for debugging")
+        except Exception as e:
+            print("⚠️ Sync skipped:", e)
 
 # ----------------------
 # Register Routes
@@ -456,59 +408,18 @@ def api_login_required(f):
 # ----------------------
 def get_thought_of_day() -> str:
     """
-    Try ZenQuotes 'today'; fallback to local list.
+    ZenQuotes 'today', fetched once per UTC day in the background and kept
+    on disk; local list until it arrives. Never waits on the network.
     """
-    try:
-        res = requests.get("https://zenquotes.io/api/today", timeout=4)
-        data = res.json()
-        if isinstance(data, list) and data:
-            return f"{data[0].get('q','Keep learning, keep growing.')} — {data[0].get('a','')}".strip()
-    except Exception:
-        pass
-    fallback = [
-        "Keep learning, keep growing.",
-        "Small steps daily → Big progress tomorrow.",
-        "Practice makes you confident.",
-        "Consistency > Intensity.",
-        "You don’t have to be perfect to start."
-    ]
-    return random.choice(fallback)
-
-def _star_between(start_dt: datetime, end_dt: datetime) -> dict:
-    """
-    Top performer name and user_id between start_dt (inclusive) and end_dt (exclusive),
-    by sum(listen+speak+vocabulary). Requires Progress.updated_at to be present.
-    """
-    q = (
-        db.session.query(
-            User.full_name,
-            User.user_id,
-            func.coalesce(func.sum(Progress.listen + Progress.speak + Progress.vocabulary), 0).label("total")
-        )
-        .join(Progress, Progress.user_id == User.user_id)  # ✅ FIXED
-        .filter(Progress.updated_at >= start_dt, Progress.updated_at < end_dt)
-        .group_by(User.user_id)
-        .order_by(func.sum(Progress.listen + Progress.speak + Progress.vocabulary).desc())
-        .limit(1)
-    ).first()
-    if q and getattr(q, "total", 0) and q.total > 0:
-        return {"name": q.full_name, "user_id": q.user_id}
-    else:
-        return {"name": "—", "user_id": None}
+    return daily_content.thought_of_day.get()
 
 def get_star_of_day() -> dict:
-    today = datetime.now(timezone.utc).date()
-    start_dt = datetime.combine(today, datetime.min.time())
-    end_dt = start_dt + timedelta(days=1)
-    return _star_between(start_dt, end_dt)
+    """Top earner today (UTC), read from the materialized leaderboard (cached for DASHBOARD_STARS_TTL)."""
+    return dashboard_view.stars()[0]["day"]
 
 def get_star_of_week() -> dict:
-    today = datetime.now(timezone.utc).date()
-    # Monday as start-of-week
-    start_of_week = today - timedelta(days=today.weekday())
-    start_dt = datetime.combine(start_of_week, datetime.min.time())
-    end_dt = start_dt + timedelta(days=7)
-    return _star_between(start_dt, end_dt)
+    """Top earner this week (Monday start, UTC), read from the materialized leaderboard (cached for DASHBOARD_STARS_TTL)."""
+    return dashboard_view.stars()[0]["week"]
 
 def generate_listen_test_questions(statements, day, question_type="fill_blanks_mcq"):
     """Generate 5 questions based on listen statements using OpenAI"""
@@ -814,16 +725,18 @@ def tts_route():
             }), 500
             
         print(f"✅ TTS Success: Audio file generated at {file_path}")
-        
-        # optional: cleanup old files in background
-        from services.tts import cleanup_tts
-        cleanup_tts(older_than_seconds=3600)  # 1 hour
 
-        # return appropriate mimetype based on file extension
-        if file_path.endswith('.wav'):
-            return send_file(file_path, mimetype="audio/wav")
-        else:
-            return send_file(file_path, mimetype="audio/mpeg")
+        # Cache files are content-addressed, so the filename doubles as the ETag
+        # and a repeat request with If-None-Match gets a 304 without any body
+        response = send_file(
+            file_path,
+            mimetype="audio/wav" if file_path.endswith('.wav') else "audio/mpeg",
+            etag=os.path.splitext(os.path.basename(file_path))[0],
+            conditional=True,
+            max_age=TTS_HTTP_MAX_AGE,
+        )
+        response.cache_control.public = True
+        return response
         
     except RuntimeError as e:
         error_msg = str(e)
@@ -1553,9 +1466,13 @@ def listen_test_page(day):
         flash("इस day के लिए कोई statements नहीं मिले!")
         return redirect(url_for("listen_page", day=day))
     
-    # Use all statements from the day for test (randomly choose any 5 from all 20 statements)
-    # Generate 5 fill-in-the-blanks questions using AI from all day statements
-    questions = generate_listen_test_questions(all_statements, day, question_type="fill_blanks_mcq")
+    # Sample 5 from the day's precomputed question bank; top the bank up off the request path
+    questions = question_bank.sample_questions(day)
+    if question_bank.needs_refill(day):
+        question_bank.refill_in_background(app, day, all_statements)
+    if questions is None:
+        # Bank not built for this day yet: generate live (same as before the bank existed)
+        questions = generate_listen_test_questions(all_statements, day, question_type="fill_blanks_mcq")
     
     return render_template(
         "listen_test.html",
@@ -1585,33 +1502,39 @@ def submit_listen_test():
         # Regenerate questions to get correct answers from all day statements
         questions = generate_listen_test_questions(all_statements, day, question_type="fill_blanks_mcq")
     
-    # Calculate score based on question type
-    score = 0
-    total_questions = len(questions)
+    # Bank questions are graded against the stored answers, not the echoed correct_answer
+    graded = question_bank.grade(questions, answers)
     
-    for i, question in enumerate(questions):
-        if i < len(answers):
-            user_answer = answers[i]
+    if graded is not None:
+        score, total_questions = graded
+    else:
+        # Calculate score based on question type
+        score = 0
+        total_questions = len(questions)
+        
+        for i, question in enumerate(questions):
+            if i < len(answers):
+                user_answer = answers[i]
             
-            if question.get("type") == "fill_blanks_mcq":
-                # For fill-in-the-blank MCQ, check if user selected correct option
-                correct_answer = question.get("correct_answer", 0)
-                if user_answer == correct_answer:
-                    score += 1
-            elif question.get("type") == "fill_blanks":
-                # For fill-in-the-blanks, check if user answer matches any correct answer (case-insensitive)
-                correct_answers = question.get("correct_answers", [])
-                user_answer_clean = str(user_answer).strip().lower()
+                if question.get("type") == "fill_blanks_mcq":
+                    # For fill-in-the-blank MCQ, check if user selected correct option
+                    correct_answer = question.get("correct_answer", 0)
+                    if user_answer == correct_answer:
+                        score += 1
+                elif question.get("type") == "fill_blanks":
+                    # For fill-in-the-blanks, check if user answer matches any correct answer (case-insensitive)
+                    correct_answers = question.get("correct_answers", [])
+                    user_answer_clean = str(user_answer).strip().lower()
                 
-                # Check if user answer matches any of the correct answers
-                is_correct = any(user_answer_clean == correct.strip().lower() for correct in correct_answers)
-                if is_correct:
-                    score += 1
-            else:
-                # For MCQ questions (fallback)
-                correct_answer = question.get("correct_answer", 0)
-                if user_answer == correct_answer:
-                    score += 1
+                    # Check if user answer matches any of the correct answers
+                    is_correct = any(user_answer_clean == correct.strip().lower() for correct in correct_answers)
+                    if is_correct:
+                        score += 1
+                else:
+                    # For MCQ questions (fallback)
+                    correct_answer = question.get("correct_answer", 0)
+                    if user_answer == correct_answer:
+                        score += 1
     
     percentage = (score / total_questions) * 100 if total_questions > 0 else 0
     
@@ -1639,6 +1562,11 @@ def submit_listen_test():
 # ----------------------
 # APIs
 # ----------------------
+def _sse(event, payload):
+    """One server-sent event frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
 @app.route("/api/upload-audio", methods=["POST"])
 @login_required
 def api_upload_audio():
@@ -1646,11 +1574,15 @@ def api_upload_audio():
     if not f:
         return jsonify({"ok": False, "error": "No file"}), 400
 
-    out_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{datetime.now(timezone.utc).timestamp()}_{f.filename}")
+    out_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{datetime.now(timezone.utc).timestamp()}_{secure_filename(f.filename or 'audio.webm')}")
     f.save(out_path)
     try:
-        text = transcribe_audio(out_path)
+        text = stt_pool.transcribe(out_path)
         return jsonify({"ok": True, "text": text})
+    except QueueFull:
+        return jsonify({"ok": False, "error": "Speech service busy, retry shortly"}), 503, {"Retry-After": "5"}
+    except TimeoutError:
+        return jsonify({"ok": False, "error": "Transcription timed out"}), 504
     finally:
         try:
             os.remove(out_path)
@@ -1658,6 +1590,96 @@ def api_upload_audio():
             pass
 
 
+@app.route("/api/stt/jobs", methods=["POST"])
+@login_required
+def api_stt_submit():
+    """Queue an uploaded clip for transcription; poll /api/stt/jobs/<job_id> for the text"""
+    f = request.files.get("audio") or request.files.get("file")
+    if not f or not f.filename:
+        return jsonify({"ok": False, "error": "No file"}), 400
+
+    ext = f.filename.rsplit(".", 1)[-1].lower() if "." in f.filename else ""
+    if ext not in ALLOWED_AUDIO_EXTENSIONS:
+        return jsonify({"ok": False, "error": "Invalid file type"}), 400
+
+    fd, out_path = tempfile.mkstemp(suffix=f".{ext}")
+    os.close(fd)
+    f.save(out_path)
+    try:
+        job_id = stt_pool.submit(out_path, delete_after=True)
+    except QueueFull:
+        os.remove(out_path)
+        return jsonify({"ok": False, "error": "Speech service busy, retry shortly"}), 503, {"Retry-After": "5"}
+
+    return jsonify({
+        "ok": True,
+        "job_id": job_id,
+        "status": "pending",
+        "poll_url": url_for("api_stt_poll", job_id=job_id)
+    }), 202
+
+
+@app.route("/api/stt/jobs/<job_id>")
+@login_required
+def api_stt_poll(job_id):
+    """Job status; ?wait=N long-polls up to N seconds (max 25) for the result"""
+    try:
+        wait = min(max(float(request.args.get("wait", 0)), 0), 25)
+    except ValueError:
+        wait = 0
+    result = stt_pool.poll(job_id, wait=wait)
+    if result is None:
+        return jsonify({"ok": False, "error": "Unknown or expired job"}), 404
+    return jsonify({"ok": result["status"] != "error", **result})
+
+
+@app.route("/api/transcribe/stream", methods=["POST"])
+@login_required
+def api_transcribe_stream():
+    """
+    Server-sent events: one 'segment' event (with word timestamps) per decoded
+    segment, then a 'done' event carrying the joined text.
+    """
+    f = request.files.get("audio") or request.files.get("file")
+    if not f or not f.filename:
+        return jsonify({"ok": False, "error": "No file"}), 400
+
+    ext = f.filename.rsplit(".", 1)[-1].lower() if "." in f.filename else ""
+    if ext not in ALLOWED_AUDIO_EXTENSIONS:
+        return jsonify({"ok": False, "error": "Invalid file type"}), 400
+
+    fd, audio_path = tempfile.mkstemp(suffix=f".{ext}")
+    os.close(fd)
+    f.save(audio_path)
+    try:
+        # Decoded in the STT worker pool; the pool removes the file when done
+        items = stt_pool.stream(audio_path, delete_after=True)
+    except QueueFull:
+        os.remove(audio_path)
+        return jsonify({"ok": False, "error": "Speech service busy, retry shortly"}), 503, {"Retry-After": "5"}
+
+    def generate():
+        texts = []
+        try:
+            for item in items:
+                if item["type"] == "info":
+                    yield _sse("info", item)
+                    continue
+                if item["text"]:
+                    texts.append(item["text"])
+                yield _sse("segment", item)
+            yield _sse("done", {"ok": True, "text": " ".join(texts).strip() or "[No speech detected]"})
+        except Exception as e:
+            print(f"❌ Streaming STT error: {e}")
+            yield _sse("error", {"ok": False, "error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/progress", methods=["POST"])
 @login_required
 def api_progress():
@@ -1671,24 +1693,15 @@ def api_progress():
     last_stage = data.get("last_stage", "")
     last_statement = int(data.get("last_statement", 0))
 
-    prog = Progress.query.filter_by(user_id=str(current_user.user_id), day=day).first()
-    if not prog:
-        prog = Progress(user_id=str(current_user.user_id), day=day)
-        db.session.add(prog)
-
-    if activity == "listen":
-        prog.listen = (prog.listen or 0) + value
-    elif activity == "speak":
-        prog.speak = (prog.speak or 0) + value
-    elif activity == "vocabulary":
-        prog.vocabulary = (prog.vocabulary or 0) + value
-
-    if last_stage:
-        prog.last_stage = last_stage
-    prog.last_statement = last_statement
-    prog.updated_at = datetime.now(timezone.utc)
-
-    db.session.commit()
+    # Only these activities earn credits here; anything else just records the position
+    credited = activity in ("listen", "speak", "vocabulary")
+    totals = ledger_add_credits(
+        current_user.user_id, day,
+        activity if credited else None,
+        value if credited else 0,
+        last_stage=last_stage or None,
+        last_statement=last_statement,
+    )
     
     # Generate congratulatory message for progress
     guide = BoonyGuide()
@@ -1701,11 +1714,11 @@ def api_progress():
     
     congratulations = None
     if value > 0:  # Only congratulate on positive progress
-        if activity == "listen" and (prog.listen or 0) >= 10:
+        if activity == "listen" and totals["listen"] >= 10:
             congratulations = guide.get_congratulatory_message("listen_complete", user_context)
-        elif activity == "speak" and (prog.speak or 0) >= 10:
+        elif activity == "speak" and totals["speak"] >= 10:
             congratulations = guide.get_congratulatory_message("speak_complete", user_context)
-        elif activity == "vocabulary" and (prog.vocabulary or 0) >= 10:
+        elif activity == "vocabulary" and totals["vocabulary"] >= 10:
             congratulations = guide.get_congratulatory_message("vocab_complete", user_context)
         else:
             congratulations = guide.get_congratulatory_message("progress_made", user_context)
@@ -1723,18 +1736,50 @@ def update_credit():
     value = int(data.get("value", 1))
     statement_index = int(data.get("statement_index", 0))
 
-    prog = Progress.query.filter_by(user_id=str(current_user.user_id), day=day).first()
-    if not prog:
-        prog = Progress(user_id=str(current_user.user_id), day=day)
-        db.session.add(prog)
+    totals = ledger_add_credits(current_user.user_id, day, "listen", value,
+                                last_stage="Listen", last_statement=statement_index)
+    return jsonify({"ok": True, "listen": totals["listen"]})
 
-    prog.listen = (prog.listen or 0) + value
-    prog.last_stage = "Listen"
-    prog.last_statement = statement_index
-    prog.updated_at = datetime.now(timezone.utc)
+@app.route("/api/credits/batch", methods=["POST"])
+@login_required
+def credits_batch():
+    """
+    Buffered credit events from the listen/speak pages:
+    {"events": [{id, day, activity, delta, statement_index, client_ts}, ...]}.
+    Applied in one transaction; ids already seen are skipped, invalid events
+    are listed under "rejected" and the rest still apply.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        result = apply_client_batch(current_user.user_id, data.get("events") or [])
+    except CreditError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Credit batch failed: {e}")
+        return jsonify({"ok": False, "error": "Could not save credits"}), 500
+    return jsonify({"ok": True, **result})
 
-    db.session.commit()
-    return jsonify({"ok": True, "listen": prog.listen})
+@app.route("/api/leaderboard", methods=["GET"])
+@login_required
+def api_leaderboard():
+    """Top-N earners for today or this week: ?period=day|week&limit=10"""
+    period = request.args.get("period", "day")
+    if period not in leaderboard.PERIODS:
+        return jsonify({"ok": False, "error": "period must be 'day' or 'week'"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), 50))
+    except (TypeError, ValueError):
+        limit = 10
+    leaders = leaderboard.top(period, limit)
+    for row in leaders:
+        row["user_id"] = str(row["user_id"])
+        row["is_me"] = row["user_id"] == str(current_user.user_id)
+    return jsonify({
+        "ok": True,
+        "period": period,
+        "period_start": leaderboard.period_start(period).isoformat(),
+        "leaders": leaders,
+    })
 
 @app.route("/forgot-password", methods=["GET", "POST"])
 def forgot_password():
@@ -1838,19 +1883,13 @@ def api_update_progress():
     day = data.get("day")
     activity = data.get("activity")
 
-    prog = Progress.query.filter_by(user_id=current_user.user_id, day=day).first()
-    if not prog:
-        prog = Progress(user_id=current_user.user_id, day=day)
-        db.session.add(prog)
-
-    if activity == "listen":
-        prog.listen = (prog.listen or 0) + 1   # ✅ increment
-    elif activity == "speak":
-        prog.speak = (prog.speak or 0) + 1
-    elif activity == "vocabulary":
-        prog.vocabulary = (prog.vocabulary or 0) + 1
+    if activity not in ("listen", "speak", "vocabulary"):
+        return jsonify({"status": "ok"})
 
-    db.session.commit()
+    try:
+        ledger_add_credits(current_user.user_id, day, activity, 1)   # ✅ increment
+    except CreditError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
     return jsonify({"status": "ok"})
 
 
@@ -1882,140 +1921,17 @@ from sqlalchemy import cast, Integer, func
 @login_required
 def dashboard():
     try:
-        user_id = str(current_user.user_id)
-
         # --- Get day from URL ---
         practice_day = request.args.get("practice_day") or request.args.get("day")
 
-        # --- Safe day parser ---
-        import re
-        def parse_day(day_value):
-            try:
-                day_str = str(day_value).strip()
-                match = re.search(r'\d+', day_str)
-                return int(match.group()) if match else 1
-            except:
-                return 1
-
-        # --- Determine current day and progress object ---
-        if practice_day:
-            day = practice_day
-            current_day_num = parse_day(day)
-            progress_obj = Progress.query.filter_by(user_id=user_id, day=day).first()
-        else:
-            progress_obj = (
-                Progress.query.filter_by(user_id=user_id)
-                .order_by(Progress.day.desc())
-                .first()
-            )
-            if progress_obj:
-                day = progress_obj.day
-                current_day_num = parse_day(day)
-            else:
-                day = "Day-1"
-                current_day_num = 1
-
-        # --- Default credits ---
-        credits = {
-            "listen": 0,
-            "speak": 0,
-            "vocabulary": 0,
-            "revision": 0,
-            "karaoke": 0,
-            "topic_speaker": 0,
-            "vocabulary_forest": 0,  # NEW
-        }
-
-        # --- Update credits and progress flags ---
-        if progress_obj:
-            credits.update({
-                "listen": progress_obj.listen or 0,
-                "speak": progress_obj.speak or 0,
-                "vocabulary": progress_obj.vocabulary or 0,
-                "revision": progress_obj.revision or 0,
-                "karaoke": progress_obj.karaoke or 0,
-                "topic_speaker": progress_obj.topic_speaker or 0,
-                "vocabulary_forest": getattr(progress_obj, "vocabulary_forest", 0),  # NEW
-            })
-            listen_done = bool(progress_obj.listen)
-            speak_done = bool(progress_obj.speak)
-            revision_done = bool(progress_obj.revision)
-            vocabulary_done = bool(progress_obj.vocabulary)
-            vocab_forest_score = getattr(progress_obj, "vocabulary_forest", 0)
-        else:
-            listen_done = speak_done = revision_done = vocabulary_done = False
-            vocab_forest_score = 0
-
-        # --- Activity unlock ---
-        listen_active = True
-        speak_active = listen_done
-        revision_active = speak_done
-        vocabulary_active = (current_day_num >= 7) and speak_done
-
-        # --- Fun practice ---
-        fun_practice_activities = {
-            "Karaoke": credits.get("karaoke", 0),
-            "Topic Speaker": credits.get("topic_speaker", 0),
-            "Antakshari": 0,
-            "Image Puzzle": 0,
-            "Vocabulary Forest": vocab_forest_score,  # NEW
-            "Revision": credits.get("revision", 0),
-        }
-
-        can_progress_to_next_day = revision_done
-
-        # --- Fetch poems safely using Python filter ---
-        all_poems = Poem.query.order_by(Poem.poem_order).all()
-        def extract_day_number(day_str):
-            match = re.search(r'\d+', str(day_str))
-            return int(match.group()) if match else 1
-
-        day_poems = [p for p in all_poems if extract_day_number(p.day) == current_day_num]
-
-        # --- Guide messages ---
-        guide = BoonyGuide()
-        user_context = {
-            "name": getattr(current_user, "full_name", None) or getattr(current_user, "username", "Learner"),
-            "day": day,
-            "listen_done": listen_done,
-            "speak_done": speak_done,
-            "revision_done": revision_done,
-            "vocabulary_done": vocabulary_done,
-            "is_practice_mode": bool(practice_day),
-        }
-        welcome_message = guide.get_welcome_message("dashboard", user_context)
-        daily_tip = guide.get_daily_tip()
-        encouragement = guide.get_encouragement_message(user_context)
-        guide_messages = {"Welcome": welcome_message, "Tip": daily_tip, "Encouragement": encouragement}
-
-        # --- Star info ---
-        star_of_day = get_star_of_day() or {}
-        star_of_week = get_star_of_week() or {}
-
-        return render_template(
-            "dashboard.html",
-            current_user=current_user,
-            credits=credits,
-            gender=getattr(current_user, "gender", ""),
-            voice=getattr(current_user, "voice", ""),
-            day=day,
-            current_day_num=current_day_num,
-            listen_active=listen_active,
-            speak_active=speak_active,
-            revision_active=revision_active,
-            vocabulary_active=vocabulary_active,
-            fun_practice_activities=fun_practice_activities,
-            day_poems=day_poems,
-            is_practice_mode=bool(practice_day),
-            guide_messages=guide_messages,
-            daily_tip=daily_tip,
-            encouragement=encouragement,
-            can_progress_to_next_day=can_progress_to_next_day,
-            star_of_day_user_id=star_of_day.get("user_id"),
-            star_of_week_user_id=star_of_week.get("user_id"),
-            thought_of_day=get_thought_of_day(),
-            actions=[],
-        )
+        # Shared parts (poems, stars, tip, quote) come from the fragment cache;
+        # only the user's credits and unlock flags are computed here.
+        timings = {}
+        context = dashboard_view.build_context(current_user, practice_day, timings)
+        response = make_response(dashboard_view.render("dashboard.html", context, timings))
+        response.headers["Server-Timing"] = dashboard_view.server_timing(timings)
+        print(f"⏱️ Dashboard {context['day']}: " + ", ".join(f"{k}={v['ms']}ms" for k, v in timings.items()))
+        return response
 
     except Exception as e:
         import traceback
@@ -2308,10 +2224,13 @@ def ai_word():
         {"role": "user", "content": prompt}
     ]
     try:
-        resp_text = call_openai(messages)
-        candidate = re.sub(r'[^A-Za-z]', '', (resp_text.split()[0] if resp_text else ""))
-        if candidate.lower() not in used:
-            return jsonify({"word": candidate})
+        # Same category + used words -> same answer; no need to pay for it twice.
+        # A cached answer that is empty or already used would be served forever, so ask fresh once.
+        for cache in (True, False):
+            resp_text = call_openai(messages, max_tokens=10, cache=cache)
+            candidate = re.sub(r'[^A-Za-z]', '', (resp_text.split()[0] if resp_text else ""))
+            if candidate and candidate.lower() not in used:
+                return jsonify({"word": candidate})
     except Exception as e:
         print("OpenAI fallback error:", e)
     return jsonify({"word": None})
@@ -2340,7 +2259,7 @@ def validate_word():
         {"role": "user", "content": prompt}
     ]
     try:
-        resp_text = call_openai(messages)
+        resp_text = call_openai(messages, temperature=0, max_tokens=5)
         if "YES" in resp_text.upper():
             return jsonify({"valid": True})
     except Exception as e:
@@ -2385,34 +2304,9 @@ def submit_word():
         "total_credits": USER_CREDITS
     })
 
-_model = None
-def get_model(size="base"):
-    global _model
-    if _model is None:
-        _model = WhisperModel(size, device="cpu", compute_type="int8")
-    return _model
-
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_AUDIO_EXTENSIONS
 
-def transcribe_audio(path):
-    model = get_model()
-    try:
-        segments, info = model.transcribe(
-            path,
-            language="en",
-            task="transcribe",
-            vad_filter=True,
-            beam_size=1,
-            best_of=1,
-            word_timestamps=True,
-        )
-        result = " ".join([s.text for s in segments]).strip()
-        return result or "[No speech detected]"
-    except Exception as e:
-        print(f"STT error: {e}")
-        return "[Transcription error]"
-
 @app.route("/api/recognize_audio", methods=["POST"])
 def recognize_audio():
     if "file" not in request.files:
@@ -2424,8 +2318,14 @@ def recognize_audio():
         ext = file.filename.rsplit(".", 1)[1].lower()
         tmp_name = f"tmp_{uuid.uuid4().hex}.{ext}"
         file.save(tmp_name)
-        transcript = transcribe_audio(tmp_name)
-        os.remove(tmp_name)
+        try:
+            transcript = stt_pool.transcribe(tmp_name)
+        except QueueFull:
+            return jsonify({"error": "Speech service busy, retry shortly"}), 503, {"Retry-After": "5"}
+        except TimeoutError:
+            return jsonify({"error": "Transcription timed out"}), 504
+        finally:
+            os.remove(tmp_name)
         return jsonify({"transcript": transcript})
     return jsonify({"error": "Invalid file type"}), 400
 
@@ -2434,7 +2334,7 @@ def recognize_audio():
 def twinkle_star():
     """Interactive Twinkle Twinkle Little Star poem page"""
     # Default to first poem for backward compatibility
-    poem = Poem.query.filter_by(day=1, poem_order=1).first()
+    poem = poem_catalog.get_poem(1, 1)
     if not poem:
         # Fallback if database is not populated
         poem = {
@@ -2449,7 +2349,7 @@ def twinkle_star():
 @login_required
 def poem_page(day, poem_order):
     """Dynamic poem page for any day and poem order"""
-    poem = Poem.query.filter_by(day=day, poem_order=poem_order).first()
+    poem = poem_catalog.get_poem(day, poem_order)
     if not poem:
         return "Poem not found", 404
     return render_template("poem_template.html", poem=poem)
@@ -2458,7 +2358,7 @@ def poem_page(day, poem_order):
 @login_required
 def poems_by_day(day):
     """Get all poems for a specific day"""
-    poems = Poem.query.filter_by(day=day).order_by(Poem.poem_order).all()
+    poems = poem_catalog.poems_for_day(day)
     if not poems:
         return "No poems found for this day", 404
     return render_template("poem_selection.html", poems=poems, day=day)
@@ -2537,50 +2437,12 @@ def add_credits():
         if not day:
             return jsonify({'error': 'Day is required'}), 400
         
-        user_id = str(current_user.user_id)
-        
-        # Find or create progress record
-        progress = Progress.query.filter_by(user_id=user_id, day=day).first()
-        
-        if not progress:
-            # Initialize all fields to 0 and set the appropriate activity
-            progress = Progress(
-                user_id=user_id,
-                day=day,
-                listen=credits if activity_type == 'listen' else 0,
-                speak=credits if activity_type == 'speak' else 0,
-                vocabulary=credits if activity_type == 'vocabulary' else 0,
-                revision=credits if activity_type == 'revision' else 0,
-                karaoke=credits if activity_type == 'karaoke' else 0,
-                topic_speaker=credits if activity_type == 'topic_speaker' else 0,
-                antakshari_game=credits if activity_type == 'antakshari_game' else 0,
-                last_stage=activity_type,
-                last_statement=statement_index
-            )
-            db.session.add(progress)
-        else:
-            # Add credits to the appropriate activity
-            if activity_type == 'listen':
-                progress.listen = (progress.listen or 0) + credits
-            elif activity_type == 'speak':
-                progress.speak = (progress.speak or 0) + credits
-            elif activity_type == 'vocabulary':
-                progress.vocabulary = (progress.vocabulary or 0) + credits
-            elif activity_type == 'revision':
-                progress.revision = (progress.revision or 0) + credits
-            elif activity_type == 'karaoke':
-                progress.karaoke = (progress.karaoke or 0) + credits
-            elif activity_type == 'topic_speaker':
-                progress.topic_speaker = (progress.topic_speaker or 0) + credits
-            
-            progress.last_stage = activity_type
-            progress.last_statement = statement_index
-            progress.updated_at = datetime.now(timezone.utc)
-        
-        db.session.commit()
+        # Atomic col = col + :n upsert; also updates the leaderboard
+        totals = ledger_add_credits(current_user.user_id, day, activity_type, credits,
+                                    last_stage=activity_type, last_statement=statement_index)
         
         # Return the appropriate total credits based on activity type
-        total_credits = getattr(progress, activity_type, 0)
+        total_credits = totals.get(activity_type, 0)
         
         return jsonify({
             'success': True,
@@ -2589,6 +2451,8 @@ def add_credits():
             'activity_type': activity_type
         })
         
+    except CreditError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error in add_credits: {e}")
         db.session.rollback()
@@ -2602,8 +2466,7 @@ def get_progress():
         if not day:
             return jsonify({'error': 'Day is required'}), 400
         
-        user_id = str(current_user.user_id)
-        progress = Progress.query.filter_by(user_id=user_id, day=day).first()
+        progress = get_progress_snapshot(current_user.user_id).by_day.get(day)
         
         if progress:
             return jsonify({
@@ -2626,6 +2489,41 @@ def get_progress():
         print(f"Error in get_progress: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/progress/summary')
+@login_required
+def progress_summary():
+    """Everything the dashboard scripts ask for, from one progress snapshot: ?day= selects a practice day"""
+    try:
+        snapshot = get_progress_snapshot(current_user.user_id)
+        day = request.args.get('day') or snapshot.current_day
+        row = snapshot.get(day)
+        credits = snapshot.credits(day)
+        star_of_day = get_star_of_day()
+        star_of_week = get_star_of_week()
+        return jsonify({
+            'success': True,
+            'day': day,
+            'current_day': snapshot.current_day,
+            'current_day_num': snapshot.current_day_num,
+            'credits': credits,
+            'last_stage': row.last_stage if row else '',
+            'last_statement': row.last_statement if row else 0,
+            'listen_test_passed': bool(row.listen_test_passed) if row else False,
+            'activities': {
+                'listen': True,
+                'speak': bool(credits['listen']),
+                'revision': bool(credits['speak']),
+                'vocabulary': (day_number(day) or 1) >= 7 and bool(credits['speak']),
+            },
+            'can_progress_to_next_day': bool(credits['revision']),
+            'completed_days': snapshot.completed_days(),
+            'star_of_day_user_id': str(star_of_day['user_id']) if star_of_day.get('user_id') else None,
+            'star_of_week_user_id': str(star_of_week['user_id']) if star_of_week.get('user_id') else None,
+        })
+    except Exception as e:
+        print(f"Error in progress_summary: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/update_language', methods=['POST'])
 @login_required
 def update_language():
@@ -2717,9 +2615,7 @@ def topic_speaker(day=None):
     """Topic-based speaking program with Boony Female GIF"""
     if not day:
         # Get current day from user progress
-        user_id = str(current_user.user_id)
-        progress = Progress.query.filter_by(user_id=user_id).first()
-        day = progress.day if progress else 'Day-1'
+        day = get_current_day(current_user.user_id)
     
     return render_template('topic_speaker.html', day=day)
 
@@ -2819,7 +2715,7 @@ def test_js_syntax():
             credits = {"listen": 0, "speak": 0, "vocabulary": 0, "revision": 0}
             day = practice_day
     else:
-        progress = Progress.query.filter_by(user_id=user_id).order_by(Progress.day.desc()).first()
+        progress = get_current_progress(user_id)
         if not progress:
             credits = {"listen": 0, "speak": 0, "vocabulary": 0, "revision": 0}
             day = "Day-1"
@@ -2927,7 +2823,7 @@ def test_dashboard_minimal():
             credits = {"listen": 0, "speak": 0, "vocabulary": 0, "revision": 0}
             day = practice_day
     else:
-        progress = Progress.query.filter_by(user_id=user_id).order_by(Progress.day.desc()).first()
+        progress = get_current_progress(user_id)
         if not progress:
             credits = {"listen": 0, "speak": 0, "vocabulary": 0, "revision": 0}
             day = "Day-1"
@@ -2970,7 +2866,7 @@ def js_syntax_isolate():
             credits = {"listen": 0, "speak": 0, "vocabulary": 0, "revision": 0}
             day = practice_day
     else:
-        progress = Progress.query.filter_by(user_id=user_id).order_by(Progress.day.desc()).first()
+        progress = get_current_progress(user_id)
         if not progress:
             credits = {"listen": 0, "speak": 0, "vocabulary": 0, "revision": 0}
             day = "Day-1"
@@ -2995,14 +2891,7 @@ def js_syntax_isolate():
 def get_current_session():
     """Get current user session info including day"""
     try:
-        # Get user's latest progress to determine current day
-        progress = (
-            Progress.query.filter_by(user_id=str(current_user.user_id))
-            .order_by(Progress.day.desc())
-            .first()
-        )
-        
-        current_day = progress.day if progress else "Day-1"
+        current_day = get_progress_snapshot(current_user.user_id).current_day
         
         return jsonify({
             "success": True,
@@ -3023,17 +2912,13 @@ def progress_to_next_day():
     """Progress user to the next day"""
     try:
         # Get user's current progress
-        progress = (
-            Progress.query.filter_by(user_id=str(current_user.user_id))
-            .order_by(Progress.day.desc())
-            .first()
-        )
+        progress = get_current_progress(current_user.user_id)
         
         if not progress:
             return jsonify({"success": False, "error": "No progress found"}), 400
         
-        # Extract current day number and increment
-        current_day_num = int(progress.day.split("-")[1])
+        # Increment the current day number
+        current_day_num = progress.day_num
         next_day_num = current_day_num + 1
         next_day = f"Day-{next_day_num}"
         
@@ -3087,27 +2972,10 @@ def get_completed_days():
     """Get list of days user has made progress on (excluding current day for practice)"""
     try:
         # Get user's current day
-        current_progress = (
-            Progress.query.filter_by(user_id=str(current_user.user_id))
-            .order_by(Progress.day.desc())
-            .first()
-        )
-        current_day = current_progress.day if current_progress else "Day-1"
-        
-        # Get all progress records for user
-        progress_records = (
-            Progress.query.filter_by(user_id=str(current_user.user_id))
-            .order_by(Progress.day.asc())
-            .all()
-        )
-        
-        completed_days = []
-        for prog in progress_records:
-            # Consider a day completed if user has any credits
-            total_credits = (prog.listen or 0) + (prog.speak or 0) + (prog.vocabulary or 0)
-            # Only include days that are not the current day (for practice purposes)
-            if total_credits > 0 and prog.day != current_day:
-                completed_days.append(prog.day)
+        snapshot = get_progress_snapshot(current_user.user_id)
+        current_day = snapshot.current_day
+        # Days with any credits, excluding the current day (for practice purposes)
+        completed_days = snapshot.completed_days()
         
         return jsonify({
             "success": True,
@@ -3258,36 +3126,13 @@ def get_guide_message():
 def use_topic_speaker():
     """Add 10 credits for using topic speaker (listening)"""
     try:
-        user_id = str(current_user.user_id)
-        
-        # Get user's progress
-        progress = Progress.query.filter_by(user_id=user_id).first()
-        
-        if not progress:
-            # Create new progress record
-            progress = Progress(
-                user_id=user_id,
-                day='Day-1',  # Default day
-                listen=0,
-                speak=0,
-                vocabulary=0,
-                revision=0,
-                karaoke=0,
-                topic_speaker=10,  # Add 10 credits
-                last_stage='topic_speaker',
-                last_statement=0
-            )
-            db.session.add(progress)
-        else:
-            # Add 10 credits for listening to topic
-            current_credits = getattr(progress, 'topic_speaker', 0) or 0
-            progress.topic_speaker = current_credits + 10
-        
-        db.session.commit()
+        # Add 10 credits for listening to topic, on the user's current day
+        totals = ledger_add_credits(current_user.user_id, get_current_day(current_user.user_id),
+                                    'topic_speaker', 10, last_stage='topic_speaker')
         
         return jsonify({
             'success': True,
-            'remaining_credits': progress.topic_speaker,
+            'remaining_credits': totals['topic_speaker'],
             'message': '10 credits added for topic listening'
         })
         
@@ -3392,15 +3237,8 @@ def pandora_box():
     
     user_id = str(current_user.user_id)
     
-    # Get current user's day from progress
-    progress = (
-        Progress.query.filter_by(user_id=user_id)
-        .order_by(Progress.day.desc())
-        .first()
-    )
-    
     # Current day (default to Day-1 if no progress)
-    current_day = progress.day if progress else "Day-1"
+    current_day = get_current_day(user_id)
     
     # Load Pandora Box data from Excel file (Grammar & Pronunciation Rules)
     pandora_items = []
@@ -3565,7 +3403,6 @@ def get_vocabulary_words_api():
 def get_learning_content_api(day):
     """Get learning content for a specific day from Excel syllabus for Flutter app"""
     try:
-        # Read Excel file
         excel_file_path = os.path.join('data', 'syllabus', 'english_spoken_syllabus_filled_ai.xlsx')
         
         if not os.path.exists(excel_file_path):
@@ -3574,35 +3411,26 @@ def get_learning_content_api(day):
                 'error': 'Syllabus file not found'
             }), 404
         
-        df = pd.read_excel(excel_file_path)
+        # Find content for the specified day ('1' and 'Day-1' both work)
+        row = get_syllabus_index(excel_file_path).first_row(day)
         
-        # Find content for the specified day
-        day_filter = f"Day-{day}" if not day.startswith('Day-') else day
-        day_row = df[df['day'].astype(str).str.strip() == day_filter]
-        
-        if day_row.empty:
-            # Try alternative format
-            alt_day = day.replace('Day-', '') if day.startswith('Day-') else f"Day-{day}"
-            day_row = df[df['day'].astype(str).str.strip() == alt_day]
-        
-        if day_row.empty:
+        if row is None:
             return jsonify({
                 'success': False,
                 'error': f'No content found for {day}'
             }), 404
         
         # Extract content from the row
-        row = day_row.iloc[0]
         content = {
             'day': day,
-            'topic': str(row.get('topic', '')),
-            'listen_speak_statement': str(row.get('listen_speak_statement', '')),
-            'vocab': str(row.get('vocab', '')),
-            'hindi_meaning': str(row.get('hindi_meaning', '')),
-            'grammar_note': str(row.get('grammar_note', '')),
-            'english_explanation': str(row.get('english_explenation', '')),
-            'hinglish_explanation': str(row.get('hinglish_explenation', '')),
-            'practice_question': str(row.get('practice_question', ''))
+            'topic': row.topic,
+            'listen_speak_statement': row.text,
+            'vocab': row.vocab,
+            'hindi_meaning': row.hindi_meaning,
+            'grammar_note': row.grammar_note,
+            'english_explanation': row.english_explanation,
+            'hinglish_explanation': row.hinglish_explanation,
+            'practice_question': row.practice_question
         }
         
         return jsonify({
@@ -3628,7 +3456,6 @@ def get_daily_topic():
         current_day = 'Day-1'
         print(f"DEBUG: Using hardcoded current_day: {current_day}")
         
-        # Read Excel file
         excel_file_path = os.path.join('data', 'syllabus', 'english_spoken_syllabus_filled_ai.xlsx')
         
         if not os.path.exists(excel_file_path):
@@ -3638,49 +3465,18 @@ def get_daily_topic():
                 'error': 'Syllabus file not found'
             }), 404
         
-        print(f"DEBUG: Reading Excel file from: {excel_file_path}")
+        # Find topic for current day (falls back to Day-1)
+        index = get_syllabus_index(excel_file_path)
+        row = index.first_row(current_day) or index.first_row('Day-1')
         
-        # Read Excel file using pandas
-        try:
-            df = pd.read_excel(excel_file_path)
-            print(f"DEBUG: Excel file read successfully")
-        except Exception as excel_error:
-            print(f"DEBUG: Excel read error: {str(excel_error)}")
-            raise excel_error
-        
-        print(f"DEBUG: Excel columns: {list(df.columns)}")
-        print(f"DEBUG: DataFrame shape: {df.shape}")
-        print(f"DEBUG: First few rows: {df.head()}")
-        
-        # Find topic for current day
-        print(f"DEBUG: Filtering DataFrame for day: {current_day}")
-        try:
-            day_row = df[df['day'] == current_day]
-            print(f"DEBUG: Filter successful, found {len(day_row)} rows for day {current_day}")
-        except Exception as filter_error:
-            print(f"DEBUG: Filter error: {str(filter_error)}")
-            raise filter_error
-        
-        if day_row.empty:
-            print("DEBUG: No rows found for current day, trying fallback to Day-1")
-            # Fallback to Day-1 if current day not found
-            day_row = df[df['day'] == 'Day-1']
-            print(f"DEBUG: Fallback to Day-1, found {len(day_row)} rows")
-        
-        if day_row.empty:
+        if row is None:
             print("DEBUG: No rows found even for Day-1")
             return jsonify({
                 'success': False,
                 'error': 'No topic found for current day'
             }), 404
         
-        print(f"DEBUG: Attempting to extract topic from row")
-        try:
-            topic = day_row.iloc[0]['topic'] if 'topic' in day_row.columns else 'General Conversation'
-            print(f"DEBUG: Topic extraction successful: {topic}")
-        except Exception as topic_error:
-            print(f"DEBUG: Topic extraction error: {str(topic_error)}")
-            raise topic_error
+        topic = row.topic or 'General Conversation'
         
         print(f"DEBUG: Selected topic: {topic}")
         
@@ -3784,6 +3580,38 @@ def send_chat_message():
             'error': str(e)
         }), 500
 
+@app.route('/api/chat/message/stream', methods=['POST'])
+@login_required
+def stream_chat_message():
+    """
+    Server-sent events version of /api/chat/message: 'token' events carry
+    reply text as it is generated, then one 'done' event with the full
+    message, corrections and timings.
+    """
+    data = request.get_json(silent=True) or {}
+    message = (data.get('message') or '').strip()
+    if not message:
+        return jsonify({
+            'success': False,
+            'error': 'Message is required'
+        }), 400
+    
+    user_id = str(current_user.user_id)
+    
+    def generate():
+        try:
+            for item in chatbot.process_user_message_stream(user_id, message):
+                yield _sse(item.pop('type'), item)
+        except Exception as e:
+            print(f"❌ Chat stream error: {e}")
+            yield _sse('error', {'success': False, 'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.route('/api/chat/end', methods=['POST'])
 @login_required
 def end_chat():
@@ -3976,15 +3804,7 @@ def api_generate_speaker_content():
 def get_daily_topic(day):
     """Get topic for a specific day from syllabus"""
     try:
-        # Load syllabus data
-        df = pd.read_excel(app.config["DATA_SYLLABUS"])
-        
-        # Filter by day and get unique topic
-        day_data = df[df['day'] == day]
-        if not day_data.empty:
-            return day_data['topic'].iloc[0]
-        else:
-            return 'Daily Routine'  # Default topic
+        return get_syllabus_index(app.config["DATA_SYLLABUS"]).topic(day) or 'Daily Routine'
     except Exception as e:
         print(f"Error getting daily topic: {e}")
         return 'Daily Routine'
@@ -3992,8 +3812,6 @@ def get_daily_topic(day):
 def generate_speaker_content(topic, level):
     """Generate content for beginner or professional level using OpenAI"""
     try:
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        
         if level == 'beginner':
             prompt = f"""Create realistic content showing how a beginner Indian English learner would actually speak about '{topic}'. This should sound like a real person learning English.
             
@@ -4036,18 +3854,18 @@ Topic: {topic}
             
 Make it sound impressive, confident, and professionally sophisticated."""
         
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
+        # Sampled, but one sample per (topic, level) is plenty: cache it
+        return cached_completion(
             messages=[
                 {"role": "system", "content": "You are an expert English language instructor who understands the learning journey from beginner to professional level."},
                 {"role": "user", "content": prompt}
             ],
+            model="gpt-3.5-turbo",
             max_tokens=300,
-            temperature=0.7
+            temperature=0.7,
+            cache=True
         )
         
-        return response.choices[0].message.content.strip()
-        
     except Exception as e:
         print(f"Error generating speaker content: {e}")
         # Fallback content
@@ -4062,7 +3880,8 @@ def health_check():
     return jsonify({
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
-        "message": "Server is running"
+        "message": "Server is running",
+        "llm_cache": llm_cache.stats()
     }), 200
 
 # PDF/Image to Speech Routes
@@ -4386,15 +4205,15 @@ def get_hindi_meaning(word):
     try:
         prompt = f"Translate the English word '{word}' to Hindi. Provide only the Hindi translation in Devanagari script, nothing else."
         
-        response = call_openai(
+        response = cached_completion(
             messages=[{"role": "user", "content": prompt}],
             model="gpt-3.5-turbo",
             max_tokens=50,
             temperature=0.1
         )
         
-        if response and response.strip():
-            return response.strip()
+        if response:
+            return response
         else:
             return 'अर्थ उपलब्ध नहीं'
             
@@ -4541,4 +4360,6 @@ def main():
 
 # Entry point
 if __name__ == "__main__":
+    # Frozen builds (boony_app.spec): let STT pool workers start as workers, not as the app
+    multiprocessing.freeze_support()
     main()
@@ -41,4 +41,21 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key")
-    UPLOAD_FOLDER = os.path.join(basedir, "user_data")  # <-- recommended path
\ No newline at end of file
+    UPLOAD_FOLDER = os.path.join(basedir, "user_data")  # <-- recommended path
+
+    # --- Runtime profile (see services/static_assets.py) ---
+    # dev (default): templates reload on edit, static files are revalidated.
+    # prod: templates compiled once at startup with a bytecode cache, static
+    # URLs carry a content hash and are cached by browsers for a year.
+    APP_PROFILE = os.getenv("APP_PROFILE", "dev").lower()
+    IS_PRODUCTION = APP_PROFILE in ("prod", "production")
+    TEMPLATES_AUTO_RELOAD = not IS_PRODUCTION
+    PRECOMPILE_TEMPLATES = IS_PRODUCTION
+    JINJA_BYTECODE_CACHE_DIR = (
+        os.getenv("JINJA_BYTECODE_CACHE_DIR", os.path.join(basedir, "instance", "jinja_bytecode"))
+        if IS_PRODUCTION else None
+    )
+    STATIC_FINGERPRINT = IS_PRODUCTION
+    STATIC_FINGERPRINT_MAX_AGE = 365 * 24 * 3600
+    # Static files requested without a fingerprint (hand-written /static/ paths)
+    SEND_FILE_MAX_AGE_DEFAULT = int(os.getenv("STATIC_MAX_AGE", "3600")) if IS_PRODUCTION else 0
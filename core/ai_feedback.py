@@ -10,19 +10,7 @@ import asyncio
 import edge_tts
 from playsound import playsound
 import re
-from faster_whisper import WhisperModel
-
-# Global whisper model variable for lazy loading
-_model = None
-
-def get_whisper_model():
-    """Get or initialize the Whisper model (lazy loading)"""
-    global _model
-    if _model is None:
-        print("⏳ Loading Whisper model (base) for AI feedback...")
-        _model = WhisperModel("base", device="cpu", compute_type="int8")
-        print("✅ Whisper model loaded for AI feedback")
-    return _model
+from services.whisper_registry import get_whisper_model  # shared with services.stt
 
 # Load API key from JSON file
 config_path = resource_path("core/config.json")
@@ -87,7 +75,7 @@ def get_vocab_meaning(vocab_word):
     try:
         from core.openai_helper import call_openai
         prompt = f"Give a short and simple meaning for the word '{vocab_word}' in English."
-        return call_openai(prompt)
+        return call_openai(prompt, temperature=0.2)
     except Exception as e:
         print(f"⚠️ get_vocab_meaning failed: {e}")
         return "Meaning not available."
@@ -230,7 +218,7 @@ def get_vocab_meaning(word):
     from core.openai_helper import call_openai  # तुम्हारे system का AI call function
     prompt = f"Give a short Hindi meaning for the English word '{word}'."
     try:
-        return call_openai(prompt)
+        return call_openai(prompt, temperature=0.2)
     except Exception:
         return ""
 
@@ -1,5 +1,9 @@
+import hashlib
 import json
 import os
+import sqlite3
+import threading
+import time
 from openai import OpenAI
 from .resource_helper import resource_path  # ensures correct path in exe or script
 
@@ -24,32 +28,191 @@ def get_openai_client():
     """
     return client
 
+# ===========================
+# 🔹 LLM response cache
+# ===========================
+# Identical (model, messages, temperature, max_tokens) requests are answered
+# from a small SQLite store instead of a paid round trip. Only low-temperature
+# calls are cached by default; pass cache=True for prompts whose answer may be
+# reused even though it is sampled (e.g. pre-generated lesson content), or
+# cache=False to always hit the API.
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("data", "cache", "llm_cache.sqlite3"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+
+
+class LLMResponseCache:
+    EVICT_EVERY = 200  # writes between TTL/size sweeps
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.errors = 0
+        self._writes = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, messages, temperature, max_tokens) -> str:
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?", (key, now - self.ttl)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️ LLM cache read failed: {e}")
+            return None
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now),
+                )
+                conn.commit()
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict_locked(now)
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️ LLM cache write failed: {e}")
+
+    def _evict_locked(self, now: float):
+        conn = self._connect()
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        conn.commit()
+
+    def evict(self):
+        """Drop expired entries and trim to max_entries (least recently used first)."""
+        try:
+            with self._lock:
+                self._evict_locked(time.time())
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache eviction failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+llm_cache = LLMResponseCache()
+
+
+def _as_messages(messages):
+    # Older call sites pass a bare prompt string
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return messages
+
+
+def cached_completion(
+    messages,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+    cache: bool | None = None
+) -> str:
+    """
+    Completion text for messages, served from llm_cache when allowed.
+    cache=None caches only when temperature <= LLM_CACHE_MAX_TEMPERATURE.
+    Raises on API errors (failures are never cached).
+    """
+    messages = _as_messages(messages)
+    use_cache = LLM_CACHE_ENABLED and (cache if cache is not None else temperature <= LLM_CACHE_MAX_TEMPERATURE)
+    key = None
+    if use_cache:
+        key = llm_cache.key(model, messages, temperature, max_tokens)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+    else:
+        llm_cache.bypassed += 1
+
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    text = (response.choices[0].message.content or "").strip()
+    if key and text:
+        llm_cache.put(key, model, text)
+    return text
+
+
 def call_openai(
     messages,
     model: str = "gpt-4o-mini",
     temperature: float = 0.7,
-    max_tokens: int = 1000
+    max_tokens: int = 1000,
+    cache: bool | None = None
 ):
     """
     Sends messages to OpenAI and returns the completion text.
 
     Args:
-        messages (list): Chat messages as a list of dicts.
+        messages (list): Chat messages as a list of dicts (or a single prompt string).
         model (str): Model to use (default = gpt-4o-mini)
         temperature (float): Randomness in response
         max_tokens (int): Maximum tokens in output
+        cache (bool | None): Force (True) or skip (False) the response cache;
+            None caches deterministic (low-temperature) calls only
 
     Returns:
         str: AI response text
     """
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content.strip()
+        return cached_completion(messages, model, temperature, max_tokens, cache)
     except Exception as e:
         print(f"❌ call_openai failed: {e}")
         return "No response from AI."
@@ -0,0 +1,59 @@
+"""Merge duplicate progress rows and make (user_id, day) unique
+
+Revision ID: 3b9d6f2e4a15
+Revises: 8c4e7a1d2f90
+Create Date: 2026-10-18 14:26:07.481920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d6f2e4a15'
+down_revision = '8c4e7a1d2f90'
+branch_labels = None
+depends_on = None
+
+CREDIT_COLUMNS = ('listen', 'speak', 'vocabulary', 'revision', 'karaoke', 'topic_speaker', 'vocabulary_forest')
+# Every row starts these at the column default (10), so summing duplicates
+# would count that default once per row; keep the largest value instead
+MAX_COLUMNS = ('karaoke', 'topic_speaker')
+
+
+def upgrade():
+    # Concurrent find-or-create could leave several rows for one user/day.
+    # Keep the most recently updated one, add the others' credits to it.
+    bind = op.get_bind()
+    progress = sa.table(
+        'progress', sa.column('id'), sa.column('user_id'), sa.column('day', sa.String),
+        sa.column('updated_at', sa.DateTime), *(sa.column(c, sa.Integer) for c in CREDIT_COLUMNS)
+    )
+    duplicates = bind.execute(
+        sa.select(progress.c.user_id, progress.c.day)
+        .group_by(progress.c.user_id, progress.c.day)
+        .having(sa.func.count() > 1)
+    ).all()
+    for user_id, day in duplicates:
+        rows = bind.execute(
+            sa.select(progress)
+            .where(progress.c.user_id == user_id, progress.c.day == day)
+        ).mappings().all()
+        rows = sorted(rows, key=lambda r: (r['updated_at'] is not None, r['updated_at'] or 0), reverse=True)
+        keep, others = rows[0], rows[1:]
+        bind.execute(
+            progress.update().where(progress.c.id == keep['id'])
+            .values({
+                c: max(r[c] or 0 for r in rows) if c in MAX_COLUMNS else sum(r[c] or 0 for r in rows)
+                for c in CREDIT_COLUMNS
+            })
+        )
+        bind.execute(progress.delete().where(progress.c.id.in_([r['id'] for r in others])))
+
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.create_index('uq_progress_user_day', ['user_id', 'day'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.drop_index('uq_progress_user_day')
@@ -0,0 +1,39 @@
+"""Add materialized leaderboard table
+
+Revision ID: 5d1f3c2a9b47
+Revises: a746c0e8c016
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from models import UUIDOrString
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1f3c2a9b47'
+down_revision = 'a746c0e8c016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'leaderboard',
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('user_id', UUIDOrString(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('period', 'period_start', 'user_id')
+    )
+    with op.batch_alter_table('leaderboard', schema=None) as batch_op:
+        batch_op.create_index('ix_leaderboard_period_total', ['period', 'period_start', 'total'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('leaderboard', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaderboard_period_total')
+
+    op.drop_table('leaderboard')
@@ -0,0 +1,42 @@
+"""Add numeric day_num to progress with (user_id, day_num) index
+
+Revision ID: 8c4e7a1d2f90
+Revises: 5d1f3c2a9b47
+Create Date: 2026-10-18 11:03:52.218734
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e7a1d2f90'
+down_revision = '5d1f3c2a9b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('day_num', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_progress_user_day_num', ['user_id', 'day_num'], unique=False)
+
+    # Backfill from the "Day-N" strings (parsed in Python: no portable regex in SQL)
+    bind = op.get_bind()
+    progress = sa.table('progress', sa.column('id'), sa.column('day', sa.String), sa.column('day_num', sa.Integer))
+    updates = {}
+    for row_id, day in bind.execute(sa.select(progress.c.id, progress.c.day)):
+        match = re.search(r'\d+', day or '')
+        if match:
+            updates.setdefault(int(match.group()), []).append(row_id)
+    for day_num, ids in updates.items():
+        for i in range(0, len(ids), 500):
+            bind.execute(progress.update().where(progress.c.id.in_(ids[i:i + 500])).values(day_num=day_num))
+
+
+def downgrade():
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_user_day_num')
+        batch_op.drop_column('day_num')
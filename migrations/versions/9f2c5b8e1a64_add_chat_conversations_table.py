@@ -0,0 +1,37 @@
+"""Add chat_conversations table for the shared chatbot conversation store
+
+Revision ID: 9f2c5b8e1a64
+Revises: e61a0c4b7d23
+Create Date: 2026-10-18 16:21:19.570338
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from models import UUIDOrString
+
+
+# revision identifiers, used by Alembic.
+revision = '9f2c5b8e1a64'
+down_revision = 'e61a0c4b7d23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'chat_conversations',
+        sa.Column('user_id', UUIDOrString(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('chat_conversations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_chat_conversations_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_conversations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_chat_conversations_updated_at'))
+
+    op.drop_table('chat_conversations')
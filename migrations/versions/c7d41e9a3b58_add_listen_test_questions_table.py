@@ -0,0 +1,36 @@
+"""Add listen_test_questions table (precomputed listen-test question bank)
+
+Revision ID: c7d41e9a3b58
+Revises: 9f2c5b8e1a64
+Create Date: 2026-10-18 17:02:36.114852
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from models import UUIDOrString
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d41e9a3b58'
+down_revision = '9f2c5b8e1a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'listen_test_questions',
+        sa.Column('id', UUIDOrString(), nullable=False),
+        sa.Column('day', sa.String(length=50), nullable=False),
+        sa.Column('question', sa.Text(), nullable=False),
+        sa.Column('options', sa.JSON(), nullable=False),
+        sa.Column('answer', sa.String(length=200), nullable=False),
+        sa.Column('hindi_meaning', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'question', name='uq_listen_test_question')
+    )
+
+
+def downgrade():
+    op.drop_table('listen_test_questions')
@@ -0,0 +1,25 @@
+"""Add (day, poem_order) index to poems
+
+Revision ID: d2a85f3c6e19
+Revises: c7d41e9a3b58
+Create Date: 2026-10-18 19:42:31.604117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a85f3c6e19'
+down_revision = 'c7d41e9a3b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('poems', schema=None) as batch_op:
+        batch_op.create_index('ix_poems_day_order', ['day', 'poem_order'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('poems', schema=None) as batch_op:
+        batch_op.drop_index('ix_poems_day_order')
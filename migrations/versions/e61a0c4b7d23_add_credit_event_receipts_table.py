@@ -0,0 +1,37 @@
+"""Add credit_event_receipts table for batched credit dedupe
+
+Revision ID: e61a0c4b7d23
+Revises: 3b9d6f2e4a15
+Create Date: 2026-10-18 15:08:44.903215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from models import UUIDOrString
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61a0c4b7d23'
+down_revision = '3b9d6f2e4a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'credit_event_receipts',
+        sa.Column('user_id', UUIDOrString(), nullable=False),
+        sa.Column('event_id', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'event_id')
+    )
+    with op.batch_alter_table('credit_event_receipts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_credit_event_receipts_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('credit_event_receipts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_credit_event_receipts_created_at'))
+
+    op.drop_table('credit_event_receipts')
@@ -0,0 +1,38 @@
+"""Add stt_jobs table (transcription job state shared by web workers)
+
+Revision ID: f4b8e2d61c07
+Revises: d2a85f3c6e19
+Create Date: 2026-10-18 21:14:52.370418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8e2d61c07'
+down_revision = 'd2a85f3c6e19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stt_jobs',
+        sa.Column('job_id', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    with op.batch_alter_table('stt_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stt_jobs_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stt_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stt_jobs_created_at'))
+
+    op.drop_table('stt_jobs')
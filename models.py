@@ -2,6 +2,8 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import func
 from flask_login import UserMixin
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import validates
+import re
 import uuid
 from sqlalchemy import types
 
@@ -40,6 +42,14 @@ class UUIDOrString(types.TypeDecorator):
 db = SQLAlchemy()
 
 
+def day_number(day) -> int | None:
+    """'Day-12', 'day 12', '12' and 12 -> 12; None when there is no number."""
+    if isinstance(day, int):
+        return day
+    match = re.search(r"\d+", str(day or ""))
+    return int(match.group()) if match else None
+
+
 class User(db.Model, UserMixin):
     __tablename__ = "users"
 
@@ -99,6 +109,132 @@ class Progress(db.Model):
     created_at = db.Column(db.DateTime, server_default=func.now())
     updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
 
+    # Numeric copy of `day` ("Day-12" -> 12) so "latest day" sorts correctly and uses the index
+    day_num = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index("ix_progress_user_day_num", "user_id", "day_num"),
+        # One row per user/day: the conflict target of the atomic credit upsert
+        db.Index("uq_progress_user_day", "user_id", "day", unique=True),
+    )
+
+    @validates("day")
+    def _sync_day_num(self, key, value):
+        self.day_num = day_number(value)
+        return value
+
+
+class LeaderboardEntry(db.Model):
+    """Credits a user earned in one day or week, kept current by every credit write."""
+    __tablename__ = "leaderboard"
+
+    period = db.Column(db.String(10), primary_key=True)  # "day" or "week"
+    period_start = db.Column(db.Date, primary_key=True)  # the day, or the Monday of the week
+    user_id = db.Column(UUIDOrString, db.ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Star / top-N: newest-first walk of one period's index, no table scan
+        db.Index("ix_leaderboard_period_total", "period", "period_start", "total"),
+    )
+
+    def __repr__(self):
+        return f"<LeaderboardEntry {self.period} {self.period_start} {self.user_id}={self.total}>"
+
+
+class CreditEventReceipt(db.Model):
+    """Client credit event ids already applied, so a re-sent batch is not counted twice."""
+    __tablename__ = "credit_event_receipts"
+
+    user_id = db.Column(UUIDOrString, db.ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    event_id = db.Column(db.String(64), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<CreditEventReceipt {self.user_id} {self.event_id}>"
+
+
+class ChatConversation(db.Model):
+    """A learner's active chatbot conversation, serialized by services.conversation_store."""
+    __tablename__ = "chat_conversations"
+
+    user_id = db.Column(UUIDOrString, db.ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON
+    updated_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ChatConversation {self.user_id}>"
+
+
+class ListenTestQuestion(db.Model):
+    """Validated fill-in-the-blank MCQ for a day's listen test (see services.question_bank)."""
+    __tablename__ = "listen_test_questions"
+
+    id = db.Column(UUIDOrString, primary_key=True, default=uuid.uuid4)
+    day = db.Column(db.String(50), nullable=False)  # normalized "Day-N"
+    question = db.Column(db.Text, nullable=False)  # statement with one "______"
+    options = db.Column(db.JSON, nullable=False)  # four distinct choices
+    answer = db.Column(db.String(200), nullable=False)  # the correct option's text
+    hindi_meaning = db.Column(db.Text, default="")
+    created_at = db.Column(db.DateTime, server_default=func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint("day", "question", name="uq_listen_test_question"),
+    )
+
+    def __repr__(self):
+        return f"<ListenTestQuestion {self.day}: {self.question[:30]}>"
+
+
+class SttJob(db.Model):
+    """A queued transcription (services.stt_pool); any web worker can answer a poll for it."""
+    __tablename__ = "stt_jobs"
+
+    job_id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(16), nullable=False)  # pending / done / error
+    text = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<SttJob {self.job_id} {self.status}>"
+
+
+def upsert_increment(model, keys: dict, increments: dict, values: dict | None = None,
+                     insert_values: dict | None = None, connection=None):
+    """
+    Add `increments` to a row identified by `keys` inside the current transaction:
+    INSERT ... ON CONFLICT (keys) DO UPDATE SET col = col + :n. On a new row the
+    incremented columns start from 0. `values` are plain column assignments
+    applied on insert and update; `insert_values` only on insert (columns not
+    given fall back to their defaults). Runs on `connection` when given, else
+    on db.session. The caller commits.
+    """
+    values = values or {}
+    table = model.__table__
+    inserted = {**(insert_values or {}), **increments, **values, **keys}
+    execute = connection.execute if connection is not None else db.session.execute
+    dialect = (connection if connection is not None else db.session.get_bind()).dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**inserted)
+        set_ = {col: func.coalesce(table.c[col], 0) + n for col, n in increments.items()}
+        set_.update({col: stmt.excluded[col] for col in values})
+        execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=set_))
+        return
+
+    # Other dialects: guarded UPDATE, then INSERT if nothing matched
+    where = [table.c[k] == v for k, v in keys.items()]
+    update_values = {col: func.coalesce(table.c[col], 0) + n for col, n in increments.items()}
+    update_values.update(values)
+    result = execute(table.update().where(*where).values(**update_values))
+    if not result.rowcount:
+        execute(table.insert().values(**inserted))
 
 
 class UserSurvey(db.Model):
@@ -133,6 +269,11 @@ class Poem(db.Model):
     day = db.Column(db.Integer, nullable=False)  # Day number (1-15)
     poem_order = db.Column(db.Integer, nullable=False)  # Order within the day (1-3)
     created_at = db.Column(db.DateTime, server_default=func.now())
+
+    __table_args__ = (
+        # Poems of a day in order, and one poem by (day, order): index range scans
+        db.Index("ix_poems_day_order", "day", "poem_order"),
+    )
     
     def __repr__(self):
         return f"<Poem Day-{self.day}: {self.poem_name}>"
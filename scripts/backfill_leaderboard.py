@@ -0,0 +1,39 @@
+# scripts/backfill_leaderboard.py
+"""
+Rebuild the materialized leaderboard (day/week credit totals) from the
+progress table. Run once after deploying the leaderboard table, or any time
+the totals need to be recomputed:
+
+    python scripts/backfill_leaderboard.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from config import Config
+from models import db
+
+
+def create_app():
+    app = Flask(__name__, instance_relative_config=True, static_url_path="/static")
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+
+def main():
+    from services import leaderboard
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        written = leaderboard.backfill()
+        print(f"✅ Leaderboard rebuilt: {written} day/week rows")
+        for period in leaderboard.PERIODS:
+            print(f"⭐ Star of the {period}: {leaderboard.star(period)['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# services/asset_pipeline.py
+"""
+Build step for static assets: smaller variants of what static/ ships.
+
+Writes into static/build/, mirroring static/:
+    - PNG/JPEG: WebP and AVIF versions, plus thumbnails ASSET_THUMB_WIDTHS px
+      wide for images/ and avatars/ (each in the source format, WebP and AVIF);
+    - animated GIF: looping animated WebP and, when ffmpeg is on PATH, a
+      VP9 WebM for <video autoplay loop muted>;
+    - CSS/JS/SVG/JSON: .gz and .br (brotli) copies.
+A variant is only kept when it is smaller than what it replaces.
+
+static/build/manifest.json maps each source (relative to static/) to its
+variants. services/static_assets.py reads it to serve the best one for the
+request's Accept / Accept-Encoding headers, and ?w= picks a thumbnail.
+Re-running skips sources whose content hash is unchanged.
+
+    python -m services.asset_pipeline            # build what changed
+    python -m services.asset_pipeline --force    # rebuild everything
+
+AVIF needs a Pillow build with AVIF support, and brotli needs the 'brotli'
+package; the step skips either when it is missing.
+
+Environment:
+    ASSET_THUMB_WIDTHS   comma-separated thumbnail widths (default "160,320")
+    ASSET_IMAGE_QUALITY  WebP/AVIF quality, 1-100 (default 80)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+PIL_AVAILABLE = False
+try:
+    from PIL import Image, ImageSequence, features  # type: ignore
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+
+BROTLI_AVAILABLE = False
+try:
+    import brotli  # type: ignore
+    BROTLI_AVAILABLE = True
+except Exception:
+    BROTLI_AVAILABLE = False
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+BUILD_SUBDIR = "build"
+MANIFEST_NAME = "manifest.json"
+
+ASSET_THUMB_WIDTHS = tuple(int(w) for w in os.getenv("ASSET_THUMB_WIDTHS", "160,320").split(",") if w.strip())
+ASSET_IMAGE_QUALITY = int(os.getenv("ASSET_IMAGE_QUALITY", "80"))
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+TEXT_EXTENSIONS = {".css", ".js", ".svg", ".json"}
+THUMB_DIRS = ("images", "avatars")
+SKIP_DIRS = {BUILD_SUBDIR, "tts"}  # tts/ is a runtime audio cache
+
+
+def _content_hash(path: str) -> str:
+    h = hashlib.md5(usedforsecurity=False)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _keep_if_smaller(out_path: str, limit: int) -> bool:
+    """Delete out_path unless it exists and is smaller than limit bytes."""
+    if os.path.exists(out_path) and os.path.getsize(out_path) < limit:
+        return True
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    return False
+
+
+def avif_supported() -> bool:
+    return PIL_AVAILABLE and features.check("avif")
+
+
+# ----------------------
+# Images
+# ----------------------
+MIMETYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp", "AVIF": "image/avif"}
+
+
+def _save_variants(img, out_stem: str, static_dir: str, limit: int, source_format: str | None = None) -> dict:
+    """Write WebP/AVIF (and source_format, for thumbnails) of img; returns {mimetype: path under static/}."""
+    targets = []
+    if source_format in ("PNG", "JPEG"):
+        targets.append((source_format, ".png" if source_format == "PNG" else ".jpg"))
+    targets.append(("WEBP", ".webp"))
+    if avif_supported():
+        targets.append(("AVIF", ".avif"))
+
+    written = {}
+    for fmt, ext in targets:
+        out_path = out_stem + ext
+        if fmt == "PNG":
+            img.save(out_path, fmt, optimize=True)
+        elif fmt == "JPEG":
+            img.convert("RGB").save(out_path, fmt, quality=ASSET_IMAGE_QUALITY, optimize=True)
+        else:
+            img.save(out_path, fmt, quality=ASSET_IMAGE_QUALITY)
+        if _keep_if_smaller(out_path, limit):
+            written[MIMETYPES[fmt]] = os.path.relpath(out_path, static_dir).replace(os.sep, "/")
+            if fmt == "WEBP":
+                # AVIF is served first when accepted, so it must also beat the WebP
+                limit = os.path.getsize(out_path)
+    return written
+
+
+def build_image(src: str, rel: str, out_stem: str, static_dir: str) -> dict:
+    size = os.path.getsize(src)
+    with Image.open(src) as img:
+        img.load()
+        entry = {"width": img.width, "variants": _save_variants(img, out_stem, static_dir, size)}
+        if rel.split("/", 1)[0] in THUMB_DIRS:
+            thumbs = {}
+            for width in ASSET_THUMB_WIDTHS:
+                if width >= img.width:
+                    continue
+                # Palette images only resize with NEAREST; go through RGBA for a smooth thumbnail
+                thumb = img.convert("RGBA") if img.mode == "P" else img.copy()
+                thumb.thumbnail((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+                formats = _save_variants(thumb, f"{out_stem}.w{width}", static_dir, size, source_format=img.format)
+                if formats:
+                    thumbs[str(width)] = formats
+            if thumbs:
+                entry["thumbs"] = thumbs
+    return entry
+
+
+def build_gif(src: str, out_stem: str, static_dir: str) -> dict:
+    size = os.path.getsize(src)
+    variants = {}
+    with Image.open(src) as img:
+        frames = [frame.convert("RGBA") for frame in ImageSequence.Iterator(img)]
+        durations = [frame.info.get("duration", img.info.get("duration", 100)) for frame in ImageSequence.Iterator(img)]
+        out_path = out_stem + ".webp"
+        frames[0].save(out_path, "WEBP", save_all=True, append_images=frames[1:], duration=durations,
+                       loop=0, quality=ASSET_IMAGE_QUALITY, method=6)
+        if _keep_if_smaller(out_path, size):
+            variants["image/webp"] = os.path.relpath(out_path, static_dir).replace(os.sep, "/")
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        out_path = out_stem + ".webm"
+        result = subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-i", src, "-c:v", "libvpx-vp9", "-b:v", "0", "-crf", "38",
+             "-pix_fmt", "yuva420p", "-an", out_path],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            print(f"⚠️ WebM conversion failed for {src}: {result.stderr.strip()[:200]}")
+        if _keep_if_smaller(out_path, size):
+            variants["video/webm"] = os.path.relpath(out_path, static_dir).replace(os.sep, "/")
+    return {"animated": True, "variants": variants}
+
+
+# ----------------------
+# Text assets
+# ----------------------
+def build_text(src: str, out_base: str, static_dir: str) -> dict:
+    with open(src, "rb") as f:
+        data = f.read()
+    encodings = {}
+    out_path = out_base + ".gz"
+    with open(out_path, "wb") as f:
+        f.write(gzip.compress(data, 9, mtime=0))
+    if _keep_if_smaller(out_path, len(data)):
+        encodings["gzip"] = os.path.relpath(out_path, static_dir).replace(os.sep, "/")
+    if BROTLI_AVAILABLE:
+        out_path = out_base + ".br"
+        with open(out_path, "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        if _keep_if_smaller(out_path, len(data)):
+            encodings["br"] = os.path.relpath(out_path, static_dir).replace(os.sep, "/")
+    return {"encodings": encodings}
+
+
+# ----------------------
+# Build
+# ----------------------
+def _sources(static_dir: str):
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = os.path.relpath(root, static_dir)
+        if rel_root == ".":
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in sorted(files):
+            ext = os.path.splitext(name)[1].lower()
+            if ext in IMAGE_EXTENSIONS or ext in TEXT_EXTENSIONS or ext == ".gif":
+                path = os.path.join(root, name)
+                yield path, os.path.relpath(path, static_dir).replace(os.sep, "/"), ext
+
+
+def build(static_dir: str = STATIC_DIR, force: bool = False) -> dict:
+    """Build variants for every static source; returns the manifest written."""
+    build_dir = os.path.join(static_dir, BUILD_SUBDIR)
+    manifest_path = os.path.join(build_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    manifest = {}
+    built = skipped = 0
+    for src, rel, ext in _sources(static_dir):
+        digest = _content_hash(src)
+        old = previous.get(rel)
+        if not force and old and old.get("hash") == digest and all(
+            os.path.exists(os.path.join(static_dir, p)) for p in _entry_paths(old)
+        ):
+            manifest[rel] = old
+            skipped += 1
+            continue
+
+        out_base = os.path.join(build_dir, rel)
+        os.makedirs(os.path.dirname(out_base), exist_ok=True)
+        try:
+            if ext in TEXT_EXTENSIONS:
+                entry = build_text(src, out_base, static_dir)
+            elif not PIL_AVAILABLE:
+                continue
+            elif ext == ".gif":
+                entry = build_gif(src, os.path.splitext(out_base)[0], static_dir)
+            else:
+                entry = build_image(src, rel, os.path.splitext(out_base)[0], static_dir)
+        except Exception as e:
+            print(f"⚠️ Asset build failed for {rel}: {e}")
+            continue
+        entry["hash"] = digest
+        manifest[rel] = entry
+        built += 1
+
+    os.makedirs(build_dir, exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    print(f"🗜️ Static assets: {built} built, {skipped} unchanged ({manifest_path})")
+    return manifest
+
+
+def _entry_paths(entry: dict) -> list:
+    paths = list(entry.get("variants", {}).values()) + list(entry.get("encodings", {}).values())
+    for formats in entry.get("thumbs", {}).values():
+        paths.extend(formats.values())
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build compressed and resized static asset variants")
+    parser.add_argument("--static-dir", default=STATIC_DIR, help="Static folder to process")
+    parser.add_argument("--force", action="store_true", help="Rebuild unchanged sources too")
+    args = parser.parse_args()
+    if not PIL_AVAILABLE:
+        print("⚠️ Pillow is not installed: only CSS/JS compression will run")
+    if not BROTLI_AVAILABLE:
+        print("⚠️ brotli is not installed: writing gzip copies only")
+    build(args.static_dir, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
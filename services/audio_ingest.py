@@ -0,0 +1,102 @@
+# services/audio_ingest.py
+"""
+Decode uploaded audio bytes straight into the 16 kHz mono float32 array
+WhisperModel.transcribe() accepts, without temp-file round trips.
+
+Order of decoders:
+  1. PCM WAV           -> stdlib wave + NumPy (no codecs needed)
+  2. everything else   -> PyAV from memory (ships with faster-whisper)
+  3. last resort       -> pydub/ffmpeg, which spools to temp files itself
+"""
+
+import io
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(Exception):
+    """Raised when no decoder could read the uploaded audio."""
+
+
+def _resample(samples: np.ndarray, src_rate: int, dst_rate: int = SAMPLE_RATE) -> np.ndarray:
+    if src_rate == dst_rate or samples.size == 0:
+        return samples
+    duration = samples.size / src_rate
+    dst_len = int(round(duration * dst_rate))
+    src_t = np.linspace(0.0, duration, num=samples.size, endpoint=False)
+    dst_t = np.linspace(0.0, duration, num=dst_len, endpoint=False)
+    return np.interp(dst_t, src_t, samples).astype(np.float32)
+
+
+def _decode_wav(data: bytes) -> np.ndarray | None:
+    """PCM 8/16/32-bit WAV; returns None for anything wave can't parse."""
+    try:
+        with wave.open(io.BytesIO(data)) as wf:
+            channels, width, rate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+            frames = wf.readframes(wf.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(width)
+    if dtype is None:
+        return None
+    samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    if width == 1:
+        samples = (samples - 128.0) / 128.0
+    else:
+        samples /= float(1 << (8 * width - 1))
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return _resample(samples, rate)
+
+
+def _decode_pyav(data: bytes) -> np.ndarray:
+    from faster_whisper.audio import decode_audio
+    return decode_audio(io.BytesIO(data), sampling_rate=SAMPLE_RATE)
+
+
+def _decode_ffmpeg(data: bytes, ext: str) -> np.ndarray:
+    from pydub import AudioSegment
+    seg = AudioSegment.from_file(io.BytesIO(data), format=ext or None)
+    seg = seg.set_channels(1).set_frame_rate(SAMPLE_RATE)
+    samples = np.array(seg.get_array_of_samples()).astype(np.float32)
+    return samples / float(1 << (8 * seg.sample_width - 1))
+
+
+def decode_audio_bytes(data: bytes, ext: str = "") -> tuple[np.ndarray, dict]:
+    """
+    Returns (float32 mono 16 kHz samples, info) where info has the decoder
+    used and per-stage timings in milliseconds.
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio upload")
+
+    ext = (ext or "").lower().lstrip(".")
+    timings = {}
+    errors = []
+    attempts = []
+    if ext == "wav":
+        attempts.append(("wave", lambda: _decode_wav(data)))
+    attempts.append(("pyav", lambda: _decode_pyav(data)))
+    attempts.append(("ffmpeg", lambda: _decode_ffmpeg(data, ext)))
+
+    for name, decode in attempts:
+        started = time.perf_counter()
+        try:
+            samples = decode()
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            samples = None
+        timings[f"decode_{name}_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if samples is not None:
+            samples = np.ascontiguousarray(samples, dtype=np.float32)
+            return samples, {
+                "decoder": name,
+                "duration_s": round(samples.size / SAMPLE_RATE, 2),
+                "timings": timings,
+            }
+
+    raise AudioDecodeError("; ".join(errors) or "Unsupported audio format")
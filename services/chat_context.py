@@ -0,0 +1,131 @@
+# services/chat_context.py
+"""
+Prompt context for BoonyChat replies with a fixed token budget.
+
+The prompt is the system prompt, a running summary of the older part of
+the conversation, and the most recent messages verbatim, newest first, as
+far as CHAT_CONTEXT_TOKEN_BUDGET allows. Its size therefore stops growing
+with the length of the session.
+
+Messages older than the last CHAT_CONTEXT_RECENT_TURNS turns are folded
+into the summary once CHAT_SUMMARY_BATCH_MESSAGES of them are waiting.
+Each fold is one short completion that updates the previous summary with
+just those messages, and it runs beside the reply instead of in front of it.
+A conversation has at most one fold running; one that outlasts its turn is
+applied on a later turn rather than started again.
+Folded messages are marked 'summarized' and never sent verbatim again.
+Until a fold lands they stay in the verbatim window, budget permitting.
+
+Tokens are counted with tiktoken (listed in requirements.txt). Without it
+they are estimated from the text length (about 4 characters per token).
+
+Environment:
+    CHAT_CONTEXT_RECENT_TURNS     user+assistant turns always kept verbatim
+    CHAT_CONTEXT_TOKEN_BUDGET     prompt tokens per reply request
+    CHAT_SUMMARY_BATCH_MESSAGES   pending old messages that trigger a fold
+"""
+
+import os
+
+TIKTOKEN_AVAILABLE = False
+try:
+    import tiktoken  # type: ignore
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    TIKTOKEN_AVAILABLE = False
+
+CHAT_CONTEXT_RECENT_TURNS = int(os.getenv("CHAT_CONTEXT_RECENT_TURNS", "3"))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1200"))
+CHAT_SUMMARY_BATCH_MESSAGES = int(os.getenv("CHAT_SUMMARY_BATCH_MESSAGES", "4"))
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators per chat message
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        try:
+            if _encoding is None:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            return len(_encoding.encode(text))
+        except Exception:
+            pass
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ChatContextManager:
+    def __init__(self, recent_turns: int = CHAT_CONTEXT_RECENT_TURNS,
+                 token_budget: int = CHAT_CONTEXT_TOKEN_BUDGET,
+                 summary_batch: int = CHAT_SUMMARY_BATCH_MESSAGES):
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_batch = summary_batch
+
+    def build_messages(self, system_prompt: str, conversation: dict, user_message: str) -> list:
+        """
+        Chat messages for a reply request. The conversation's last message is
+        the current user message; it is always sent, as is the system prompt.
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        summary = conversation.get("summary")
+        if summary:
+            messages.append({"role": "system", "content": f"Earlier in this conversation: {summary}"})
+        current = {"role": "user", "content": user_message}
+
+        remaining = self.token_budget - sum(message_tokens(m) for m in messages) - message_tokens(current)
+        history = [m for m in conversation.get("messages", [])[:-1] if not m.get("summarized")]
+        verbatim = []
+        for msg in reversed(history):
+            cost = message_tokens(msg)
+            if cost > remaining:
+                break
+            remaining -= cost
+            verbatim.append({"role": msg["role"], "content": msg["content"]})
+
+        return messages + verbatim[::-1] + [current]
+
+    def pending_fold(self, conversation: dict) -> list:
+        """Unsummarized messages older than the recent turns, once enough have built up."""
+        history = conversation.get("messages", [])[:-1]  # the current message is never folded
+        keep = self.recent_turns * 2
+        older = history[:-keep] if keep else history
+        pending = [m for m in older if not m.get("summarized")]
+        return pending if len(pending) >= self.summary_batch else []
+
+    def summarize(self, client, previous_summary: str, messages: list) -> str:
+        """Updated running summary covering previous_summary plus messages."""
+        transcript = "\n".join(f"{m['role'].title()}: {m['content']}" for m in messages)
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You maintain a running summary of an English practice conversation between "
+                               "a learner (User) and Boony (Assistant). Merge the new exchanges into the "
+                               "existing summary. Keep facts the learner shared, questions still open and "
+                               "the current thread of the conversation. At most 80 words, plain prose."
+                },
+                {
+                    "role": "user",
+                    "content": f"Existing summary:\n{previous_summary or '(none)'}\n\nNew exchanges:\n{transcript}"
+                }
+            ],
+            max_tokens=160,
+            temperature=0.2
+        )
+        return response.choices[0].message.content.strip()
+
+    @staticmethod
+    def apply_fold(conversation: dict, folded: list, summary: str):
+        """Store the new summary and mark the folded messages."""
+        conversation["summary"] = summary
+        for msg in folded:
+            msg["summarized"] = True
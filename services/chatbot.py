@@ -7,15 +7,39 @@ Provides AI-powered conversation with topic selection and live corrections
 
 import openai
 import json
+import os
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
-from typing import List, Dict, Optional
-from models import Progress, User
+from typing import Iterator, List, Dict, Optional
+from models import User
+from services.progress import current_day_num, recent_progress as recent_progress_rows
 from core.openai_helper import client as openai_client
+from services.conversation_store import ConversationStore, create_conversation_store
+from services.chat_context import ChatContextManager
+
+# Grammar check runs beside the reply; a slow check is dropped, not waited for
+CHAT_GRAMMAR_TIMEOUT_SECONDS = float(os.getenv("CHAT_GRAMMAR_TIMEOUT_SECONDS", "6"))
+CHAT_WORKERS = int(os.getenv("CHAT_WORKERS", "8"))
+_chat_executor = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix="chat-grammar")
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
 
 class BoonyChat:
-    def __init__(self):
+    def __init__(self, store: Optional[ConversationStore] = None):
         self.client = openai_client
+        # Active conversations live in a shared, bounded store (see services/conversation_store.py)
+        self.store = store if store is not None else create_conversation_store()
+        # Recent turns verbatim + running summary, within a prompt token budget
+        self.context = ChatContextManager()
+        # user_id -> summary fold still running on the pool (collected on a later turn)
+        self._folds = {}
+        self._folds_lock = threading.Lock()
         self.conversation_topics = {
             'beginner': [
                 {'topic': 'Daily Routine', 'description': 'Talk about your daily activities and habits'},
@@ -33,24 +57,18 @@ class BoonyChat:
                 {'topic': 'Science & Future', 'description': 'Talk about scientific discoveries and future possibilities'}
             ]
         }
-        
-        self.conversation_history = {}
-        self.user_corrections = {}
     
     def get_user_level(self, user_id: str) -> str:
         """Determine user's English level based on progress and performance"""
         try:
-            progress = Progress.query.filter_by(user_id=user_id).order_by(Progress.day.desc()).first()
-            if not progress:
+            day_num = current_day_num(user_id)
+            if day_num is None:
                 return 'beginner'
             
-            # Extract day number from progress
-            day_num = int(progress.day.replace('Day-', ''))
-            
             # Enhanced level determination with performance metrics
             try:
                 # Get user's recent performance data
-                recent_progress = Progress.query.filter_by(user_id=user_id).order_by(Progress.day.desc()).limit(10).all()
+                recent_progress = recent_progress_rows(user_id, limit=10)
                 
                 if len(recent_progress) >= 3:
                     # Calculate average performance score
@@ -203,11 +221,13 @@ class BoonyChat:
         level = self.get_user_level(user_id)
         
         # Initialize conversation history
-        self.conversation_history[user_id] = {
+        conversation = {
             'topic': selected_topic,
             'level': level,
             'messages': [],
             'corrections': [],
+            'user_message_count': 0,
+            'user_word_count': 0,
             'start_time': datetime.now().isoformat()
         }
         
@@ -239,11 +259,12 @@ Start the conversation with a warm greeting and introduce the topic naturally.
             boony_message = response.choices[0].message.content.strip()
             
             # Store in conversation history
-            self.conversation_history[user_id]['messages'].append({
+            conversation['messages'].append({
                 'role': 'assistant',
                 'content': boony_message,
                 'timestamp': datetime.now().isoformat()
             })
+            self.store.save(user_id, conversation)
             
             return {
                 'success': True,
@@ -253,44 +274,210 @@ Start the conversation with a warm greeting and introduce the topic naturally.
             }
             
         except Exception as e:
+            self.store.save(user_id, conversation)
             return {
                 'success': False,
                 'error': f"Failed to start conversation: {str(e)}",
                 'message': f"Hi! I'm Boony, and I'm excited to talk with you about {selected_topic}! How are you doing today?"
             }
     
+    def _begin_turn(self, user_id: str, message: str) -> Optional[Dict]:
+        """Load the conversation and append the user's message (caller saves)"""
+        conversation = self.store.get(user_id)
+        if conversation is None:
+            return None
+        
+        # Add user message to history
+        conversation['messages'].append({
+            'role': 'user',
+            'content': message,
+            'timestamp': datetime.now().isoformat()
+        })
+        conversation['user_message_count'] = conversation.get('user_message_count', 0) + 1
+        conversation['user_word_count'] = conversation.get('user_word_count', 0) + len(message.split())
+        return conversation
+    
+    def _submit_grammar(self, message: str, level: str):
+        """Start the grammar check on the pool; returns its future"""
+        def timed_grammar():
+            started = time.perf_counter()
+            return self.analyze_grammar(message, level), _elapsed_ms(started)
+        
+        return _chat_executor.submit(timed_grammar)
+    
+    def _collect_grammar(self, grammar_future, turn_started: float, timings: Dict) -> tuple:
+        """Wait for whatever is left of the grammar budget; returns (corrections, timed_out)"""
+        remaining = CHAT_GRAMMAR_TIMEOUT_SECONDS - (time.perf_counter() - turn_started)
+        try:
+            corrections, timings["grammar_ms"] = grammar_future.result(timeout=max(remaining, 0))
+            return corrections, False
+        except FutureTimeout:
+            timings["grammar_ms"] = None
+            print(f"⚠️ Grammar check exceeded {CHAT_GRAMMAR_TIMEOUT_SECONDS}s; replying without corrections")
+            return [], True
+        except Exception as e:
+            print(f"Error analyzing grammar: {e}")
+            return [], False
+    
+    @staticmethod
+    def _message_key(msg: Dict) -> tuple:
+        return msg['role'], msg.get('timestamp'), msg['content']
+    
+    def _submit_fold(self, user_id: str, conversation: Dict):
+        """Fold old messages into the running summary on the pool, unless this user's last fold is still running"""
+        # Check and claim the user's slot in one step, so two tabs cannot both start a fold
+        with self._folds_lock:
+            if user_id in self._folds:
+                return
+            pending = self.context.pending_fold(conversation)
+            if not pending:
+                return
+            previous_summary = conversation.get('summary', '')
+            snapshot = [{'role': m['role'], 'content': m['content']} for m in pending]
+            
+            def timed_fold():
+                started = time.perf_counter()
+                return self.context.summarize(self.client, previous_summary, snapshot), _elapsed_ms(started)
+            
+            self._folds[user_id] = (_chat_executor.submit(timed_fold), previous_summary,
+                                    [self._message_key(m) for m in pending])
+    
+    def _collect_fold(self, user_id: str, conversation: Dict, turn_started: float, timings: Dict):
+        """Apply this user's fold once it finishes; a slow one is collected on a later turn, a failed one retried"""
+        with self._folds_lock:
+            fold = self._folds.get(user_id)
+        if fold is None:
+            return
+        future, previous_summary, keys = fold
+        remaining = CHAT_GRAMMAR_TIMEOUT_SECONDS - (time.perf_counter() - turn_started)
+        try:
+            summary, timings["summary_ms"] = future.result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            timings["summary_ms"] = None
+            return
+        except Exception as e:
+            print(f"⚠️ Chat summary update failed: {e}")
+            summary = None
+        with self._folds_lock:
+            self._folds.pop(user_id, None)
+        if not summary or conversation.get('summary', '') != previous_summary:
+            return
+        # The conversation may have been reloaded since the fold started: mark its copies of the messages
+        by_key = {self._message_key(m): m for m in conversation['messages']}
+        folded = [by_key[key] for key in keys if key in by_key]
+        if len(folded) == len(keys):
+            self.context.apply_fold(conversation, folded, summary)
+    
     def process_user_message(self, user_id: str, message: str) -> Dict:
         """Process user message and generate AI response with corrections"""
-        if user_id not in self.conversation_history:
+        conversation = self._begin_turn(user_id, message)
+        if conversation is None:
             return {
                 'success': False,
                 'error': 'No active conversation found. Please start a new conversation.'
             }
         
-        conversation = self.conversation_history[user_id]
         topic = conversation['topic']
         level = conversation['level']
         
-        # Add user message to history
-        conversation['messages'].append({
-            'role': 'user',
-            'content': message,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Analyze message for corrections
-        corrections = self.analyze_grammar(message, level)
+        # Grammar check on the pool while the reply is generated here: the
+        # turn takes max(grammar, reply) instead of grammar + reply
+        turn_started = time.perf_counter()
+        timings = {}
+        grammar_future = self._submit_grammar(message, level)
+        self._submit_fold(user_id, conversation)
         
         # Generate Boony's response
-        response_data = self.generate_response(user_id, message, topic, level)
+        stage_started = time.perf_counter()
+        response_data = self.generate_response(user_id, message, topic, level, conversation)
+        timings["reply_ms"] = _elapsed_ms(stage_started)
+        
+        # Analyze message for corrections (whatever is left of the grammar budget)
+        corrections, timed_out = self._collect_grammar(grammar_future, turn_started, timings)
+        if timed_out:
+            response_data['grammar_timed_out'] = True
+        self._collect_fold(user_id, conversation, turn_started, timings)
+        timings["total_ms"] = _elapsed_ms(turn_started)
+        response_data['timings'] = timings
+        print(f"⏱️ chat turn [{level}]: {timings}")
         
         # Add corrections to response if any
         if corrections:
             conversation['corrections'].extend(corrections)
             response_data['corrections'] = corrections
         
+        self.store.save(user_id, conversation)
         return response_data
     
+    def process_user_message_stream(self, user_id: str, message: str) -> Iterator[Dict]:
+        """
+        Streaming variant of process_user_message. Yields
+        {'type': 'token', 'text': ...} as the reply is generated, then one
+        {'type': 'done', ...} with the full message, corrections and timings
+        (ttft_ms = time to first token). The reply is saved to the
+        conversation when the stream closes, also if the client went away.
+        """
+        conversation = self._begin_turn(user_id, message)
+        if conversation is None:
+            yield {'type': 'error', 'error': 'No active conversation found. Please start a new conversation.'}
+            return
+        
+        level = conversation['level']
+        turn_started = time.perf_counter()
+        timings = {}
+        grammar_future = self._submit_grammar(message, level)
+        self._submit_fold(user_id, conversation)
+        
+        parts = []
+        fallback = False
+        try:
+            try:
+                for token in self.stream_response(message, conversation['topic'], level, conversation):
+                    if not parts:
+                        timings["ttft_ms"] = _elapsed_ms(turn_started)
+                    parts.append(token)
+                    yield {'type': 'token', 'text': token}
+            except Exception as e:
+                print(f"❌ Chat stream error: {e}")
+                if not parts:
+                    fallback = True
+                    parts = [random.choice(self.FALLBACK_RESPONSES)]
+                    yield {'type': 'token', 'text': parts[0]}
+            boony_response = "".join(parts).strip()
+            timings["reply_ms"] = _elapsed_ms(turn_started)
+            
+            corrections, timed_out = self._collect_grammar(grammar_future, turn_started, timings)
+            if corrections:
+                conversation['corrections'].extend(corrections)
+            self._collect_fold(user_id, conversation, turn_started, timings)
+            timings["total_ms"] = _elapsed_ms(turn_started)
+            print(f"⏱️ chat turn (stream) [{level}]: {timings}")
+            
+            done = {
+                'type': 'done',
+                'success': True,
+                'message': boony_response,
+                'timestamp': datetime.now().isoformat(),
+                'timings': timings,
+            }
+            if corrections:
+                done['corrections'] = corrections
+            if timed_out:
+                done['grammar_timed_out'] = True
+            if fallback:
+                done['fallback'] = True
+            yield done
+        finally:
+            # Runs on normal completion and on client disconnect (GeneratorExit)
+            reply = "".join(parts).strip()
+            if reply:
+                conversation['messages'].append({
+                    'role': 'assistant',
+                    'content': reply,
+                    'timestamp': datetime.now().isoformat()
+                })
+            self.store.save(user_id, conversation)
+    
     def analyze_grammar(self, message: str, level: str) -> List[Dict]:
         """Enhanced grammar analysis with better error detection"""
         correction_prompt = f"""
@@ -383,16 +570,16 @@ Keep explanations simple and encouraging for language learners.
             print(f"Error analyzing grammar: {e}")
             return []
     
-    def generate_response(self, user_id: str, user_message: str, topic: str, level: str) -> Dict:
-        """Generate Boony's conversational response"""
-        conversation = self.conversation_history[user_id]
-        recent_messages = conversation['messages'][-6:]  # Last 6 messages for context
-        
-        # Build conversation context
-        context_messages = [
-            {
-                "role": "system",
-                "content": f"""
+    FALLBACK_RESPONSES = [
+        "That's interesting! Can you tell me more about that?",
+        "I'd love to hear more about your thoughts on this!",
+        "That sounds fascinating! What do you think about it?",
+        "Great point! How do you feel about that?"
+    ]
+    
+    def _reply_context(self, user_message: str, topic: str, level: str, conversation: Dict) -> List[Dict]:
+        """System prompt, running summary, recent history and the current message for a reply"""
+        system_prompt = f"""
 You are Boony, a friendly English learning assistant having a natural conversation about "{topic}" with a {level} level English learner.
 
 Guidelines:
@@ -404,21 +591,14 @@ Guidelines:
 - Show genuine interest in their responses
 - Don't mention grammar corrections directly in conversation
 """
-            }
-        ]
-        
-        # Add recent conversation history
-        for msg in recent_messages[:-1]:  # Exclude the current message
-            context_messages.append({
-                "role": msg['role'],
-                "content": msg['content']
-            })
-        
-        # Add current user message
-        context_messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        return self.context.build_messages(system_prompt, conversation, user_message)
+    
+    def generate_response(self, user_id: str, user_message: str, topic: str, level: str,
+                          conversation: Optional[Dict] = None) -> Dict:
+        """Generate Boony's conversational response; appends it to `conversation` (caller saves)"""
+        if conversation is None:
+            conversation = self.store.get(user_id) or {'messages': []}
+        context_messages = self._reply_context(user_message, topic, level, conversation)
         
         try:
             response = self.client.chat.completions.create(
@@ -444,14 +624,7 @@ Guidelines:
             }
             
         except Exception as e:
-            fallback_responses = [
-                "That's interesting! Can you tell me more about that?",
-                "I'd love to hear more about your thoughts on this!",
-                "That sounds fascinating! What do you think about it?",
-                "Great point! How do you feel about that?"
-            ]
-            
-            fallback_message = random.choice(fallback_responses)
+            fallback_message = random.choice(self.FALLBACK_RESPONSES)
             
             conversation['messages'].append({
                 'role': 'assistant',
@@ -466,13 +639,37 @@ Guidelines:
                 'fallback': True
             }
     
+    def stream_response(self, user_message: str, topic: str, level: str, conversation: Dict) -> Iterator[str]:
+        """Boony's reply as text deltas from a stream=True completion (caller records it)"""
+        stream = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=self._reply_context(user_message, topic, level, conversation),
+            max_tokens=150,
+            temperature=0.7,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+    
     def get_conversation_summary(self, user_id: str) -> Dict:
         """Generate an enhanced conversation summary with learning insights"""
-        if user_id not in self.conversation_history:
+        conversation = self.store.get(user_id)
+        if conversation is None:
             return {'success': False, 'error': 'No conversation found'}
         
-        conversation = self.conversation_history[user_id]
+        # Only the recent message window is stored; counts are kept alongside it
         user_messages = [msg for msg in conversation['messages'] if msg['role'] == 'user']
+        user_message_count = conversation.get('user_message_count', len(user_messages))
+        user_word_count = conversation.get('user_word_count', sum(len(msg['content'].split()) for msg in user_messages))
         total_corrections = len(conversation.get('corrections', []))
         
         try:
@@ -502,7 +699,7 @@ Format as a friendly, motivating summary in 3-4 sentences."""
                     },
                     {
                         "role": "user",
-                        "content": f"Topic: {conversation['topic']}\n\nConversation ({len(user_messages)} user messages):\n{messages_text}"
+                        "content": f"Topic: {conversation['topic']}\n\nConversation ({user_message_count} user messages):\n{messages_text}"
                     }
                 ],
                 max_tokens=250,
@@ -515,14 +712,14 @@ Format as a friendly, motivating summary in 3-4 sentences."""
                 'success': True,
                 'topic': conversation['topic'],
                 'level': conversation['level'],
-                'total_messages': len(user_messages),
+                'total_messages': user_message_count,
                 'total_corrections': total_corrections,
                 'duration': conversation.get('start_time'),
                 'corrections': conversation.get('corrections', []),
                 'ai_summary': ai_summary,
                 'stats': {
-                    'words_practiced': sum(len(msg['content'].split()) for msg in user_messages),
-                    'avg_message_length': round(sum(len(msg['content'].split()) for msg in user_messages) / len(user_messages), 1) if user_messages else 0
+                    'words_practiced': user_word_count,
+                    'avg_message_length': round(user_word_count / user_message_count, 1) if user_message_count else 0
                 }
             }
             
@@ -533,11 +730,11 @@ Format as a friendly, motivating summary in 3-4 sentences."""
                 'success': True,
                 'topic': conversation['topic'],
                 'level': conversation['level'],
-                'total_messages': len(user_messages),
+                'total_messages': user_message_count,
                 'total_corrections': total_corrections,
                 'duration': conversation.get('start_time'),
                 'corrections': conversation.get('corrections', []),
-                'summary': f"Great conversation practice about {conversation['topic']}! You exchanged {len(user_messages)} messages and practiced your English skills. Keep up the good work!"
+                'summary': f"Great conversation practice about {conversation['topic']}! You exchanged {user_message_count} messages and practiced your English skills. Keep up the good work!"
             }
     
     def end_conversation(self, user_id: str) -> Dict:
@@ -545,8 +742,7 @@ Format as a friendly, motivating summary in 3-4 sentences."""
         summary = self.get_conversation_summary(user_id)
         
         # Clear conversation history
-        if user_id in self.conversation_history:
-            del self.conversation_history[user_id]
+        self.store.delete(user_id)
         
         return summary
 
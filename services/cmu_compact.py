@@ -0,0 +1,234 @@
+# services/cmu_compact.py
+"""
+Compact, memory-mapped CMU Pronouncing Dictionary.
+
+`python -m services.cmu_compact` compiles CMU into one binary file
+(data/cmudict/cmudict.bin by default):
+
+    b"CMUC" | uint32 header length | JSON header | sections
+    sections (little-endian, 4-byte aligned):
+        word_offsets   uint32[n + 1]   into word_blob
+        phone_offsets  uint32[n + 1]   into phones
+        phones         uint8[total]    phoneme-symbol ids (first variant only)
+        word_blob      bytes           sorted UTF-8 words, concatenated
+
+At runtime the file is mmap'd read-only on first lookup, so forked/spawned
+workers share the same page-cache pages instead of each building a ~130k
+entry dict of lists, and nothing ever touches the network.
+
+Environment:
+    CMU_COMPACT_PATH   location of the compiled file
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+MAGIC = b"CMUC"
+FORMAT_VERSION = 1
+CMU_COMPACT_PATH = os.getenv(
+    "CMU_COMPACT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cmudict", "cmudict.bin"),
+)
+
+
+# ----------------------
+# Build
+# ----------------------
+def _read_cmu_source(source: str | None) -> dict:
+    """{word: [phoneme, ...]} (first variant) from a cmudict text file or NLTK's corpus."""
+    entries = {}
+    if source:
+        with open(source, encoding="latin-1") as f:
+            for line in f:
+                if not line.strip() or line.startswith(";;;"):
+                    continue
+                word, *phonemes = line.split("#", 1)[0].split()
+                word = word.lower()
+                if "(" in word:  # alternate pronunciation, e.g. "read(2)"
+                    continue
+                entries.setdefault(word, phonemes)
+        return entries
+
+    import nltk
+    nltk.download("cmudict", quiet=True)
+    from nltk.corpus import cmudict
+    for word, variants in cmudict.dict().items():
+        if variants:
+            entries[word.lower()] = variants[0]
+    return entries
+
+
+def _align(buf: bytearray):
+    buf.extend(b"\0" * (-len(buf) % 4))
+
+
+def build_compact_dict(entries: dict, out_path: str = CMU_COMPACT_PATH) -> dict:
+    """Write the compact file for {word: [phoneme, ...]}; returns the header."""
+    words = sorted(entries, key=lambda w: w.encode("utf-8"))
+    symbols = sorted({p for phs in entries.values() for p in phs})
+    if len(symbols) > 255:
+        raise ValueError(f"{len(symbols)} phoneme symbols do not fit in uint8 ids")
+    symbol_ids = {s: i for i, s in enumerate(symbols)}
+
+    encoded = [w.encode("utf-8") for w in words]
+    word_offsets = np.zeros(len(words) + 1, dtype="<u4")
+    word_offsets[1:] = np.cumsum([len(b) for b in encoded])
+    phone_offsets = np.zeros(len(words) + 1, dtype="<u4")
+    phone_offsets[1:] = np.cumsum([len(entries[w]) for w in words])
+    phones = np.fromiter((symbol_ids[p] for w in words for p in entries[w]), dtype=np.uint8,
+                         count=int(phone_offsets[-1]))
+
+    body = bytearray()
+    sections = {}
+    for name, data in (("word_offsets", word_offsets.tobytes()),
+                       ("phone_offsets", phone_offsets.tobytes()),
+                       ("phones", phones.tobytes()),
+                       ("word_blob", b"".join(encoded))):
+        _align(body)
+        sections[name] = [len(body), len(data)]
+        body.extend(data)
+
+    header = {"version": FORMAT_VERSION, "words": len(words), "symbols": symbols, "sections": sections}
+    header_bytes = json.dumps(header).encode("utf-8")
+    prefix = bytearray(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+    _align(prefix)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = f"{out_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(prefix)
+        f.write(body)
+    os.replace(tmp_path, out_path)
+    return header
+
+
+# ----------------------
+# Lookup
+# ----------------------
+class CompactCMUDict:
+    """Read-only lookups over the compiled file; mapped lazily on first use."""
+
+    def __init__(self, path: str = CMU_COMPACT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._mm = None
+        self.symbols = []
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if mm[:4] != MAGIC:
+                    raise ValueError("not a compact CMU dictionary")
+                (header_len,) = struct.unpack_from("<I", mm, 4)
+                header = json.loads(mm[8:8 + header_len])
+                start = 8 + header_len + (-(8 + header_len) % 4)
+
+                def section(name, dtype):
+                    offset, size = header["sections"][name]
+                    return np.frombuffer(mm, dtype=dtype, count=size // np.dtype(dtype).itemsize,
+                                         offset=start + offset)
+
+                self._word_offsets = section("word_offsets", "<u4")
+                self._phone_offsets = section("phone_offsets", "<u4")
+                self._phones = section("phones", np.uint8)
+                self._blob_start = start + header["sections"]["word_blob"][0]
+                self.symbols = header["symbols"]
+                self._mm = mm
+                print(f"✅ CMU dictionary mapped: {header['words']} words from {self.path}")
+            except FileNotFoundError:
+                print(f"⚠️ Compact CMU dictionary not found at {self.path}; "
+                      f"run `python -m services.cmu_compact` to build it")
+            except Exception as e:
+                print(f"⚠️ Could not load compact CMU dictionary {self.path}: {e}")
+            self._loaded = True
+
+    @property
+    def available(self) -> bool:
+        self._load()
+        return self._mm is not None
+
+    def __len__(self) -> int:
+        return len(self._word_offsets) - 1 if self.available else 0
+
+    def _word_at(self, i: int) -> bytes:
+        lo, hi = int(self._word_offsets[i]), int(self._word_offsets[i + 1])
+        return self._mm[self._blob_start + lo:self._blob_start + hi]
+
+    def index(self, word: str) -> int:
+        """Position of word in the sorted table, or -1."""
+        if not self.available:
+            return -1
+        key = word.lower().encode("utf-8")
+        lo, hi = 0, len(self._word_offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._word_offsets) - 1 and self._word_at(lo) == key:
+            return lo
+        return -1
+
+    def __contains__(self, word: str) -> bool:
+        return self.index(word) >= 0
+
+    def phoneme_ids(self, word: str) -> np.ndarray | None:
+        """Zero-copy uint8 view of the word's phoneme-symbol ids."""
+        i = self.index(word)
+        if i < 0:
+            return None
+        return self._phones[int(self._phone_offsets[i]):int(self._phone_offsets[i + 1])]
+
+    def phonemes(self, word: str) -> list | None:
+        ids = self.phoneme_ids(word)
+        if ids is None:
+            return None
+        return [self.symbols[i] for i in ids]
+
+
+_dicts = {}
+_dicts_lock = threading.Lock()
+
+
+def get_cmu_dict(path: str = CMU_COMPACT_PATH) -> CompactCMUDict:
+    """Process-wide CompactCMUDict per file path."""
+    with _dicts_lock:
+        cmu = _dicts.get(path)
+        if cmu is None:
+            cmu = _dicts[path] = CompactCMUDict(path)
+        return cmu
+
+
+def lookup_phonemes(word: str) -> list | None:
+    """First CMU pronunciation of word as phoneme strings, or None."""
+    return get_cmu_dict().phonemes(word)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the CMU Pronouncing Dictionary into a compact mmap file")
+    parser.add_argument("--source", help="cmudict text file (e.g. cmudict-0.7b); defaults to NLTK's cmudict corpus")
+    parser.add_argument("--out", default=CMU_COMPACT_PATH, help="Output path")
+    args = parser.parse_args()
+
+    entries = _read_cmu_source(args.source)
+    header = build_compact_dict(entries, args.out)
+    print(f"✅ Wrote {args.out}: {header['words']} words, {len(header['symbols'])} phoneme symbols, "
+          f"{os.path.getsize(args.out) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
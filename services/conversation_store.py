@@ -0,0 +1,198 @@
+# services/conversation_store.py
+"""
+Where BoonyChat keeps active conversations.
+
+A conversation is a plain dict (topic, level, messages, corrections, ...).
+Stores hand out copies: load with get(), change it, then save() it back.
+On save the message and correction lists are cut to the most recent
+CHAT_HISTORY_MAX_MESSAGES / CHAT_MAX_CORRECTIONS entries, and the dict is
+kept as zlib-compressed compact JSON, so one conversation costs a few KB
+however long the learner chats.
+
+Two implementations:
+    MemoryConversationStore    per-process LRU; fine for a single worker
+    DatabaseConversationStore  chat_conversations table in the app DB
+                               (SQLite offline, Postgres online), shared by
+                               every gunicorn worker
+
+Both drop conversations idle for longer than CHAT_IDLE_TIMEOUT_SECONDS, in a
+sweep that runs at most every CHAT_SWEEP_INTERVAL_SECONDS on a write.
+
+Environment:
+    CHAT_STORE                    "db" (default) or "memory"
+    CHAT_HISTORY_MAX_MESSAGES     messages kept per conversation
+    CHAT_MAX_CORRECTIONS          corrections kept per conversation
+    CHAT_IDLE_TIMEOUT_SECONDS     idle conversations are evicted after this
+    CHAT_SWEEP_INTERVAL_SECONDS   minimum time between eviction sweeps
+    CHAT_MEMORY_MAX_CONVERSATIONS LRU size of the in-memory store
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from models import db, ChatConversation, upsert_increment
+
+CHAT_STORE = os.getenv("CHAT_STORE", "db").lower()
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "40"))
+CHAT_MAX_CORRECTIONS = int(os.getenv("CHAT_MAX_CORRECTIONS", "50"))
+CHAT_IDLE_TIMEOUT_SECONDS = int(os.getenv("CHAT_IDLE_TIMEOUT_SECONDS", str(2 * 3600)))
+CHAT_SWEEP_INTERVAL_SECONDS = int(os.getenv("CHAT_SWEEP_INTERVAL_SECONDS", "300"))
+CHAT_MEMORY_MAX_CONVERSATIONS = int(os.getenv("CHAT_MEMORY_MAX_CONVERSATIONS", "2000"))
+
+
+def serialize(conversation: dict) -> bytes:
+    """Trim the message/correction windows and pack as compressed compact JSON."""
+    conversation = dict(conversation)
+    conversation["messages"] = conversation.get("messages", [])[-CHAT_HISTORY_MAX_MESSAGES:]
+    conversation["corrections"] = conversation.get("corrections", [])[-CHAT_MAX_CORRECTIONS:]
+    raw = json.dumps(conversation, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return zlib.compress(raw, 6)
+
+
+def deserialize(payload: bytes) -> dict:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+class ConversationStore(ABC):
+    """Interface: get/save/delete one conversation per user, sweep idle ones."""
+
+    def __init__(self, idle_timeout: int = CHAT_IDLE_TIMEOUT_SECONDS,
+                 sweep_interval: int = CHAT_SWEEP_INTERVAL_SECONDS):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+        self._sweep_lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, user_id) -> dict | None:
+        """A copy of the user's conversation, or None if there is none (or it went idle)."""
+
+    @abstractmethod
+    def save(self, user_id, conversation: dict):
+        """Store the conversation, replacing the previous one."""
+
+    @abstractmethod
+    def delete(self, user_id):
+        """Forget the user's conversation."""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Evict conversations idle past the timeout; returns how many."""
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            evicted = self.sweep()
+            if evicted:
+                print(f"🧹 Evicted {evicted} idle chat conversations")
+        except Exception as e:
+            print(f"⚠️ Chat conversation sweep failed: {e}")
+        finally:
+            self._sweep_lock.release()
+
+
+class MemoryConversationStore(ConversationStore):
+    """Per-process LRU of serialized conversations."""
+
+    def __init__(self, max_conversations: int = CHAT_MEMORY_MAX_CONVERSATIONS, **kwargs):
+        super().__init__(**kwargs)
+        self.max_conversations = max_conversations
+        self._items = OrderedDict()  # user_id -> (last_active, payload)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, user_id) -> dict | None:
+        key = str(user_id)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if time.time() - item[0] > self.idle_timeout:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            payload = item[1]
+        return deserialize(payload)
+
+    def save(self, user_id, conversation: dict):
+        payload = serialize(conversation)
+        with self._lock:
+            self._items[str(user_id)] = (time.time(), payload)
+            self._items.move_to_end(str(user_id))
+            while len(self._items) > self.max_conversations:
+                self._items.popitem(last=False)
+        self._maybe_sweep()
+
+    def delete(self, user_id):
+        with self._lock:
+            self._items.pop(str(user_id), None)
+
+    def sweep(self) -> int:
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            idle = [key for key, (last_active, _) in self._items.items() if last_active < cutoff]
+            for key in idle:
+                del self._items[key]
+        return len(idle)
+
+
+class DatabaseConversationStore(ConversationStore):
+    """
+    Conversations in the chat_conversations table. Each call runs in its own
+    short transaction on db.engine, independent of the request's session.
+    """
+
+    table = ChatConversation.__table__
+
+    def _cutoff(self) -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.idle_timeout)
+
+    def get(self, user_id) -> dict | None:
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.payload, self.table.c.updated_at)
+                .where(self.table.c.user_id == str(user_id))
+            ).first()
+        if row is None or row.updated_at < self._cutoff():
+            return None
+        return deserialize(row.payload)
+
+    def save(self, user_id, conversation: dict):
+        values = {
+            "payload": serialize(conversation),
+            "updated_at": datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+        # One INSERT ... ON CONFLICT (user_id) DO UPDATE: concurrent first saves can't collide
+        with db.engine.begin() as conn:
+            upsert_increment(ChatConversation, keys={"user_id": str(user_id)}, increments={},
+                             values=values, connection=conn)
+        self._maybe_sweep()
+
+    def delete(self, user_id):
+        with db.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.user_id == str(user_id)))
+
+    def sweep(self) -> int:
+        with db.engine.begin() as conn:
+            return conn.execute(self.table.delete().where(self.table.c.updated_at < self._cutoff())).rowcount
+
+
+def create_conversation_store(kind: str = CHAT_STORE) -> ConversationStore:
+    if kind == "memory":
+        return MemoryConversationStore()
+    if kind == "db":
+        return DatabaseConversationStore()
+    raise ValueError(f"Unknown CHAT_STORE: {kind!r} (expected 'db' or 'memory')")
@@ -0,0 +1,242 @@
+# services/credit_ledger.py
+"""
+Atomic credit increments for Progress.
+
+Every credit write goes through apply_credit_events(): per (user, day) one
+
+    INSERT INTO progress ... ON CONFLICT (user_id, day)
+    DO UPDATE SET listen = progress.listen + :n, ...
+
+so concurrent taps from the listen/speak pages can no longer overwrite each
+other, and no row is held locked across an ORM load/modify/commit round
+trip. Leaderboard totals are updated in the same transaction, and the
+user's cached progress snapshot is dropped after commit.
+
+apply_client_batch() takes the events the listen/speak pages buffer and
+flush to /api/credits/batch. Every event carries a client-generated id;
+ids are recorded in credit_event_receipts in the same transaction, so a
+batch re-sent after a timeout or a page-hide beacon is only counted once.
+Client deltas must lie in 1..CREDIT_EVENT_MAX_DELTA. An event with a bad
+id, day, activity or delta is returned under "rejected" and the rest of the
+batch is still applied.
+
+Environment:
+    CREDIT_BATCH_MAX_EVENTS        largest accepted batch
+    CREDIT_EVENT_MAX_DELTA         largest credit one client event may add
+    CREDIT_RECEIPT_RETENTION_DAYS  how long applied event ids are remembered
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from models import db, CreditEventReceipt, Progress, day_number, upsert_increment
+from services import leaderboard
+from services.progress import CREDIT_FIELDS, invalidate_progress
+
+
+CREDIT_BATCH_MAX_EVENTS = int(os.getenv("CREDIT_BATCH_MAX_EVENTS", "200"))
+CREDIT_EVENT_MAX_DELTA = int(os.getenv("CREDIT_EVENT_MAX_DELTA", "5"))
+CREDIT_RECEIPT_RETENTION_DAYS = int(os.getenv("CREDIT_RECEIPT_RETENTION_DAYS", "7"))
+PRUNE_EVERY_BATCHES = 500
+
+
+class CreditError(ValueError):
+    """Raised for events the ledger cannot apply (unknown activity, bad day/delta)."""
+
+
+def _activity_column(activity: str) -> str:
+    column = (activity or "").strip().lower().replace(" ", "_")
+    if column not in CREDIT_FIELDS:
+        raise CreditError(f"Unknown credit activity: {activity!r}")
+    return column
+
+
+def day_totals(user_id, days) -> dict:
+    """{day: {credit column: total}} for the given days that have a Progress row."""
+    table = Progress.__table__
+    rows = db.session.execute(
+        select(table.c.day, *(table.c[c] for c in CREDIT_FIELDS))
+        .where(table.c.user_id == str(user_id), table.c.day.in_(list(days)))
+    ).mappings()
+    return {row["day"]: {c: row[c] or 0 for c in CREDIT_FIELDS} for row in rows}
+
+
+def apply_credit_events(user_id, events: list[dict], commit: bool = True) -> dict:
+    """
+    Apply credit events in one transaction. Each event is
+    {"day", "activity", "delta", optional "last_stage", "last_statement"};
+    an event with no activity and no delta only records the position.
+    Deltas for the same day/activity are summed; last_stage/last_statement
+    come from the last event of each day that sets them.
+
+    Returns {day: {credit column: new total, ...}} for the days touched.
+    """
+    user_id = str(user_id)
+    now = datetime.now(timezone.utc)
+    per_day = {}  # day -> {"increments": {...}, "values": {...}}
+    leaderboard_deltas = {}
+
+    for event in events:
+        day = str(event.get("day") or "").strip()
+        if not day or day_number(day) is None:
+            raise CreditError(f"Invalid day: {event.get('day')!r}")
+        try:
+            delta = int(event.get("delta", 0) or 0)
+        except (TypeError, ValueError):
+            raise CreditError(f"Invalid credit delta: {event.get('delta')!r}")
+        entry = per_day.setdefault(day, {"increments": {}, "values": {}})
+        # An event without an activity only moves last_stage / last_statement
+        if event.get("activity") or delta:
+            column = _activity_column(event.get("activity"))
+            entry["increments"][column] = entry["increments"].get(column, 0) + delta
+            leaderboard_deltas[column] = leaderboard_deltas.get(column, 0) + delta
+        if event.get("last_stage"):
+            entry["values"]["last_stage"] = event["last_stage"]
+        if event.get("last_statement") is not None:
+            try:
+                entry["values"]["last_statement"] = int(event["last_statement"])
+            except (TypeError, ValueError):
+                pass
+
+    if not per_day:
+        return {}
+
+    try:
+        for day, entry in per_day.items():
+            upsert_increment(
+                Progress,
+                keys={"user_id": user_id, "day": day},
+                increments=entry["increments"],
+                values={**entry["values"], "day_num": day_number(day), "updated_at": now},
+                # New rows start every credit at 0, not at the karaoke/topic_speaker default of 10
+                insert_values={c: 0 for c in CREDIT_FIELDS},
+            )
+        for column, delta in leaderboard_deltas.items():
+            leaderboard.record_credits(user_id, column, delta, when=now)
+
+        totals = day_totals(user_id, per_day)
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        invalidate_progress(user_id)
+    return totals
+
+
+def add_credits(user_id, day, activity: str, delta: int, last_stage: str | None = None,
+                last_statement: int | None = None, commit: bool = True) -> dict:
+    """Single-event convenience wrapper; returns the day's credit totals."""
+    totals = apply_credit_events(user_id, [{
+        "day": day,
+        "activity": activity,
+        "delta": delta,
+        "last_stage": last_stage,
+        "last_statement": last_statement,
+    }], commit=commit)
+    return totals.get(str(day).strip(), {c: 0 for c in CREDIT_FIELDS})
+
+
+# ----------------------
+# Client batches
+# ----------------------
+_batch_count = 0
+_batch_lock = threading.Lock()
+
+
+def _parse_client_event(raw) -> tuple[str, dict]:
+    if not isinstance(raw, dict):
+        raise CreditError("Each event must be an object")
+    event_id = str(raw.get("id") or "").strip()
+    if not event_id or len(event_id) > 64:
+        raise CreditError("Each event needs an id of at most 64 characters")
+    activity = _activity_column(raw.get("activity"))
+    day = str(raw.get("day") or "").strip()
+    if not day or day_number(day) is None:
+        raise CreditError(f"Invalid day: {raw.get('day')!r}")
+    delta = raw.get("delta", 1)
+    # Clients only ever earn a credit or a few at a time; never trust a larger or negative delta
+    if isinstance(delta, bool) or not isinstance(delta, int) or not 1 <= delta <= CREDIT_EVENT_MAX_DELTA:
+        raise CreditError(f"Credit delta must be an integer from 1 to {CREDIT_EVENT_MAX_DELTA}")
+    return event_id, {
+        "day": day,
+        "activity": activity,
+        "delta": delta,
+        "last_stage": raw.get("stage") or activity.replace("_", " ").title(),
+        "last_statement": raw.get("statement_index"),
+    }
+
+
+def prune_receipts(older_than_days: int = CREDIT_RECEIPT_RETENTION_DAYS) -> int:
+    """Forget applied event ids older than the retention window; caller commits."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    table = CreditEventReceipt.__table__
+    return db.session.execute(table.delete().where(table.c.created_at < cutoff)).rowcount
+
+
+def apply_client_batch(user_id, raw_events: list) -> dict:
+    """
+    Apply an ordered list of client events
+    {id, day, activity, delta, statement_index, client_ts} in one transaction,
+    skipping ids that were already applied. Invalid events are left out
+    rather than failing the batch. Returns
+    {"applied": n, "duplicates": n, "rejected": [{"id", "error"}, ...],
+    "totals": {day: {...}}} where totals cover every day of the valid events.
+    """
+    global _batch_count
+    if not isinstance(raw_events, list):
+        raise CreditError("events must be a list")
+    if len(raw_events) > CREDIT_BATCH_MAX_EVENTS:
+        raise CreditError(f"At most {CREDIT_BATCH_MAX_EVENTS} events per batch")
+
+    user_id = str(user_id)
+    parsed, rejected = [], []
+    for raw in raw_events:
+        try:
+            parsed.append(_parse_client_event(raw))
+        except CreditError as e:
+            rejected.append({"id": raw.get("id") if isinstance(raw, dict) else None, "error": str(e)})
+    days = {event["day"] for _, event in parsed}
+
+    table = CreditEventReceipt.__table__
+    ids = list({event_id for event_id, _ in parsed})
+    seen = set(db.session.execute(
+        select(table.c.event_id).where(table.c.user_id == user_id, table.c.event_id.in_(ids))
+    ).scalars()) if ids else set()
+
+    fresh = []
+    for event_id, event in parsed:
+        if event_id not in seen:
+            seen.add(event_id)
+            fresh.append((event_id, event))
+
+    with _batch_lock:
+        _batch_count += 1
+        prune = _batch_count % PRUNE_EVERY_BATCHES == 0
+
+    try:
+        if fresh:
+            now = datetime.now(timezone.utc)
+            db.session.execute(table.insert(), [
+                {"user_id": user_id, "event_id": event_id, "created_at": now} for event_id, _ in fresh
+            ])
+            apply_credit_events(user_id, [event for _, event in fresh], commit=False)
+        if prune:
+            prune_receipts()
+        totals = day_totals(user_id, days)
+        db.session.commit()
+    except Exception:
+        # A concurrent re-send of the same ids fails on the receipts primary
+        # key and rolls back whole; the client retries and gets deduplicated.
+        db.session.rollback()
+        raise
+    finally:
+        invalidate_progress(user_id)
+
+    if rejected:
+        print(f"⚠️ Credit batch for {user_id}: rejected {len(rejected)} event(s): {rejected[0]['error']}")
+    return {"applied": len(fresh), "duplicates": len(parsed) - len(fresh), "rejected": rejected, "totals": totals}
@@ -0,0 +1,130 @@
+# services/daily_content.py
+"""
+Values that change once per UTC day (thought of the day, ...), served from
+memory.
+
+get() never touches the network. When the held value is from an earlier
+day, or there is none, get() returns what it has and starts one background
+fetch. Until the fetch succeeds, callers keep getting yesterday's value or
+the fallback. Fetched values are written to DAILY_CONTENT_PATH, so restarts
+and offline installs reuse the last good one. A failed fetch is retried
+after DAILY_CONTENT_RETRY_SECONDS.
+
+Environment:
+    DAILY_CONTENT_PATH            JSON file holding the last value per name
+    DAILY_CONTENT_RETRY_SECONDS   wait after a failed fetch
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+DAILY_CONTENT_PATH = os.getenv(
+    "DAILY_CONTENT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache", "daily_content.json"),
+)
+DAILY_CONTENT_RETRY_SECONDS = int(os.getenv("DAILY_CONTENT_RETRY_SECONDS", "900"))
+
+_file_lock = threading.Lock()
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _read_store(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_entry(path: str, name: str, entry: dict):
+    with _file_lock:
+        data = _read_store(path)
+        data[name] = entry
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+class DailyContent:
+    def __init__(self, name: str, fetch, fallback, path: str = DAILY_CONTENT_PATH):
+        """fetch() returns today's value or raises; fallback(date_str) is used until one arrives."""
+        self.name = name
+        self.fetch = fetch
+        self.fallback = fallback
+        self.path = path
+        self._lock = threading.Lock()
+        self._entry = _read_store(path).get(name)  # {"date", "value", "fetched_at"}
+        self._refreshing = False
+        self._last_failure = 0.0
+
+    def get(self):
+        today = _today()
+        entry = self._entry
+        if not entry or entry.get("date") != today:
+            self.refresh_async()
+        if entry and entry.get("value"):
+            return entry["value"]
+        return self.fallback(today)
+
+    def refresh_async(self) -> bool:
+        """Start a background fetch unless one is running or the last one just failed."""
+        with self._lock:
+            if self._refreshing or time.time() - self._last_failure < DAILY_CONTENT_RETRY_SECONDS:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True, name=f"daily-{self.name}").start()
+        return True
+
+    def _refresh(self):
+        try:
+            value = self.fetch()
+            if not value:
+                raise ValueError("empty response")
+            entry = {"date": _today(), "value": value, "fetched_at": datetime.now(timezone.utc).isoformat()}
+            self._entry = entry
+            _write_entry(self.path, self.name, entry)
+            print(f"✅ Daily content '{self.name}' refreshed for {entry['date']}")
+        except Exception as e:
+            self._last_failure = time.time()
+            print(f"⚠️ Daily content '{self.name}' refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+# ----------------------
+# Thought of the day
+# ----------------------
+THOUGHT_FALLBACKS = [
+    "Keep learning, keep growing.",
+    "Small steps daily → Big progress tomorrow.",
+    "Practice makes you confident.",
+    "Consistency > Intensity.",
+    "You don’t have to be perfect to start."
+]
+
+
+def _fetch_zenquote() -> str:
+    res = requests.get("https://zenquotes.io/api/today", timeout=4)
+    data = res.json()
+    if isinstance(data, list) and data:
+        return f"{data[0].get('q','Keep learning, keep growing.')} — {data[0].get('a','')}".strip()
+    raise ValueError(f"unexpected ZenQuotes payload: {str(data)[:80]}")
+
+
+def _fallback_thought(day: str) -> str:
+    # Same fallback all day rather than a new one per page view
+    return THOUGHT_FALLBACKS[datetime.fromisoformat(day).toordinal() % len(THOUGHT_FALLBACKS)]
+
+
+thought_of_day = DailyContent("thought_of_day", _fetch_zenquote, _fallback_thought)
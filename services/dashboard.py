@@ -0,0 +1,204 @@
+# services/dashboard.py
+"""
+Dashboard assembly.
+
+Most of the dashboard is the same for every learner:
+    - the poems of a day;
+    - the stars of the day and week;
+    - the daily tip;
+    - the thought of the day.
+Poems come from the shared poem catalog (services/poem_catalog.py), the
+rest from a small TTL fragment cache, so a render only reads the user's own
+progress snapshot and fills in the per-user pieces. When a fragment expires,
+one request recomputes it while concurrent ones wait for that result.
+
+Each part's time (and whether it was a cache hit) is collected in a timings
+dict that the route sends as a Server-Timing header.
+
+Environment:
+    DASHBOARD_STARS_TTL   seconds star of the day/week are reused
+    DASHBOARD_TIP_TTL     seconds a daily tip is shown before rotating
+"""
+
+import os
+import threading
+import time
+
+from flask import render_template
+
+from core.guide_helper import BoonyGuide
+from models import day_number
+from services import daily_content, leaderboard, poem_catalog
+from services.progress import CREDIT_FIELDS, get_progress_snapshot
+
+DASHBOARD_STARS_TTL = float(os.getenv("DASHBOARD_STARS_TTL", "60"))
+DASHBOARD_TIP_TTL = float(os.getenv("DASHBOARD_TIP_TTL", "3600"))
+
+
+class FragmentCache:
+    """Process-local {key: (computed_at, value)} with a TTL per lookup."""
+
+    def __init__(self):
+        self._items = {}
+        self._key_locks = {}  # key -> lock held while that key is recomputed
+        self._lock = threading.Lock()
+
+    def _fresh(self, key, ttl: float):
+        with self._lock:
+            item = self._items.get(key)
+        if item is not None and time.time() - item[0] < ttl:
+            return item
+        return None
+
+    def get(self, key, ttl: float, compute):
+        """(value, hit) for key, recomputing when older than ttl seconds; one caller per key recomputes."""
+        item = self._fresh(key, ttl)
+        if item is not None:
+            return item[1], True
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another request may have recomputed it while this one waited
+            item = self._fresh(key, ttl)
+            if item is not None:
+                return item[1], True
+            value = compute()
+            with self._lock:
+                self._items[key] = (time.time(), value)
+        return value, False
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+
+fragments = FragmentCache()
+
+
+def _timed(timings: dict, name: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    hit = None
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], bool):
+        result, hit = result
+    timings[name] = {"ms": round((time.perf_counter() - started) * 1000, 2)}
+    if hit is not None:
+        timings[name]["hit"] = hit
+    return result
+
+
+def server_timing(timings: dict) -> str:
+    """Server-Timing header value, e.g. 'poems;dur=0.02;desc="hit", render;dur=7.1'."""
+    parts = []
+    for name, t in timings.items():
+        part = f"{name};dur={t['ms']}"
+        if "hit" in t:
+            part += f';desc="{"hit" if t["hit"] else "miss"}"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+# ----------------------
+# Shared fragments
+# ----------------------
+def stars():
+    """({'day': {...}, 'week': {...}}, hit) star of the day and week."""
+    return fragments.get("stars", DASHBOARD_STARS_TTL, lambda: {
+        "day": leaderboard.star("day"),
+        "week": leaderboard.star("week"),
+    })
+
+
+def daily_tip(language: str = "hinglish"):
+    """(tip, hit): one tip per language per DASHBOARD_TIP_TTL instead of a new one per render."""
+    return fragments.get(("tip", language), DASHBOARD_TIP_TTL,
+                         lambda: BoonyGuide(language).get_daily_tip())
+
+
+# ----------------------
+# Per-user assembly
+# ----------------------
+def build_context(user, practice_day: str | None, timings: dict) -> dict:
+    """Template context for dashboard.html; fills timings per part."""
+    snapshot = _timed(timings, "progress", lambda: get_progress_snapshot(user.user_id))
+    if practice_day:
+        day = practice_day
+        progress_obj = snapshot.by_day.get(day)
+    elif snapshot.current:
+        progress_obj = snapshot.current
+        day = progress_obj.day
+    else:
+        progress_obj = None
+        day = "Day-1"
+    current_day_num = day_number(day) or 1
+
+    credits = snapshot.credits(day) if progress_obj else {field: 0 for field in CREDIT_FIELDS}
+    listen_done = bool(credits["listen"])
+    speak_done = bool(credits["speak"])
+    revision_done = bool(credits["revision"])
+    vocabulary_done = bool(credits["vocabulary"])
+
+    fun_practice_activities = {
+        "Karaoke": credits["karaoke"],
+        "Topic Speaker": credits["topic_speaker"],
+        "Antakshari": 0,
+        "Image Puzzle": 0,
+        "Vocabulary Forest": credits["vocabulary_forest"],
+        "Revision": credits["revision"],
+    }
+
+    day_poems = _timed(timings, "poems", lambda: poem_catalog.poems_for_day(current_day_num))
+    star_info = _timed(timings, "stars", stars)
+    tip = _timed(timings, "tip", daily_tip)
+    thought = _timed(timings, "thought", daily_content.thought_of_day.get)
+
+    guide = BoonyGuide()
+    user_context = {
+        "name": getattr(user, "full_name", None) or getattr(user, "username", "Learner"),
+        "day": day,
+        "listen_done": listen_done,
+        "speak_done": speak_done,
+        "revision_done": revision_done,
+        "vocabulary_done": vocabulary_done,
+        "is_practice_mode": bool(practice_day),
+    }
+    welcome_message = guide.get_welcome_message("dashboard", user_context)
+    encouragement = guide.get_encouragement_message(user_context)
+
+    return dict(
+        current_user=user,
+        credits=credits,
+        gender=getattr(user, "gender", ""),
+        voice=getattr(user, "voice", ""),
+        day=day,
+        current_day_num=current_day_num,
+        listen_active=True,
+        speak_active=listen_done,
+        revision_active=speak_done,
+        vocabulary_active=(current_day_num >= 7) and speak_done,
+        fun_practice_activities=fun_practice_activities,
+        day_poems=day_poems,
+        is_practice_mode=bool(practice_day),
+        guide_messages={"Welcome": welcome_message, "Tip": tip, "Encouragement": encouragement},
+        daily_tip=tip,
+        encouragement=encouragement,
+        can_progress_to_next_day=revision_done,
+        star_of_day_user_id=star_info["day"].get("user_id"),
+        star_of_week_user_id=star_info["week"].get("user_id"),
+        thought_of_day=thought,
+        actions=[],
+    )
+
+
+# ----------------------
+# Template rendering
+# ----------------------
+def render(name: str, context: dict, timings: dict) -> str:
+    """render_template() that adds 'render' to timings."""
+    started = time.perf_counter()
+    html = render_template(name, **context)
+    timings["render"] = {"ms": round((time.perf_counter() - started) * 1000, 2)}
+    return html
@@ -0,0 +1,110 @@
+# services/leaderboard.py
+"""
+Incrementally maintained leaderboard.
+
+Every credit write also adds its listen/speak/vocabulary delta to the
+writer's "day" and "week" rows in the leaderboard table, in the same
+transaction. Star of the day/week and the top-N list are then a short
+index walk over one period instead of a GROUP BY over all of progress.
+
+Periods use UTC dates; weeks start on Monday.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from models import db, LeaderboardEntry, Progress, User, upsert_increment
+
+# Activities that count towards the leaderboard (same as the old star query)
+LEADERBOARD_ACTIVITIES = ("listen", "speak", "vocabulary")
+PERIODS = ("day", "week")
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def period_start(period: str, day: date | None = None) -> date:
+    day = day or _today()
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def record_credits(user_id, activity: str, delta: int, when: datetime | None = None):
+    """
+    Add a credit delta to the user's day and week totals. Runs inside the
+    caller's transaction; the caller commits together with the Progress write.
+    """
+    if not delta or (activity or "").lower() not in LEADERBOARD_ACTIVITIES:
+        return
+    when = when or datetime.now(timezone.utc)
+    for period in PERIODS:
+        upsert_increment(
+            LeaderboardEntry,
+            keys={"period": period, "period_start": period_start(period, when.date()), "user_id": str(user_id)},
+            increments={"total": int(delta)},
+            values={"updated_at": when},
+        )
+
+
+def top(period: str = "day", limit: int = 10, day: date | None = None) -> list[dict]:
+    """Ranked [{rank, user_id, name, total}] for the period containing `day` (default today)."""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown leaderboard period: {period}")
+    rows = (
+        db.session.query(LeaderboardEntry.user_id, LeaderboardEntry.total, User.full_name, User.username)
+        .join(User, User.user_id == LeaderboardEntry.user_id)
+        .filter(
+            LeaderboardEntry.period == period,
+            LeaderboardEntry.period_start == period_start(period, day),
+            LeaderboardEntry.total > 0,
+        )
+        .order_by(LeaderboardEntry.total.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"rank": i, "user_id": row.user_id, "name": row.full_name or row.username or "—", "total": row.total}
+        for i, row in enumerate(rows, 1)
+    ]
+
+
+def star(period: str = "day") -> dict:
+    leaders = top(period, limit=1)
+    if leaders:
+        return {"name": leaders[0]["name"], "user_id": leaders[0]["user_id"]}
+    return {"name": "—", "user_id": None}
+
+
+def backfill() -> int:
+    """
+    Rebuild all leaderboard rows from Progress. Historical deltas are not
+    known, so each Progress row's listen+speak+vocabulary is credited to the
+    day (and week) of its updated_at, which is what the old star query
+    measured. Returns the number of rows written.
+    """
+    rows = db.session.query(
+        Progress.user_id,
+        Progress.updated_at,
+        (func.coalesce(Progress.listen, 0) + func.coalesce(Progress.speak, 0)
+         + func.coalesce(Progress.vocabulary, 0)).label("total"),
+    ).filter(Progress.updated_at.isnot(None))
+
+    totals = {}
+    for user_id, updated_at, total in rows.yield_per(1000):
+        if not total:
+            continue
+        for period in PERIODS:
+            key = (period, period_start(period, updated_at.date()), str(user_id))
+            totals[key] = totals.get(key, 0) + int(total)
+
+    LeaderboardEntry.query.delete(synchronize_session=False)
+    if totals:
+        db.session.execute(LeaderboardEntry.__table__.insert(), [
+            {"period": period, "period_start": start, "user_id": user_id, "total": total}
+            for (period, start, user_id), total in totals.items()
+        ])
+    db.session.commit()
+    return len(totals)
@@ -0,0 +1,151 @@
+# services/poem_catalog.py
+"""
+In-process catalog of the poems table.
+
+Every poem is loaded in one query that walks the (day, poem_order) index,
+and is kept as plain objects in two dicts:
+    - day -> poems of that day, in order;
+    - (day, poem_order) -> poem.
+The poem pages, the day listing, Twinkle Star and the dashboard all read from
+it, so a lookup is a dict access however many days the catalog covers.
+
+Any Poem change committed through the ORM (e.g. import_poems below) drops the
+catalog of this process (see the session hooks at the bottom). Other workers
+pick the change up within POEM_CATALOG_TTL.
+
+Import poems (JSON list of {day, poem_order, poem_name, poem_content, ...}):
+    python -m services.poem_catalog poems.json
+
+Environment:
+    POEM_CATALOG_TTL   seconds the catalog is reused before reloading (0 = every lookup)
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db, Poem
+
+POEM_CATALOG_TTL = float(os.getenv("POEM_CATALOG_TTL", "300"))
+
+POEM_FIELDS = ("poem_name", "poem_content", "poem_tune", "difficulty_level")
+
+
+class PoemCatalog:
+    """Read-only copy of the poems table, indexed by day and by (day, poem_order)."""
+
+    def __init__(self, rows: list):
+        self.by_day = {}
+        self.by_key = {}
+        for row in rows:
+            self.by_day.setdefault(row.day, []).append(row)
+            # First row wins, as Poem.query.filter_by(...).first() did
+            self.by_key.setdefault((row.day, row.poem_order), row)
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.by_key)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog() -> PoemCatalog:
+    table = Poem.__table__
+    result = db.session.execute(select(table).order_by(table.c.day, table.c.poem_order))
+    return PoemCatalog([SimpleNamespace(**row) for row in result.mappings()])
+
+
+def get_catalog() -> PoemCatalog:
+    global _catalog
+    with _catalog_lock:
+        catalog = _catalog
+    if catalog is not None and time.time() - catalog.loaded_at < POEM_CATALOG_TTL:
+        return catalog
+    catalog = _load_catalog()
+    with _catalog_lock:
+        _catalog = catalog
+    return catalog
+
+
+def poems_for_day(day: int) -> list:
+    """Poems of a day, ordered by poem_order (empty list if none)."""
+    return get_catalog().by_day.get(day, [])
+
+
+def get_poem(day: int, poem_order: int) -> SimpleNamespace | None:
+    return get_catalog().by_key.get((day, poem_order))
+
+
+def invalidate_catalog():
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+def import_poems(poems: list) -> tuple[int, int]:
+    """Insert or update poems keyed by (day, poem_order); returns (added, updated)."""
+    added = updated = 0
+    for data in poems:
+        day, order = int(data["day"]), int(data["poem_order"])
+        values = {field: data[field] for field in POEM_FIELDS if field in data}
+        poem = Poem.query.filter_by(day=day, poem_order=order).first()
+        if poem is None:
+            values.setdefault("difficulty_level", "nursery")
+            db.session.add(Poem(day=day, poem_order=order, **values))
+            added += 1
+        else:
+            for field, value in values.items():
+                setattr(poem, field, value)
+            updated += 1
+    db.session.commit()
+    return added, updated
+
+
+# Drop the catalog whenever a Poem row is committed through the ORM
+@event.listens_for(Session, "after_flush")
+def _collect_poem_writes(session, flush_context):
+    if any(isinstance(obj, Poem) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info["poems_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_poems(session):
+    if session.info.pop("poems_changed", False):
+        invalidate_catalog()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_poems(session, previous_transaction):
+    session.info.pop("poems_changed", None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import poems into the poems table")
+    parser.add_argument("path", help="JSON file with a list of poems")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        poems = json.load(f)
+
+    from flask import Flask
+    from config import Config
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        added, updated = import_poems(poems)
+        print(f"📜 Poems imported: {added} added, {updated} updated ({len(get_catalog())} in catalog)")
+
+
+if __name__ == "__main__":
+    main()
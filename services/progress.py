@@ -0,0 +1,189 @@
+# services/progress.py
+"""
+Shared Progress lookups.
+
+The learner's current day is the Progress row with the highest day_num.
+MAX(day_num) for one user is answered from the (user_id, day_num) index
+alone, so finding it no longer sorts the user's rows by the "Day-N" string
+(which also put Day-9 after Day-10).
+
+Read-heavy pages use get_progress_snapshot(): all of a user's rows in one
+query, memoised in flask.g for the request. A per-process cache across
+requests can be turned on with PROGRESS_SNAPSHOT_TTL. Any committed
+Progress change drops the user's cached snapshot (see the session hooks at
+the bottom); writes that bypass the ORM must call invalidate_progress()
+themselves. That invalidation only reaches the process that wrote, so with
+several workers (gunicorn -w N) another worker can serve stale credits for
+up to the TTL; keep it at 0 there.
+
+Environment:
+    PROGRESS_SNAPSHOT_TTL   seconds a snapshot is reused across requests (default 0 = per request only)
+"""
+
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from flask import g, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from models import db, Progress, day_number
+
+PROGRESS_SNAPSHOT_TTL = float(os.getenv("PROGRESS_SNAPSHOT_TTL", "0"))
+CREDIT_FIELDS = ("listen", "speak", "vocabulary", "revision", "karaoke", "topic_speaker", "vocabulary_forest")
+
+DEFAULT_DAY = "Day-1"
+
+
+def current_day_num(user_id) -> int | None:
+    """Highest day number the user has a Progress row for, or None."""
+    return (
+        db.session.query(func.max(Progress.day_num))
+        .filter(Progress.user_id == str(user_id))
+        .scalar()
+    )
+
+
+def get_current_progress(user_id) -> Progress | None:
+    """The user's Progress row for their current (highest) day."""
+    day_num = current_day_num(user_id)
+    if day_num is None:
+        return None
+    return Progress.query.filter_by(user_id=str(user_id), day_num=day_num).first()
+
+
+def get_current_day(user_id) -> str:
+    """The user's current day as stored ('Day-N'), or Day-1 for new users."""
+    day_num = current_day_num(user_id)
+    if day_num is None:
+        return DEFAULT_DAY
+    day = (
+        db.session.query(Progress.day)
+        .filter(Progress.user_id == str(user_id), Progress.day_num == day_num)
+        .limit(1)
+        .scalar()
+    )
+    return day or f"Day-{day_num}"
+
+
+def recent_progress(user_id, limit: int = 10) -> list[Progress]:
+    """The user's Progress rows, newest day first."""
+    return (
+        Progress.query.filter(Progress.user_id == str(user_id), Progress.day_num.isnot(None))
+        .order_by(Progress.day_num.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+# ----------------------
+# Per-user snapshot
+# ----------------------
+class ProgressSnapshot:
+    """Read-only copy of every Progress row of one user."""
+
+    def __init__(self, user_id, rows: list):
+        self.user_id = str(user_id)
+        self.rows = sorted(rows, key=lambda r: (r.day_num is None, r.day_num or 0))
+        self.by_day = {row.day: row for row in self.rows}
+        numbered = [row for row in self.rows if row.day_num is not None]
+        self.current = numbered[-1] if numbered else None
+        self.loaded_at = time.time()
+
+    @property
+    def current_day(self) -> str:
+        return self.current.day if self.current else DEFAULT_DAY
+
+    @property
+    def current_day_num(self) -> int:
+        return self.current.day_num if self.current else 1
+
+    def get(self, day) -> SimpleNamespace | None:
+        """Row for a day given as stored ('Day-3') or in any form day_number() understands."""
+        row = self.by_day.get(day)
+        if row is None:
+            num = day_number(day)
+            row = next((r for r in self.rows if r.day_num == num), None) if num is not None else None
+        return row
+
+    def credits(self, day=None) -> dict:
+        row = self.get(day) if day else self.current
+        return {field: (getattr(row, field, 0) or 0) if row else 0 for field in CREDIT_FIELDS}
+
+    def completed_days(self) -> list[str]:
+        """Days with listen/speak/vocabulary credits, oldest first, excluding the current day."""
+        current = self.current_day
+        return [
+            row.day for row in self.rows
+            if (row.listen or 0) + (row.speak or 0) + (row.vocabulary or 0) > 0 and row.day != current
+        ]
+
+
+_snapshots = {}  # user_id -> ProgressSnapshot
+_snapshots_lock = threading.Lock()
+
+
+def _load_snapshot(user_id: str) -> ProgressSnapshot:
+    table = Progress.__table__
+    result = db.session.execute(select(table).where(table.c.user_id == user_id))
+    return ProgressSnapshot(user_id, [SimpleNamespace(**row) for row in result.mappings()])
+
+
+def get_progress_snapshot(user_id) -> ProgressSnapshot:
+    """All Progress rows of a user, loaded at most once per request (and per TTL)."""
+    key = str(user_id)
+    request_cache = None
+    if has_app_context():
+        request_cache = g.setdefault("_progress_snapshots", {})
+        if key in request_cache:
+            return request_cache[key]
+
+    snapshot = None
+    if PROGRESS_SNAPSHOT_TTL > 0:
+        with _snapshots_lock:
+            snapshot = _snapshots.get(key)
+        if snapshot is not None and time.time() - snapshot.loaded_at > PROGRESS_SNAPSHOT_TTL:
+            snapshot = None
+    if snapshot is None:
+        snapshot = _load_snapshot(key)
+        if PROGRESS_SNAPSHOT_TTL > 0:
+            with _snapshots_lock:
+                _snapshots[key] = snapshot
+                if len(_snapshots) > 10000:
+                    # Drop the stalest half rather than growing without bound
+                    for stale in sorted(_snapshots, key=lambda k: _snapshots[k].loaded_at)[:5000]:
+                        _snapshots.pop(stale, None)
+
+    if request_cache is not None:
+        request_cache[key] = snapshot
+    return snapshot
+
+
+def invalidate_progress(user_id):
+    key = str(user_id)
+    with _snapshots_lock:
+        _snapshots.pop(key, None)
+    if has_app_context():
+        g.get("_progress_snapshots", {}).pop(key, None)
+
+
+# Drop cached snapshots whenever a Progress row is committed through the ORM
+@event.listens_for(Session, "after_flush")
+def _collect_progress_writes(session, flush_context):
+    touched = session.info.setdefault("progress_users", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Progress) and obj.user_id is not None:
+            touched.add(str(obj.user_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_progress(session):
+    for user_id in session.info.pop("progress_users", ()):
+        invalidate_progress(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_progress(session, previous_transaction):
+    session.info.pop("progress_users", None)
@@ -5,14 +5,38 @@ Supports all English words.
 """
 
 import difflib
-import nltk
+from functools import lru_cache
 
-# Download CMU dictionary if not already
-nltk.download('cmudict', quiet=True)
-from nltk.corpus import cmudict
+import numpy as np
 
-# Load CMU dictionary
-CMU_DICT = cmudict.dict()
+from services.cmu_compact import get_cmu_dict
+
+_nltk_cmu = None
+
+
+def _fallback_phonemes(word):
+    """
+    NLTK's cmudict, only if its data is already installed (never downloads).
+    Used until data/cmudict/cmudict.bin has been built.
+    """
+    global _nltk_cmu
+    if _nltk_cmu is None:
+        try:
+            from nltk.corpus import cmudict
+            _nltk_cmu = cmudict.dict()
+        except Exception:
+            _nltk_cmu = {}
+    variants = _nltk_cmu.get(word)
+    return variants[0] if variants else None
+
+
+def lookup_cmu(word):
+    """CMU phonemes (first variant) for a word, or None if it is not in the dictionary."""
+    word = word.lower()
+    cmu = get_cmu_dict()
+    if cmu.available:
+        return cmu.phonemes(word)
+    return _fallback_phonemes(word)
 
 def get_phonemes(word):
     """
@@ -20,111 +44,266 @@ def get_phonemes(word):
     Fallback: use letters if not found.
     """
     word = word.lower()
-    if word in CMU_DICT:
-        return CMU_DICT[word][0]  # first pronunciation variant
-    else:
-        return list(word)  # fallback to letters
+    return lookup_cmu(word) or list(word)  # fallback to letters
 
-def word_pronunciation_similarity(expected_word, transcribed_word):
-    """
-    Calculate similarity between expected and transcribed word at phoneme level.
-    Returns ratio 0..1
-    """
-    expected_ph = get_phonemes(expected_word)
-    transcribed_ph = get_phonemes(transcribed_word)
-    return difflib.SequenceMatcher(None, expected_ph, transcribed_ph).ratio()
 
-def detect_mispronounced_words(transcribed_text: str, target_sentence: str) -> dict:
+# ----------------------
+# Scoring engine
+# ----------------------
+# Every word is turned into a small int array of phoneme ids once (cached),
+# the expected/spoken sentences are aligned once with a word-level edit
+# distance, and all phoneme distances for a sentence pair are computed in a
+# single batched NumPy DP. detect_mispronounced_words,
+# get_pronunciation_corrections and /api/analyze_speech all read the same
+# PronunciationResult.
+
+MISPRONOUNCED_THRESHOLD = 0.8
+SILENT_TRANSCRIPTS = ("[No speech detected]", "[Transcription error]", "[Low volume or unclear speech detected]")
+_STRIP_CHARS = ".,!?;:\"'()"
+
+_phoneme_ids = {}  # phoneme symbol -> int id, grown on demand
+
+
+def _clean_words(text: str) -> list:
+    words = (w.strip(_STRIP_CHARS).lower() for w in (text or "").split())
+    return [w for w in words if w]
+
+
+@lru_cache(maxsize=20000)
+def _word_ids(word: str) -> np.ndarray:
+    """Stress-free phoneme ids for a word (letters for out-of-dictionary words)."""
+    symbols = [p.rstrip("012") for p in get_phonemes(word)]
+    ids = [_phoneme_ids.setdefault(s, len(_phoneme_ids)) for s in symbols]
+    return np.asarray(ids, dtype=np.int32)
+
+
+def phoneme_similarity_matrix(expected_words: list, spoken_words: list) -> np.ndarray:
     """
-    Detect mispronounced words in a sentence.
+    (len(expected_words), len(spoken_words)) matrix of phoneme similarities
+    1 - edit_distance / max(len). All pairs run through one vectorised
+    Levenshtein DP, so the Python loop is bounded by phoneme lengths only.
     """
-    if not target_sentence.strip():
-        return {"status": "silent", "mispronounced": []}
+    n_e, n_s = len(expected_words), len(spoken_words)
+    if not n_e or not n_s:
+        return np.zeros((n_e, n_s), dtype=np.float32)
+
+    exp_ids = [_word_ids(w) for w in expected_words]
+    spk_ids = [_word_ids(w) for w in spoken_words]
+    le = np.array([max(len(x), 1) for x in exp_ids])
+    ls = np.array([max(len(x), 1) for x in spk_ids])
+    max_e, max_s = int(le.max()), int(ls.max())
 
-    if not transcribed_text or transcribed_text in ["[No speech detected]", "[Transcription error]", "[Low volume or unclear speech detected]"]:
-        return {"status": "silent", "mispronounced": []}
+    # Pad with distinct negatives so padding never counts as a match
+    E = np.full((n_e, max_e), -1, dtype=np.int32)
+    S = np.full((n_s, max_s), -2, dtype=np.int32)
+    for i, ids in enumerate(exp_ids):
+        E[i, :len(ids)] = ids
+    for j, ids in enumerate(spk_ids):
+        S[j, :len(ids)] = ids
 
-    expected_words = target_sentence.lower().strip().split()
-    user_words = transcribed_text.lower().strip().split()
+    prev = np.broadcast_to(np.arange(max_s + 1, dtype=np.int32), (n_e, n_s, max_s + 1)).copy()
+    final = np.zeros_like(prev)
+    for i in range(1, max_e + 1):
+        cur = np.empty_like(prev)
+        cur[..., 0] = i
+        cost = (E[:, None, i - 1, None] != S[None, :, :]).astype(np.int32)  # (n_e, n_s, max_s)
+        for j in range(1, max_s + 1):
+            cur[..., j] = np.minimum(
+                np.minimum(prev[..., j], cur[..., j - 1]) + 1,
+                prev[..., j - 1] + cost[..., j - 1],
+            )
+        done = le == i
+        if done.any():
+            final[done] = cur[done]
+        prev = cur
 
-    if not user_words:
-        return {"status": "silent", "mispronounced": []}
+    dist = np.take_along_axis(final, np.broadcast_to(ls[None, :, None], (n_e, n_s, 1)), axis=2)[..., 0]
+    return (1.0 - dist / np.maximum(le[:, None], ls[None, :])).astype(np.float32)
 
-    # Overall sentence similarity
-    sentence_similarity = difflib.SequenceMatcher(None, target_sentence.lower(), transcribed_text.lower()).ratio()
 
-    # Check each word for phoneme-level similarity
-    mispronounced = []
-    for i, expected_word in enumerate(expected_words):
-        if i < len(user_words):
-            similarity = word_pronunciation_similarity(expected_word, user_words[i])
-            if similarity < 0.8:
-                mispronounced.append(user_words[i])
+def align_words(similarity: np.ndarray) -> list:
+    """
+    Word-level alignment over a similarity matrix. Substituting costs
+    2 * (1 - similarity), inserting or skipping a word costs 1, so pairing
+    two unrelated words is never cheaper than a skip plus an insert and one
+    skipped word does not shift every later pair. Returns
+    (expected_index | None, spoken_index | None) pairs in sentence order.
+
+    >>> align_words(np.array([[1, 0, 0], [0, 0, 1]], dtype=np.float32))
+    [(0, 0), (None, 1), (1, 2)]
+    """
+    n_e, n_s = similarity.shape
+    cost = np.zeros((n_e + 1, n_s + 1), dtype=np.float32)
+    cost[:, 0] = np.arange(n_e + 1)
+    cost[0, :] = np.arange(n_s + 1)
+    sub = 2.0 * (1.0 - similarity)
+    for i in range(1, n_e + 1):
+        for j in range(1, n_s + 1):
+            cost[i, j] = min(cost[i - 1, j - 1] + sub[i - 1, j - 1],
+                             cost[i - 1, j] + 1,
+                             cost[i, j - 1] + 1)
+
+    pairs = []
+    i, j = n_e, n_s
+    while i or j:
+        if i and j and np.isclose(cost[i, j], cost[i - 1, j - 1] + sub[i - 1, j - 1]):
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif i and (not j or np.isclose(cost[i, j], cost[i - 1, j] + 1)):
+            pairs.append((i - 1, None))
+            i -= 1
         else:
-            mispronounced.append("[missing]")
+            pairs.append((None, j - 1))
+            j -= 1
+    pairs.reverse()
+    return pairs
 
-    if not mispronounced:
-        return {"status": "ok", "mispronounced": []}
-    elif sentence_similarity >= 0.5:
-        return {"status": "different", "mispronounced": mispronounced}
-    else:
-        return {"status": "mispronounced", "mispronounced": mispronounced}
 
+class PronunciationResult:
+    """One scored (expected, spoken) sentence pair."""
 
-def get_pronunciation_corrections(transcribed_text: str, expected_text: str) -> list:
-    """
-    Provide detailed corrections for mispronounced words using phoneme-level similarity.
-    """
-    corrections = []
-    if not transcribed_text or not expected_text:
-        return corrections
+    def __init__(self, expected_text: str, transcribed_text: str, threshold: float = MISPRONOUNCED_THRESHOLD):
+        self.expected_text = expected_text or ""
+        self.transcribed_text = transcribed_text or ""
+        self.threshold = threshold
+        self.expected_words = _clean_words(self.expected_text)
+        self.spoken_words = [] if self.transcribed_text in SILENT_TRANSCRIPTS else _clean_words(self.transcribed_text)
+        self.sentence_similarity = difflib.SequenceMatcher(
+            None, self.expected_text.lower(), self.transcribed_text.lower()).ratio()
+
+        # Score each distinct word once, then spread back over positions
+        exp_vocab = list(dict.fromkeys(self.expected_words))
+        spk_vocab = list(dict.fromkeys(self.spoken_words))
+        vocab_sim = phoneme_similarity_matrix(exp_vocab, spk_vocab)
+        exp_index = [exp_vocab.index(w) for w in self.expected_words]
+        spk_index = [spk_vocab.index(w) for w in self.spoken_words]
+        self.similarity = vocab_sim[np.ix_(exp_index, spk_index)] if exp_index and spk_index \
+            else np.zeros((len(exp_index), len(spk_index)), dtype=np.float32)
 
-    expected_words = expected_text.lower().strip().split()
-    transcribed_words = transcribed_text.lower().strip().split()
-
-    max_len = max(len(expected_words), len(transcribed_words))
-    for i in range(max_len):
-        if i < len(expected_words):
-            expected_word = expected_words[i]
-            if i < len(transcribed_words):
-                transcribed_word = transcribed_words[i]
-                similarity = word_pronunciation_similarity(expected_word, transcribed_word)
-                if similarity < 0.8:
-                    corrections.append({
-                        "position": i + 1,
-                        "expected_word": expected_word,
-                        "transcribed_word": transcribed_word,
-                        "similarity_score": round(similarity * 100, 2),
-                        "correction_type": get_correction_type(expected_word, transcribed_word),
-                        "pronunciation_tip": get_pronunciation_tip(expected_word, transcribed_word),
-                        "phonetic_guide": get_phonetic_guide(expected_word),
-                        "audio_tip": get_pronunciation_audio_text(expected_word)  # <-- new field
-                    })
+        # [{"op": match|mispronounced|missing|extra, "expected", "spoken", "similarity", ...}]
+        self.alignment = []
+        for e, s in align_words(self.similarity):
+            if e is not None and s is not None:
+                sim = float(self.similarity[e, s])
+                op = "match" if sim >= threshold else "mispronounced"
             else:
+                sim, op = 0.0, ("missing" if s is None else "extra")
+            self.alignment.append({
+                "op": op,
+                "expected": self.expected_words[e] if e is not None else None,
+                "spoken": self.spoken_words[s] if s is not None else None,
+                "expected_index": e,
+                "spoken_index": s,
+                "similarity": sim,
+            })
+
+    @property
+    def correct_words(self) -> int:
+        return sum(1 for a in self.alignment if a["op"] == "match")
+
+    @property
+    def word_accuracy(self) -> float:
+        """Percentage of expected words spoken recognisably."""
+        return self.correct_words / len(self.expected_words) * 100 if self.expected_words else 0.0
+
+    @property
+    def mispronounced(self) -> list:
+        if not self.expected_words or not self.spoken_words:
+            return []
+        return [a["spoken"] if a["op"] == "mispronounced" else "[missing]"
+                for a in self.alignment if a["op"] in ("mispronounced", "missing")]
+
+    @property
+    def status(self) -> str:
+        if not self.expected_words or not self.spoken_words:
+            return "silent"
+        if not self.mispronounced:
+            return "ok"
+        return "different" if self.sentence_similarity >= 0.5 else "mispronounced"
+
+    def mismatches(self) -> list:
+        """Expected words that were not spoken correctly, with what was heard instead."""
+        return [{"expected": a["expected"], "spoken": a["spoken"] or "", "similarity": round(a["similarity"], 2)}
+                for a in self.alignment if a["op"] in ("mispronounced", "missing")]
+
+    def corrections(self) -> list:
+        corrections = []
+        for a in self.alignment:
+            expected_word, spoken_word = a["expected"], a["spoken"]
+            if a["op"] == "mispronounced":
                 corrections.append({
-                    "position": i + 1,
+                    "position": a["expected_index"] + 1,
+                    "expected_word": expected_word,
+                    "transcribed_word": spoken_word,
+                    "similarity_score": round(a["similarity"] * 100, 2),
+                    "correction_type": get_correction_type(expected_word, spoken_word),
+                    "pronunciation_tip": get_pronunciation_tip(expected_word, spoken_word),
+                    "phonetic_guide": get_phonetic_guide(expected_word),
+                    "audio_tip": get_pronunciation_audio_text(expected_word)
+                })
+            elif a["op"] == "missing":
+                corrections.append({
+                    "position": a["expected_index"] + 1,
                     "expected_word": expected_word,
                     "transcribed_word": "[missing]",
                     "similarity_score": 0,
                     "correction_type": "missing_word",
                     "pronunciation_tip": f"You missed the word '{expected_word}'. Try to pronounce it clearly.",
                     "phonetic_guide": get_phonetic_guide(expected_word),
-                    "audio_tip": get_pronunciation_audio_text(expected_word)  # <-- new field
+                    "audio_tip": get_pronunciation_audio_text(expected_word)
                 })
+            elif a["op"] == "extra":
+                corrections.append({
+                    "position": a["spoken_index"] + 1,
+                    "expected_word": "[none]",
+                    "transcribed_word": spoken_word,
+                    "similarity_score": 0,
+                    "correction_type": "extra_word",
+                    "pronunciation_tip": f"You added an extra word '{spoken_word}'. Stick to the original sentence.",
+                    "phonetic_guide": "",
+                    "audio_tip": ""
+                })
+        return corrections
 
-    # Extra words
-    if len(transcribed_words) > len(expected_words):
-        for i in range(len(expected_words), len(transcribed_words)):
-            corrections.append({
-                "position": i + 1,
-                "expected_word": "[none]",
-                "transcribed_word": transcribed_words[i],
-                "similarity_score": 0,
-                "correction_type": "extra_word",
-                "pronunciation_tip": f"You added an extra word '{transcribed_words[i]}'. Stick to the original sentence.",
-                "phonetic_guide": ""
-            })
-    return corrections
+
+def score_pronunciation(transcribed_text: str, expected_text: str,
+                        threshold: float = MISPRONOUNCED_THRESHOLD) -> PronunciationResult:
+    """
+    Align and score a transcription against the expected sentence.
+
+    One skipped word must not shift the pairs after it:
+
+    >>> import contextlib, io
+    >>> with contextlib.redirect_stdout(io.StringIO()):  # dictionary load messages
+    ...     result = score_pronunciation("i go to the market", "I go to market every day")
+    >>> [a["op"] for a in result.alignment]
+    ['match', 'match', 'match', 'extra', 'match', 'missing', 'missing']
+    """
+    return PronunciationResult(expected_text, transcribed_text, threshold)
+
+
+def word_pronunciation_similarity(expected_word, transcribed_word):
+    """
+    Calculate similarity between expected and transcribed word at phoneme level.
+    Returns ratio 0..1
+    """
+    return float(phoneme_similarity_matrix([expected_word.lower()], [transcribed_word.lower()])[0, 0])
+
+def detect_mispronounced_words(transcribed_text: str, target_sentence: str) -> dict:
+    """
+    Detect mispronounced words in a sentence.
+    """
+    result = score_pronunciation(transcribed_text, target_sentence)
+    return {"status": result.status, "mispronounced": result.mispronounced}
+
+
+def get_pronunciation_corrections(transcribed_text: str, expected_text: str) -> list:
+    """
+    Provide detailed corrections for mispronounced words using phoneme-level similarity.
+    """
+    if not transcribed_text or not expected_text:
+        return []
+    return score_pronunciation(transcribed_text, expected_text).corrections()
 
 
 def get_correction_type(expected_word: str, transcribed_word: str) -> str:
@@ -165,8 +344,8 @@ def get_pronunciation_audio_text(word: str) -> str:
     Example: 'this' -> "Word 'this' ko bolo: th - is (जैसे 'थ' + 'इस')."
     """
     word = word.lower()
-    if word in CMU_DICT:
-        phonemes = CMU_DICT[word][0]
+    phonemes = lookup_cmu(word)
+    if phonemes:
 
         # Basic Hinglish mapping
         mapping = {
@@ -199,7 +378,8 @@ def get_phonetic_guide(word: str) -> str:
     Return CMU phonemes if available.
     """
     word = word.lower()
-    if word in CMU_DICT:
-        return " ".join(CMU_DICT[word][0])
+    phonemes = lookup_cmu(word)
+    if phonemes:
+        return " ".join(phonemes)
     else:
         return f"/{word}/"
@@ -0,0 +1,369 @@
+# services/question_bank.py
+"""
+Precomputed listen-test questions.
+
+Each day has a pool of validated fill-in-the-blank MCQs in the
+listen_test_questions table. The test page samples QUESTIONS_PER_TEST of them
+from an in-process copy of the pool, which makes no LLM call and no query
+while the copy is fresh. When a built pool is smaller than
+QUESTION_BANK_MIN_POOL, a background thread tops it up to
+QUESTION_BANK_TARGET_POOL. Days without a pool are left to the offline
+builder below, and a day whose refill failed or came up short is not
+retried for QUESTION_BANK_REFILL_BACKOFF seconds. Workers that build the
+same day at once skip each other's questions instead of failing.
+
+A question is only stored if all of these hold:
+    - it has exactly one blank;
+    - it has four distinct options;
+    - filling the blank with the answer gives back one of the day's statements;
+    - no distractor also gives back a statement.
+Candidates come from the LLM, or, when it is unavailable, from a local
+generator that blanks a content word and draws distractors from the rest of
+the day's vocabulary.
+
+Build pools ahead of time:
+    python -m services.question_bank --days 1-90
+
+Environment:
+    QUESTION_BANK_TARGET_POOL   questions a build aims for per day
+    QUESTION_BANK_MIN_POOL      below this the pool is refilled in the background
+    QUESTION_BANK_CACHE_TTL     seconds a day's pool is reused in-process
+    QUESTION_BANK_REFILL_BACKOFF  seconds before a failed or short refill is retried
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ListenTestQuestion
+from services.syllabus import load_day_statements, normalize_day
+
+QUESTION_BANK_TARGET_POOL = int(os.getenv("QUESTION_BANK_TARGET_POOL", "30"))
+QUESTION_BANK_MIN_POOL = int(os.getenv("QUESTION_BANK_MIN_POOL", "15"))
+QUESTION_BANK_CACHE_TTL = float(os.getenv("QUESTION_BANK_CACHE_TTL", "600"))
+QUESTION_BANK_REFILL_BACKOFF = float(os.getenv("QUESTION_BANK_REFILL_BACKOFF", "3600"))
+QUESTIONS_PER_TEST = 5
+BLANK = "______"
+DATA_SYLLABUS = "data/syllabus/english_spoken_syllabus_filled_ai.xlsx"
+
+SKIP_WORDS = {"i", "am", "is", "are", "the", "a", "an", "to", "and", "or", "but", "my", "in", "on", "at",
+              "with", "you", "your", "me", "we", "it", "of", "for", "this", "that", "was", "be", "do"}
+
+
+# ----------------------
+# Validation
+# ----------------------
+def _norm(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", (text or "").lower()).split())
+
+
+def validate_question(candidate: dict, statements: list) -> dict | None:
+    """Normalized {question, options, answer, hindi_meaning} if the candidate passes every check."""
+    try:
+        question = re.sub(r"_{3,}", BLANK, str(candidate.get("question", "")).strip())
+        options = [str(o).strip() for o in candidate.get("options", [])]
+        if "answer" in candidate:
+            answer = str(candidate["answer"]).strip()
+        else:
+            answer = options[int(candidate.get("correct_answer"))]
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    if question.count(BLANK) != 1 or len(options) != 4 or not all(options):
+        return None
+    if len({o.lower() for o in options}) != 4 or answer not in options:
+        return None
+
+    by_text = {_norm(s.get("text", "")): s for s in statements if s.get("text")}
+    statement = by_text.get(_norm(question.replace(BLANK, answer)))
+    if statement is None:
+        return None
+    # A distractor that also completes a statement makes the question ambiguous
+    if any(_norm(question.replace(BLANK, o)) in by_text for o in options if o != answer):
+        return None
+
+    return {
+        "question": question,
+        "options": options,
+        "answer": answer,
+        "hindi_meaning": statement.get("hindi") or candidate.get("hindi_meaning") or "",
+    }
+
+
+# ----------------------
+# Candidate generation
+# ----------------------
+def _llm_candidates(statements: list, day: str, count: int = 10) -> list:
+    from core.openai_helper import cached_completion
+
+    statements_text = "\n".join(f"{i + 1}. {s.get('text', '')} - {s.get('hindi', '')}"
+                                for i, s in enumerate(statements))
+    prompt = f"""Based on these English learning statements from {day}, create exactly {count} simple fill-in-the-blank questions, each from a different statement where possible.
+
+Statements:
+{statements_text}
+
+For each question:
+1. Copy the statement exactly and replace 1 key word with a blank (______)
+2. Provide 4 simple multiple choice options; only the original word may fit
+3. Keep it simple and clear
+
+Format as JSON:
+{{
+  "questions": [
+    {{
+      "question": "Good ______ sir!",
+      "options": ["morning", "evening", "afternoon", "night"],
+      "correct_answer": 0,
+      "hindi_meaning": "सुप्रभात सर!"
+    }}
+  ]
+}}"""
+    text = cached_completion(
+        [
+            {"role": "system", "content": "You are an English learning expert who creates engaging questions for Indian students."},
+            {"role": "user", "content": prompt},
+        ],
+        model="gpt-3.5-turbo",
+        temperature=0.8,
+        max_tokens=2000,
+        cache=False,
+    )
+    text = re.sub(r"^```(?:json)?|```$", "", text.strip()).strip()
+    return json.loads(text).get("questions", [])
+
+
+def _local_candidates(statements: list, rng: random.Random) -> list:
+    """Blank one content word per statement; distractors are other words of the same day."""
+    vocabulary = sorted({
+        w.strip(".,!?;:\"'").lower() for s in statements for w in s.get("text", "").split()
+        if len(w.strip(".,!?;:\"'")) > 2 and w.strip(".,!?;:\"'").lower() not in SKIP_WORDS
+    })
+    candidates = []
+    for statement in statements:
+        words = statement.get("text", "").split()
+        targets = [w for w in words if len(w.strip(".,!?;:\"'")) > 2 and w.strip(".,!?;:\"'").lower() not in SKIP_WORDS]
+        for target in rng.sample(targets, min(2, len(targets))):
+            answer = target.strip(".,!?;:\"'")
+            pool = [w for w in vocabulary if w != answer.lower()]
+            if len(pool) < 3:
+                continue
+            options = [answer] + rng.sample(pool, 3)
+            rng.shuffle(options)
+            candidates.append({
+                "question": re.sub(rf"\b{re.escape(answer)}\b", BLANK, statement["text"], count=1),
+                "options": options,
+                "answer": answer,
+            })
+    return candidates
+
+
+# ----------------------
+# Pool storage
+# ----------------------
+_pools = {}  # day -> (loaded_at, [question dict])
+_pools_lock = threading.Lock()
+_refilling = set()
+_refill_after = {}  # day -> time before which no refill starts
+
+
+def pool_size(day) -> int:
+    return ListenTestQuestion.query.filter_by(day=normalize_day(day)).count()
+
+
+def _insert_question(day: str, question: dict) -> bool:
+    """Add one question unless (day, question) already exists, e.g. from another worker's build."""
+    table = ListenTestQuestion.__table__
+    row = {"id": uuid.uuid4(), "day": day, **question}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**row).on_conflict_do_nothing(index_elements=["day", "question"])
+        return bool(db.session.execute(stmt).rowcount)
+
+    # Other dialects: a savepoint per row, so a duplicate only drops that row
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**row))
+        return True
+    except IntegrityError:
+        return False
+
+
+def build_day(day, statements: list | None = None, target: int = QUESTION_BANK_TARGET_POOL,
+              xlsx_path: str = DATA_SYLLABUS, use_llm: bool = True, max_rounds: int = 4) -> int:
+    """Top the day's pool up to `target` validated questions; returns how many were added."""
+    day = normalize_day(day)
+    statements = statements if statements is not None else load_day_statements(xlsx_path, day)
+    if not statements:
+        return 0
+
+    existing = {q for (q,) in db.session.query(ListenTestQuestion.question).filter_by(day=day)}
+    added = 0
+    rng = random.Random()
+    for round_no in range(max_rounds):
+        if len(existing) >= target:
+            break
+        candidates = []
+        if use_llm:
+            try:
+                candidates = _llm_candidates(statements, day)
+            except Exception as e:
+                print(f"⚠️ Question bank LLM generation failed for {day}: {e}")
+                use_llm = False
+        if not candidates:
+            candidates = _local_candidates(statements, rng)
+
+        for candidate in candidates:
+            if len(existing) >= target:
+                break
+            question = validate_question(candidate, statements)
+            if question is None or question["question"] in existing:
+                continue
+            existing.add(question["question"])
+            if _insert_question(day, question):
+                added += 1
+        db.session.commit()
+
+    invalidate_pool(day)
+    return added
+
+
+def invalidate_pool(day):
+    with _pools_lock:
+        _pools.pop(normalize_day(day), None)
+
+
+def _load_pool(day: str) -> list:
+    with _pools_lock:
+        cached = _pools.get(day)
+    if cached and time.time() - cached[0] < QUESTION_BANK_CACHE_TTL:
+        return cached[1]
+    rows = ListenTestQuestion.query.filter_by(day=day).all()
+    pool = [
+        {"id": str(r.id), "question": r.question, "options": list(r.options),
+         "answer": r.answer, "hindi_meaning": r.hindi_meaning or ""}
+        for r in rows
+    ]
+    with _pools_lock:
+        _pools[day] = (time.time(), pool)
+    return pool
+
+
+def sample_questions(day, k: int = QUESTIONS_PER_TEST) -> list | None:
+    """k random questions from the day's pool in the listen_test.html shape, or None if the pool is too small."""
+    pool = _load_pool(normalize_day(day))
+    if len(pool) < k:
+        return None
+    questions = []
+    for q in random.sample(pool, k):
+        options = q["options"][:]
+        random.shuffle(options)
+        questions.append({
+            "id": q["id"],
+            "question": q["question"],
+            "options": options,
+            "correct_answer": options.index(q["answer"]),
+            "hindi_meaning": q["hindi_meaning"],
+            "type": "fill_blanks_mcq",
+        })
+    return questions
+
+
+def needs_refill(day) -> bool:
+    """True for a built pool below QUESTION_BANK_MIN_POOL; unbuilt days are left to the offline builder."""
+    day = normalize_day(day)
+    with _pools_lock:
+        if time.time() < _refill_after.get(day, 0):
+            return False
+    return 0 < len(_load_pool(day)) < QUESTION_BANK_MIN_POOL
+
+
+def refill_in_background(app, day, statements: list) -> bool:
+    """Start a build_day thread for the day unless one is running or the day is backing off."""
+    day = normalize_day(day)
+    with _pools_lock:
+        if day in _refilling or time.time() < _refill_after.get(day, 0):
+            return False
+        _refilling.add(day)
+
+    def run():
+        short = True
+        try:
+            with app.app_context():
+                added = build_day(day, statements)
+                size = pool_size(day)
+                short = size < QUESTION_BANK_MIN_POOL
+                print(f"🧠 Question bank {day}: +{added} questions (pool {size})")
+        except Exception as e:
+            print(f"❌ Question bank refill failed for {day}: {e}")
+        finally:
+            with _pools_lock:
+                _refilling.discard(day)
+                if short:
+                    _refill_after[day] = time.time() + QUESTION_BANK_REFILL_BACKOFF
+
+    threading.Thread(target=run, daemon=True, name=f"question-bank-{day}").start()
+    return True
+
+
+def grade(questions: list, answers: list) -> tuple[int, int] | None:
+    """
+    (score, total) for bank questions, checking the chosen option's text
+    against the stored answer. None if any question is not from the bank.
+    """
+    ids = [str(q.get("id") or "") for q in questions]
+    if not ids or not all(ids):
+        return None
+    rows = {str(r.id): r.answer for r in ListenTestQuestion.query.filter(ListenTestQuestion.id.in_(ids))}
+    if len(rows) != len(set(ids)):
+        return None
+
+    score = 0
+    for i, question in enumerate(questions):
+        if i >= len(answers):
+            continue
+        try:
+            chosen = question.get("options", [])[int(answers[i])]
+        except (TypeError, ValueError, IndexError):
+            continue
+        if chosen == rows[ids[i]]:
+            score += 1
+    return score, len(questions)
+
+
+def main():
+    from services.tts_prerender import parse_day_range
+
+    parser = argparse.ArgumentParser(description="Build the listen-test question bank")
+    parser.add_argument("--days", default="1-90", help="Day range, e.g. '1-30' or '1,2,5-7'")
+    parser.add_argument("--syllabus", default=DATA_SYLLABUS, help="Syllabus workbook path")
+    parser.add_argument("--target", type=int, default=QUESTION_BANK_TARGET_POOL, help="Questions per day")
+    parser.add_argument("--no-llm", action="store_true", help="Only use the local generator")
+    args = parser.parse_args()
+
+    from flask import Flask
+    from config import Config
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        for day in parse_day_range(args.days):
+            added = build_day(f"Day-{day}", target=args.target, xlsx_path=args.syllabus, use_llm=not args.no_llm)
+            print(f"🧠 Day-{day}: +{added} questions (pool {pool_size(day)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# services/static_assets.py
+"""
+Template and static-file serving for the config profile (config.Config.APP_PROFILE).
+
+dev:
+    - templates are re-read when they change;
+    - static files are revalidated on every request (max-age 0).
+prod:
+    - every template is compiled once at startup (precompile_templates). The
+      Jinja bytecode goes to JINJA_BYTECODE_CACHE_DIR, so later workers and
+      restarts skip the compile step.
+    - url_for('static', filename='css/main.css') returns a content-hashed name
+      like /static/css/main.3f9a1c2b7d.css. Such URLs are served with
+      'public, max-age=STATIC_FINGERPRINT_MAX_AGE, immutable'; an edited file
+      gets a new URL, so browsers never need to revalidate.
+    - hand-written /static/... paths (in templates and JS) keep working and
+      are cached for SEND_FILE_MAX_AGE_DEFAULT.
+
+In prod, hashes are computed once per file and kept until restart.
+
+Both profiles serve the variants built by services/asset_pipeline.py when
+static/build/manifest.json exists:
+    - WebP/AVIF images for clients that list those types in Accept;
+    - ?w=<px> thumbnails (the smallest built one at least that wide);
+    - .br/.gz copies of CSS/JS per Accept-Encoding.
+Each of these responses carries a Vary header.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from flask import request, send_from_directory
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.security import safe_join
+
+from services.asset_pipeline import BUILD_SUBDIR, MANIFEST_NAME
+
+FINGERPRINT_LENGTH = 10
+FINGERPRINT_RE = re.compile(rf"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{FINGERPRINT_LENGTH}}})(?P<ext>\.[A-Za-z0-9]+)$")
+
+_hashes = {}  # absolute path -> content hash (None if missing)
+_hashes_lock = threading.Lock()
+
+
+def file_hash(static_folder: str, filename: str) -> str | None:
+    """Short content hash of a static file, or None if it does not exist."""
+    path = safe_join(static_folder, filename)
+    if path is None:
+        return None
+    with _hashes_lock:
+        if path in _hashes:
+            return _hashes[path]
+    digest = None
+    if os.path.isfile(path):
+        h = hashlib.md5(usedforsecurity=False)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        digest = h.hexdigest()[:FINGERPRINT_LENGTH]
+    with _hashes_lock:
+        _hashes[path] = digest
+    return digest
+
+
+def fingerprint(static_folder: str, filename: str) -> str:
+    """'css/main.css' -> 'css/main.<hash>.css'; unchanged if the file is missing or has no extension."""
+    stem, ext = os.path.splitext(filename)
+    digest = file_hash(static_folder, filename) if ext else None
+    return f"{stem}.{digest}{ext}" if digest else filename
+
+
+# ----------------------
+# Built variants (services/asset_pipeline.py)
+# ----------------------
+IMAGE_PREFERENCE = ("image/avif", "image/webp")
+ENCODING_PREFERENCE = ("br", "gzip")
+
+_manifests = {}  # static folder -> (mtime, manifest)
+_manifests_lock = threading.Lock()
+
+
+def load_manifest(static_folder: str) -> dict:
+    """static/build/manifest.json, re-read when the file changes; {} before the first build."""
+    path = os.path.join(static_folder, BUILD_SUBDIR, MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    with _manifests_lock:
+        cached = _manifests.get(static_folder)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Static manifest unreadable: {e}")
+        manifest = {}
+    with _manifests_lock:
+        _manifests[static_folder] = (mtime, manifest)
+    return manifest
+
+
+def pick_variant(entry: dict, accept: set, accept_encoding: set, width: int | None = None):
+    """
+    (path under static/, mimetype, content encoding, vary header) of the best
+    built variant, or None to serve the source file. Only types the client
+    names explicitly count: 'image/*' does not mean it can decode AVIF.
+    """
+    encodings = entry.get("encodings")
+    if encodings is not None:
+        for encoding in ENCODING_PREFERENCE:
+            if encoding in accept_encoding and encoding in encodings:
+                return encodings[encoding], None, encoding, "Accept-Encoding"
+        return None, None, None, "Accept-Encoding"
+
+    formats = entry.get("variants", {})
+    thumbs = entry.get("thumbs", {})
+    if width and thumbs:
+        fitting = sorted((int(w) for w in thumbs if int(w) >= width))
+        if fitting:
+            formats = thumbs[str(fitting[0])]
+    for mimetype in IMAGE_PREFERENCE:
+        if mimetype in accept and mimetype in formats:
+            return formats[mimetype], mimetype, None, "Accept"
+    # Thumbnails also exist in the source format
+    for mimetype, path in formats.items():
+        if mimetype not in IMAGE_PREFERENCE and mimetype.startswith("image/"):
+            return path, mimetype, None, "Accept"
+    return None, None, None, "Accept"
+
+
+def send_static_variant(static_folder: str, filename: str, max_age: int | None = None):
+    """send_from_directory() for a static file, swapped for its best built variant for this request."""
+    entry = load_manifest(static_folder).get(filename)
+    if not entry:
+        return send_from_directory(static_folder, filename, max_age=max_age)
+
+    accept = {value for value, quality in request.accept_mimetypes if quality > 0}
+    accept_encoding = {value for value, quality in request.accept_encodings if quality > 0}
+    path, mimetype, encoding, vary = pick_variant(entry, accept, accept_encoding, request.args.get("w", type=int))
+    if path is None:
+        response = send_from_directory(static_folder, filename, max_age=max_age)
+    elif encoding:
+        # Precompressed copy: same type as the source, compressed body
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = send_from_directory(static_folder, path, max_age=max_age, mimetype=mimetype)
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = send_from_directory(static_folder, path, max_age=max_age, mimetype=mimetype)
+    response.vary.add(vary)
+    return response
+
+
+def init_app(app):
+    """Apply the profile's template and static settings; call after app.config.from_object(Config)."""
+    env = app.jinja_env
+    env.auto_reload = bool(app.config.get("TEMPLATES_AUTO_RELOAD"))
+
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    fingerprints = bool(app.config.get("STATIC_FINGERPRINT"))
+    pinned_max_age = app.config.get("STATIC_FINGERPRINT_MAX_AGE", 365 * 24 * 3600)
+
+    if fingerprints:
+        @app.url_defaults
+        def _fingerprint_static_url(endpoint, values):
+            if endpoint == "static" and "filename" in values:
+                values["filename"] = fingerprint(app.static_folder, values["filename"])
+
+    def static_view(filename):
+        max_age = None  # SEND_FILE_MAX_AGE_DEFAULT
+        match = FINGERPRINT_RE.match(filename) if fingerprints else None
+        if match:
+            original = match["stem"] + match["ext"]
+            current = file_hash(app.static_folder, original)
+            if current is not None:
+                filename = original
+                # A URL from before a deploy gets today's file, but isn't pinned
+                if current == match["hash"]:
+                    max_age = pinned_max_age
+        response = send_static_variant(app.static_folder, filename, max_age)
+        if max_age is not None:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static_view
+
+    print(f"🧩 Profile '{app.config.get('APP_PROFILE', 'dev')}': template reload "
+          f"{'on' if env.auto_reload else 'off'}, static fingerprints {'on' if fingerprints else 'off'}")
+
+
+def precompile_templates(app) -> int:
+    """Compile every template into the environment's cache (and bytecode cache); returns how many."""
+    env = app.jinja_env
+    compiled = 0
+    for name in env.list_templates(extensions=("html", "htm", "xml", "txt", "j2")):
+        try:
+            env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            print(f"⚠️ Template {name} failed to compile: {e}")
+    print(f"🧩 Precompiled {compiled} templates")
+    return compiled
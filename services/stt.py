@@ -1,60 +1,102 @@
 import os
-from faster_whisper import WhisperModel
+from services.whisper_registry import get_whisper_model
 
-_model = None
+# Maximum sensitivity transcription with forced English
+TRANSCRIBE_OPTIONS = dict(
+    language="en",  # Force English language detection
+    task="transcribe",  # Explicitly set transcription task
+    vad_filter=True,  # Enable Voice Activity Detection
+    beam_size=1,  # Faster processing with single beam
+    best_of=1,    # Single candidate for speed
+    temperature=0.0,  # Deterministic output
+    no_speech_threshold=0.01,  # Extremely low threshold
+    condition_on_previous_text=False,  # Independent processing
+    initial_prompt="This is English speech.",  # Hint for English
+    vad_parameters=dict(
+        min_silence_duration_ms=100,  # Very short silence
+        speech_pad_ms=400,  # Moderate padding
+        threshold=0.1,  # Very sensitive VAD
+    ),
+    word_timestamps=True,  # Enable word timestamps
+    prepend_punctuations="\"'([{-",
+    append_punctuations="\"'.。,，!！?？:：)]}、"
+)
+
+def get_model(size="base"):
+    return get_whisper_model(size)
+
+def _segment_dict(segment) -> dict:
+    return {
+        "start": round(segment.start, 2),
+        "end": round(segment.end, 2),
+        "text": segment.text.strip(),
+        "words": [
+            {"word": w.word.strip(), "start": round(w.start, 2), "end": round(w.end, 2),
+             "probability": round(w.probability, 3)}
+            for w in (segment.words or [])
+        ],
+    }
+
+def stream_transcription(path, size="base"):
+    """
+    Yield segments as faster-whisper decodes them, so callers can show partial
+    results and never hold the whole transcript. The first item is an
+    {"type": "info", ...} dict, then one {"type": "segment", ...} per segment.
+    """
+    model = get_model(size)
+    segments, info = model.transcribe(path, **TRANSCRIBE_OPTIONS)
+    yield {
+        "type": "info",
+        "language": getattr(info, "language", None),
+        "language_probability": getattr(info, "language_probability", None),
+        "duration": getattr(info, "duration", None),
+    }
+    for segment in segments:
+        yield {"type": "segment", **_segment_dict(segment)}
 
 def transcribe_audio(path, size="base"):
-    global _model
-    if not os.path.exists(path):
+    """
+    Transcribe a file path or an in-memory 16 kHz mono float32 array
+    (see services.audio_ingest.decode_audio_bytes).
+    """
+    is_file = isinstance(path, (str, os.PathLike))
+    if is_file and not os.path.exists(path):
         return "[No audio]"
-    if _model is None:
-        _model = WhisperModel(size, device="cpu", compute_type="int8")
-    
+
     try:
-        # Check audio file properties
-        file_size = os.path.getsize(path)
-        print(f"🎵 STT: Processing audio file: {path}")
-        print(f"🎵 STT: File size: {file_size} bytes")
-        print(f"🎵 STT: File extension: {os.path.splitext(path)[1]}")
-        # Maximum sensitivity transcription with forced English
-        segments, info = _model.transcribe(
-            path,
-            language="en",  # Force English language detection
-            task="transcribe",  # Explicitly set transcription task
-            vad_filter=True,  # Enable Voice Activity Detection
-            beam_size=1,  # Faster processing with single beam
-            best_of=1,    # Single candidate for speed
-            temperature=0.0,  # Deterministic output
-            no_speech_threshold=0.01,  # Extremely low threshold
-            condition_on_previous_text=False,  # Independent processing
-            initial_prompt="This is English speech.",  # Hint for English
-            vad_parameters=dict(
-                min_silence_duration_ms=100,  # Very short silence
-                speech_pad_ms=400,  # Moderate padding
-                threshold=0.1,  # Very sensitive VAD
-            ),
-            word_timestamps=True,  # Enable word timestamps
-            prepend_punctuations="\"'([{-",
-            append_punctuations="\"'.。,，!！?？:：)]}、"
-        )
-        
-        result = " ".join([s.text for s in segments]).strip()
-        
+        if is_file:
+            # Check audio file properties
+            file_size = os.path.getsize(path)
+            print(f"🎵 STT: Processing audio file: {path}")
+            print(f"🎵 STT: File size: {file_size} bytes")
+            print(f"🎵 STT: File extension: {os.path.splitext(path)[1]}")
+            has_audio = file_size > 1000
+        else:
+            print(f"🎵 STT: Processing in-memory audio: {len(path) / 16000:.2f}s")
+            has_audio = len(path) > 8000  # more than half a second at 16 kHz
+
+        texts = []
+        info = {}
+        for item in stream_transcription(path, size):
+            if item["type"] == "info":
+                info = item
+            elif item["text"]:
+                texts.append(item["text"])
+        result = " ".join(texts).strip()
+
         # Enhanced debugging for transcription results
-        print(f"🎵 STT: Segments found: {len(list(segments))}")
-        print(f"🎵 STT: Detected language: {info.language if hasattr(info, 'language') else 'unknown'}")
-        print(f"🎵 STT: Language probability: {info.language_probability if hasattr(info, 'language_probability') else 'unknown'}")
+        print(f"🎵 STT: Segments found: {len(texts)}")
+        print(f"🎵 STT: Detected language: {info.get('language') or 'unknown'}")
+        print(f"🎵 STT: Language probability: {info.get('language_probability') or 'unknown'}")
         print(f"🎵 STT: Transcription result: '{result}'")
-        
+
         # Enhanced debugging for speech detection issues
-        if not result and os.path.exists(path):
-            file_size = os.path.getsize(path)
-            if file_size > 1000:  # If file has reasonable size but no transcription
-                print(f"⚠️ STT: Audio file size: {file_size} bytes, but no speech detected")
-                return "[Low volume or unclear speech detected]"
-        
+        if not result and has_audio:  # If clip has reasonable length but no transcription
+            print("⚠️ STT: Audio present, but no speech detected")
+            return "[Low volume or unclear speech detected]"
+
         return result or "[No speech detected]"
-        
+
     except Exception as e:
         print(f"❌ STT transcription error: {e}")
         return "[Transcription error]"
@@ -0,0 +1,278 @@
+# services/stt_pool.py
+"""
+Process pool for faster-whisper transcription.
+
+Decoding is CPU-bound, so running it on the Flask request thread blocks a
+web worker for seconds per clip. TranscriptionPool keeps a fixed number of
+worker processes (each with its own WhisperModel) and hands them jobs
+through the executor queue. Callers either wait for the result, submit a
+job and poll it later, or stream its segments as they are decoded.
+
+Sizing is per host: every web worker (gunicorn -w N) starts its own pool, so
+STT_HOST_WORKERS processes are split between the WEB_CONCURRENCY web
+workers. That keeps the number of loaded Whisper models, and their memory,
+the same however many web workers run.
+
+Submitted jobs are recorded in the stt_jobs table and their result is
+written there when they finish, so a poll can land on any web worker. The
+worker that accepted a job answers from its future without a query.
+
+Environment:
+    STT_HOST_WORKERS   transcription processes per host (default: half the CPUs)
+    WEB_CONCURRENCY    web worker processes sharing the host (default 1)
+    STT_WORKERS        processes per web worker (default STT_HOST_WORKERS / WEB_CONCURRENCY)
+    STT_MAX_PENDING    unfinished jobs per web worker before QueueFull
+    STT_MODEL_SIZE     faster-whisper model size
+"""
+
+import os
+import time
+import uuid
+import threading
+import multiprocessing
+from queue import Empty
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, SttJob, upsert_increment
+
+STT_HOST_WORKERS = int(os.getenv("STT_HOST_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+STT_WORKERS = int(os.getenv("STT_WORKERS", str(max(1, STT_HOST_WORKERS // WEB_CONCURRENCY))))
+STT_MAX_PENDING = int(os.getenv("STT_MAX_PENDING", str(STT_WORKERS * 4)))
+STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "base")
+JOB_TTL_SECONDS = 600  # finished jobs are kept this long for polling; pending ones are then given up
+POLL_INTERVAL = 0.5  # seconds between reads while long-polling another worker's job
+
+
+class QueueFull(Exception):
+    """Raised when the pool already has max_pending unfinished jobs."""
+
+
+def _init_worker(size):
+    # Load the model once per process instead of on the first job
+    from services import stt
+    stt.get_model(size)
+
+
+def _run_job(path, size, delete_after):
+    # path may also be a decoded float32 array; those are never deleted
+    from services.stt import transcribe_audio
+    try:
+        return transcribe_audio(path, size)
+    finally:
+        if delete_after and isinstance(path, str):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _run_stream_job(path, size, queue, delete_after):
+    # Segments go back through a manager queue; None marks the end
+    from services.stt import stream_transcription
+    try:
+        for item in stream_transcription(path, size):
+            queue.put(item)
+    except Exception as e:
+        queue.put({"type": "error", "error": str(e)})
+    finally:
+        queue.put(None)
+        if delete_after:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _store_job(job_id: str, **values):
+    with db.engine.begin() as conn:
+        upsert_increment(SttJob, keys={"job_id": job_id}, increments={}, values=values,
+                         insert_values={"created_at": _utcnow()}, connection=conn)
+
+
+def _load_job(job_id: str):
+    table = SttJob.__table__
+    with db.engine.connect() as conn:
+        return conn.execute(select(table).where(table.c.job_id == job_id)).mappings().first()
+
+
+def _purge_jobs() -> int:
+    table = SttJob.__table__
+    cutoff = _utcnow() - timedelta(seconds=JOB_TTL_SECONDS)
+    with db.engine.begin() as conn:
+        return conn.execute(table.delete().where(table.c.created_at < cutoff)).rowcount
+
+
+class TranscriptionPool:
+    def __init__(self, workers: int = STT_WORKERS, max_pending: int = STT_MAX_PENDING, size: str = STT_MODEL_SIZE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.size = size
+        self._executor = None
+        self._manager = None
+        self._jobs = {}  # job_id -> {"future", "submitted_at"}, until the job finishes
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: CTranslate2 thread pools don't survive fork reliably
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.size,),
+                    )
+        return self._executor
+
+    def _get_manager(self):
+        if self._manager is None:
+            with self._lock:
+                if self._manager is None:
+                    self._manager = multiprocessing.get_context("spawn").Manager()
+        return self._manager
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def _submit_local(self, fn, *args):
+        executor = self._get_executor()
+        with self._lock:
+            pending = len(self._jobs)
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} transcription jobs already queued")
+            job_id = uuid.uuid4().hex
+            future = executor.submit(fn, *args)
+            self._jobs[job_id] = {"future": future, "submitted_at": time.time()}
+        return job_id, future
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def submit(self, path, delete_after: bool = True) -> str:
+        """Queue a file (or decoded array) for transcription and return its job id; raises QueueFull."""
+        app = current_app._get_current_object()
+        if time.time() - self._purged_at > 60:
+            self._purged_at = time.time()
+            _purge_jobs()
+        job_id, future = self._submit_local(_run_job, path, self.size, delete_after)
+        try:
+            _store_job(job_id, status="pending")
+        except Exception:
+            future.cancel()
+            self._forget(job_id)
+            raise
+
+        def record(done):
+            try:
+                with app.app_context():
+                    try:
+                        _store_job(job_id, status="done", text=done.result(), finished_at=_utcnow())
+                    except Exception as e:
+                        _store_job(job_id, status="error", error=str(e), finished_at=_utcnow())
+            except Exception as e:
+                print(f"❌ Could not record transcription job {job_id}: {e}")
+            finally:
+                self._forget(job_id)
+
+        future.add_done_callback(record)
+        return job_id
+
+    def poll(self, job_id: str, wait: float = 0) -> dict | None:
+        """
+        Job status dict, or None for unknown ids. With wait > 0 this
+        long-polls for up to `wait` seconds before reporting 'pending'.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            try:
+                text = job["future"].result(timeout=wait if wait > 0 else 0)
+            except FutureTimeout:
+                return {"job_id": job_id, "status": "pending", "queued_for": round(time.time() - job["submitted_at"], 2)}
+            except Exception as e:
+                return {"job_id": job_id, "status": "error", "error": str(e)}
+            return {"job_id": job_id, "status": "done", "text": text}
+
+        # Accepted by another web worker (or already finished here): read the stored state
+        deadline = time.time() + max(wait, 0)
+        while True:
+            row = _load_job(job_id)
+            if row is None:
+                return None
+            if row["status"] == "done":
+                return {"job_id": job_id, "status": "done", "text": row["text"]}
+            if row["status"] == "error":
+                return {"job_id": job_id, "status": "error", "error": row["error"] or "Transcription failed"}
+            queued_for = (_utcnow() - row["created_at"]).total_seconds()
+            if queued_for > JOB_TTL_SECONDS:
+                # The worker that took it went away before finishing
+                return {"job_id": job_id, "status": "error", "error": "Transcription job was lost"}
+            if time.time() >= deadline:
+                return {"job_id": job_id, "status": "pending", "queued_for": round(queued_for, 2)}
+            time.sleep(min(POLL_INTERVAL, max(deadline - time.time(), 0)))
+
+    def transcribe(self, path, timeout: float = 120, delete_after: bool = False) -> str:
+        """Blocking convenience wrapper: run in the pool and wait; raises QueueFull / TimeoutError."""
+        job_id, future = self._submit_local(_run_job, path, self.size, delete_after)
+        # Stays registered until it finishes, so a timed-out job still counts against max_pending
+        future.add_done_callback(lambda done: self._forget(job_id))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"Transcription did not finish within {timeout}s")
+
+    def stream(self, path, delete_after: bool = True, timeout: float = 120):
+        """
+        Queue a file and return an iterator over its services.stt.stream_transcription
+        items as the pool decodes them. Raises QueueFull right away; iterating
+        raises TimeoutError if nothing arrives for `timeout` seconds.
+        """
+        queue = self._get_manager().Queue()
+        job_id, future = self._submit_local(_run_stream_job, path, self.size, queue, delete_after)
+        future.add_done_callback(lambda done: self._forget(job_id))
+
+        def items():
+            waited = 0.0
+            while True:
+                try:
+                    item = queue.get(timeout=1)
+                except Empty:
+                    if future.done():
+                        future.result()  # re-raises if the worker process died
+                        return
+                    waited += 1
+                    if waited >= timeout:
+                        raise TimeoutError(f"No transcription output for {timeout}s")
+                    continue
+                if item is None:
+                    return
+                if item["type"] == "error":
+                    raise RuntimeError(item["error"])
+                waited = 0.0
+                yield item
+
+        return items()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+stt_pool = TranscriptionPool()
@@ -1,76 +1,171 @@
 import os
+import re
+import threading
+from typing import NamedTuple
 import pandas as pd
 
+
+# ----------------------------
+# In-memory syllabus index
+# ----------------------------
+class SyllabusRow(NamedTuple):
+    """One cleaned syllabus row; empty cells are stored as ''."""
+    sr_no: float | None
+    topic: str
+    text: str
+    pronunciation: str
+    hindi: str
+    hindi_meaning: str
+    vocab: str
+    grammar_note: str
+    practice_question: str
+    english_explanation: str
+    hinglish_explanation: str
+
+
+def _cell(row: dict, *columns) -> str:
+    """First non-empty cell among columns, as a stripped string."""
+    for col in columns:
+        val = row.get(col)
+        if val is None or (not isinstance(val, str) and pd.isna(val)):
+            continue
+        val = str(val).strip()
+        if val:
+            return val
+    return ""
+
+
+def normalize_day(day) -> str:
+    """'1', 1, 'Day-1' and ' day-1 ' all map to 'Day-1'."""
+    day_str = str(day).strip()
+    match = re.fullmatch(r"(?i)(?:day-?)?\s*(\d+)", day_str)
+    return f"Day-{int(match.group(1))}" if match else day_str
+
+
+class SyllabusIndex:
+    """
+    Parses a syllabus workbook once and keeps day -> rows in memory.
+    The file's mtime is checked on every lookup, so edits to the Excel
+    are picked up without restarting the app.
+    """
+
+    def __init__(self, xlsx_path: str):
+        self.xlsx_path = xlsx_path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._days: dict[str, tuple[SyllabusRow, ...]] = {}
+
+    def _load(self) -> dict[str, tuple[SyllabusRow, ...]]:
+        days: dict[str, list[SyllabusRow]] = {}
+        sheets = pd.read_excel(self.xlsx_path, sheet_name=None)
+        for sheet_name, df in sheets.items():
+            has_day_column = "day" in df.columns
+            if not has_day_column and not re.fullmatch(r"Day-\d+", str(sheet_name).strip()):
+                continue
+            for row in df.to_dict("records"):
+                day_key = normalize_day(_cell(row, "day")) if has_day_column else str(sheet_name).strip()
+                if not day_key:
+                    continue
+                sr_no = row.get("sr_no")
+                try:
+                    sr_no = None if sr_no is None or pd.isna(sr_no) else float(sr_no)
+                except (TypeError, ValueError):
+                    sr_no = None
+                days.setdefault(day_key, []).append(SyllabusRow(
+                    sr_no=sr_no,
+                    topic=_cell(row, "Topic", "topic"),
+                    text=_cell(row, "statement", "listen_speak_statement"),
+                    pronunciation=_cell(row, "pronounciation"),
+                    hindi=_cell(row, "hindi", "hindi_meaning"),
+                    hindi_meaning=_cell(row, "hindi_meaning"),
+                    vocab=_cell(row, "vocab"),
+                    grammar_note=_cell(row, "grammar_note"),
+                    practice_question=_cell(row, "practice_question"),
+                    english_explanation=_cell(row, "english_explenation"),
+                    hinglish_explanation=_cell(row, "hinglish_explenation"),
+                ))
+        return {day: tuple(rows) for day, rows in days.items()}
+
+    def _refresh_if_stale(self):
+        try:
+            mtime = os.path.getmtime(self.xlsx_path)
+        except OSError:
+            self._mtime, self._days = None, {}
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                self._days = self._load()
+                print(f"📚 Syllabus index loaded: {self.xlsx_path} ({len(self._days)} days)")
+            except Exception as e:
+                print(f"Error loading syllabus index {self.xlsx_path}: {e}")
+                self._days = {}
+            self._mtime = mtime
+
+    def rows(self, day) -> tuple[SyllabusRow, ...]:
+        """All rows for a day (empty tuple if the day or file is missing)."""
+        self._refresh_if_stale()
+        return self._days.get(normalize_day(day), ())
+
+    def first_row(self, day) -> SyllabusRow | None:
+        rows = self.rows(day)
+        return rows[0] if rows else None
+
+    def topic(self, day) -> str:
+        row = self.first_row(day)
+        return row.topic if row else ""
+
+    def days(self) -> list[str]:
+        self._refresh_if_stale()
+        return sorted(self._days, key=lambda d: (len(d), d))
+
+
+_indexes: dict[str, SyllabusIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_syllabus_index(xlsx_path) -> SyllabusIndex:
+    """Shared SyllabusIndex per workbook path."""
+    key = os.path.abspath(xlsx_path)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(key, SyllabusIndex(key))
+    return index
+
+
 def load_day_statements(xlsx_path, day: str):
     """Load statements for a specific day from the Excel structure"""
     if not os.path.exists(xlsx_path):
         return []
-    
-    try:
-        # Try to load specific day sheet first
-        sheet_name = f"Day-{day}"
-        try:
-            df = pd.read_excel(xlsx_path, sheet_name=sheet_name)
-        except:
-            # If sheet doesn't exist, try loading from main sheet
-            df_all = pd.read_excel(xlsx_path)
-            # Filter by day if day column exists
-            if "day" in df_all.columns:
-                # Try both formats: 'Day-1' and '1'
-                day_filter = f"Day-{day}" if not day.startswith('Day-') else day
-                df = df_all[df_all["day"].astype(str).str.strip() == day_filter]
-                # If no match, try the other format
-                if df.empty:
-                    alt_day = day.replace('Day-', '') if day.startswith('Day-') else f"Day-{day}"
-                    df = df_all[df_all["day"].astype(str).str.strip() == alt_day]
-            else:
-                df = df_all
-            
-        if df.empty:
-            # Return sample statements for Day-1 if no data found
-            if day == "1":
-                return generate_sample_day1_statements()
-            return []
 
+    try:
         results = []
-        for _, row in df.iterrows():
-            # Extract data from available columns
-            text = str(row.get('statement', '')).strip() if not pd.isna(row.get('statement')) else ""
-            if not text:
-                text = str(row.get('listen_speak_statement', '')).strip() if not pd.isna(row.get('listen_speak_statement')) else ""
-            
+        for row in get_syllabus_index(xlsx_path).rows(day):
             # Skip if no text content
-            if not text:
+            if not row.text:
                 continue
-                
-            pronunciation = str(row.get('pronounciation', '')).strip() if not pd.isna(row.get('pronounciation')) else ""
-            hindi = str(row.get('hindi', '')).strip() if not pd.isna(row.get('hindi')) else ""
-            if not hindi:
-                hindi = str(row.get('hindi_meaning', '')).strip() if not pd.isna(row.get('hindi_meaning')) else ""
-            
-            sr_no_val = float(row.get('sr_no', len(results) + 1)) if not pd.isna(row.get('sr_no')) else len(results) + 1
-            topic_val = str(row.get('Topic', '')).strip() if not pd.isna(row.get('Topic')) else ""
-            if not topic_val:
-                topic_val = str(row.get('topic', '')).strip() if not pd.isna(row.get('topic')) else ""
-
             results.append({
-                "sr_no": sr_no_val,
-                "text": text,
-                "pronunciation": pronunciation,
-                "hindi": hindi,
-                "topic": topic_val
+                "sr_no": row.sr_no if row.sr_no is not None else len(results) + 1,
+                "text": row.text,
+                "pronunciation": row.pronunciation,
+                "hindi": row.hindi,
+                "topic": row.topic
             })
 
         # If no valid data found, return sample data for Day-1
-        if not results and day == "1":
+        if not results and normalize_day(day) == "Day-1":
             return generate_sample_day1_statements()
-            
+
         return results
-        
+
     except Exception as e:
         print(f"Error loading day statements: {e}")
         # Return sample data for Day-1 as fallback
-        if day == "1":
+        if normalize_day(day) == "Day-1":
             return generate_sample_day1_statements()
         return []
 
@@ -104,34 +199,16 @@ def load_day_vocab(xlsx_path, day: str):
     """Load vocabulary for a specific day from the new Excel structure"""
     if not os.path.exists(xlsx_path):
         return []
-    
+
     try:
-        # Load the entire Excel file (single sheet structure)
-        df_all = pd.read_excel(xlsx_path)
-        
-        # Filter by day
-        if "day" in df_all.columns:
-            df = df_all[df_all["day"].astype(str).str.strip() == str(day)]
-        else:
-            return []
-            
-        if df.empty:
-            return []
-
-        out = []
-        for _, row in df.iterrows():
-            # Extract vocab data from the vocab column
-            vocab_text = str(row.get('vocab', '')).strip() if not pd.isna(row.get('vocab')) else ""
-            hindi_meaning = str(row.get('hindi_meaning', '')).strip() if not pd.isna(row.get('hindi_meaning')) else ""
-            
-            # If vocab column contains word-meaning pairs, parse them
-            if vocab_text and hindi_meaning:
-                # For now, treat vocab as the word and hindi_meaning as meaning
-                # This can be enhanced later if vocab column has specific format
-                out.append((vocab_text, hindi_meaning, ""))
-                
-        return out
-        
+        # For now, treat vocab as the word and hindi_meaning as meaning
+        # This can be enhanced later if vocab column has specific format
+        return [
+            (row.vocab, row.hindi_meaning, "")
+            for row in get_syllabus_index(xlsx_path).rows(day)
+            if row.vocab and row.hindi_meaning
+        ]
+
     except Exception as e:
         print(f"Error loading day vocab: {e}")
         return []
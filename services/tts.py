@@ -1,8 +1,13 @@
 # services/tts.py
 
 import os
+import json
+import time
 import uuid
 import shutil
+import hashlib
+import threading
+import unicodedata
 from gtts import gTTS
 
 EDGE_AVAILABLE = False
@@ -41,10 +46,136 @@ def _default_voice_name(gender: str = "Male", accent: str | None = None, voice_n
     return "en-US-JennyNeural" if g == "female" else "en-US-GuyNeural"
 
 
-def _out_dir() -> str:
-    out_dir = os.path.join("static", "tts")
-    os.makedirs(out_dir, exist_ok=True)
-    return out_dir
+def _lang_code(lang: str | None) -> str:
+    # language selection: 'english' => en, 'hinglish' => hi (closest)
+    lang_code = "en"
+    if isinstance(lang, str):
+        l = lang.lower()
+        if l.startswith("en"):
+            lang_code = "en"
+        elif "hinglish" in l or l.startswith("hi"):
+            lang_code = "hi"
+    return lang_code
+
+
+# ----------------------------
+# Content-addressed audio cache
+# ----------------------------
+TTS_CACHE_DIR = os.path.join("static", "tts", "cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024
+TTS_HTTP_MAX_AGE = 7 * 24 * 3600  # browsers may reuse a clip for a week
+_AUDIO_EXTS = (".mp3", ".wav")
+
+
+def normalize_tts_text(text: str) -> str:
+    """Collapse whitespace and unicode forms so equal sentences share one clip."""
+    return unicodedata.normalize("NFC", " ".join((text or "").split()))
+
+
+class TTSCache:
+    """
+    Audio clips stored as <root>/<engine>/<key[:2]>/<key>.<ext>, where key is
+    a sha1 of (normalized text, voice name, lang, engine). lang only counts for
+    engines that synthesize with it (LANG_ENGINES): Edge and pyttsx3 pick the
+    language from the voice, so their clips are shared by every lang. Least
+    recently used clips (by mtime, bumped on every hit) are evicted once the
+    cache grows past max_bytes.
+    """
+
+    def __init__(self, root: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES, sweep_interval: int = 300):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    LANG_ENGINES = ("gtts",)
+
+    @classmethod
+    def key(cls, text: str, voice: str | None, lang: str | None, engine: str) -> str:
+        if engine not in cls.LANG_ENGINES:
+            lang = None
+        payload = json.dumps([normalize_tts_text(text), voice or "", lang or "", engine], ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, engine: str, ext: str = ".mp3") -> str:
+        return os.path.join(self.root, engine, key[:2], key + ext)
+
+    def lookup(self, text: str, voice: str | None, lang: str | None, engine: str) -> str | None:
+        key = self.key(text, voice, lang, engine)
+        for ext in _AUDIO_EXTS:
+            path = self.path_for(key, engine, ext)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_size == 0:
+                continue
+            # Bump mtime for LRU, but at most once an hour per clip
+            if time.time() - st.st_mtime > 3600:
+                try:
+                    os.utime(path, None)
+                except OSError:
+                    pass
+            return path
+        return None
+
+    def temp_path(self, key: str, engine: str, ext: str) -> str:
+        final_dir = os.path.dirname(self.path_for(key, engine, ext))
+        os.makedirs(final_dir, exist_ok=True)
+        # Dot-prefixed so entries() skips it; keeps the real extension for ffmpeg
+        return os.path.join(final_dir, f".tmp-{key}-{uuid.uuid4().hex}{ext}")
+
+    def commit(self, tmp_path: str, key: str, engine: str, ext: str) -> str:
+        """Atomically move a finished temp file into its cache slot."""
+        final_path = self.path_for(key, engine, ext)
+        os.replace(tmp_path, final_path)
+        self.maybe_evict()
+        return final_path
+
+    def entries(self):
+        """Yield (mtime, size, path) for every cached clip."""
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith(".") or not name.endswith(_AUDIO_EXTS):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def evict(self, max_bytes: int | None = None) -> int:
+        """Delete least recently used clips until the cache fits; returns files removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            self._last_sweep = time.time()
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            if total <= limit:
+                return 0
+            # Evict down to 90% so we don't sweep again on the very next write
+            target = int(limit * 0.9)
+            removed = 0
+            for _mtime, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+        print(f"🧹 TTS cache evicted {removed} clips ({total // (1024 * 1024)} MB left)")
+        return removed
+
+    def maybe_evict(self):
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            self.evict()
+
+
+tts_cache = TTSCache()
 
 
 def _ffmpeg_path() -> str | None:
@@ -66,43 +197,39 @@ def _wav_to_mp3(wav_path: str, mp3_path: str) -> bool:
 
 def generate_tts(text: str, gender: str = "Male", lang: str | None = None, accent: str | None = None, voice_name: str | None = None, mode: str | None = None) -> str | None:
     """
-    Generate a temporary TTS file for given text.
-    Returns the relative file path (e.g., 'static/tts/xyz.mp3')
+    Return a cached TTS file for given text, synthesizing it on a cache miss.
+    Returns the relative file path (e.g., 'static/tts/cache/edge/ab/<sha1>.mp3')
     """
     print(f"🎵 TTS Generation started for: '{text[:30]}{'...' if len(text) > 30 else ''}'")
-    print(f"🎵 TTS Parameters: gender={gender}, lang={lang}, accent={accent}, voice_name={voice_name}, mode={mode}")
-    print(f"🎵 TTS Dependencies: EDGE_AVAILABLE={EDGE_AVAILABLE}, PYTTSX3_AVAILABLE={PYTTSX3_AVAILABLE}")
-    
+
     if not text or not text.strip():
         print("❌ TTS Error: Empty text provided")
         raise ValueError("Text cannot be empty for TTS generation.")
 
-    out_dir = _out_dir()
-    print(f"🎵 TTS Output directory: {out_dir}")
-
-    # Unique filename
-    uid = uuid.uuid4().hex
-    mp3_filename = f"tts_{uid}.mp3"
-    wav_filename = f"tts_{uid}.wav"
-    mp3_path = os.path.join(out_dir, mp3_filename)
-    wav_path = os.path.join(out_dir, wav_filename)
-    print(f"🎵 TTS Target files: MP3={mp3_path}, WAV={wav_path}")
+    lang_code = _lang_code(lang)
+    vn = _default_voice_name(gender, accent, voice_name)
 
-    # language selection: 'english' => en, 'hinglish' => hi (closest)
-    lang_code = "en"
-    if isinstance(lang, str):
-        l = lang.lower()
-        if l.startswith("en"):
-            lang_code = "en"
-        elif "hinglish" in l or l.startswith("hi"):
-            lang_code = "hi"
-    print(f"🎵 TTS Language code: {lang_code}")
-    
     # Prefer Edge online if available and not forced offline
     want_online = (mode or "auto").lower() != "offline"
     want_offline = (mode or "auto").lower() != "online"
-    print(f"🎵 TTS Mode preferences: want_online={want_online}, want_offline={want_offline}")
-    
+
+    # A cached clip from a fallback engine is only used when every engine
+    # ahead of it is unavailable or has just failed; otherwise one transient
+    # Edge failure would pin the gTTS/pyttsx3 clip for that text for good.
+    def cached_clip(engine: str, voice: str) -> str | None:
+        cached = tts_cache.lookup(text, voice, lang_code, engine)
+        if cached:
+            print(f"✅ TTS cache hit ({engine}): {cached}")
+        return cached
+
+    if want_online:
+        cached = cached_clip("edge", vn)
+        if cached:
+            return cached
+
+    print(f"🎵 TTS Parameters: gender={gender}, lang={lang}, accent={accent}, voice_name={voice_name}, mode={mode}")
+    print(f"🎵 TTS Dependencies: EDGE_AVAILABLE={EDGE_AVAILABLE}, PYTTSX3_AVAILABLE={PYTTSX3_AVAILABLE}")
+
     # Track attempted methods for error reporting
     attempted_methods = []
 
@@ -110,40 +237,42 @@ def generate_tts(text: str, gender: str = "Male", lang: str | None = None, accen
         print("🎵 Trying Edge TTS (online)...")
         attempted_methods.append("Edge TTS (online)")
         try:
-            vn = _default_voice_name(gender, accent, voice_name)
             print(f"🎵 Edge TTS voice: {vn}")
-            # Save via edge_tts directly to mp3
             import asyncio
-            async def _save():
-                comm = edge_tts.Communicate(text, voice=vn)
-                await comm.save(mp3_path)
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            loop.run_until_complete(_save())
-            loop.close()
-            if os.path.exists(mp3_path):
+            try:
+                mp3_path = loop.run_until_complete(render_edge_clip(text, vn, lang_code))
+            finally:
+                loop.close()
+            if mp3_path:
                 print(f"✅ Edge TTS Success: {mp3_path}")
                 return mp3_path
             else:
                 print("❌ Edge TTS failed: File not created")
         except Exception as e:
             print(f"❌ Edge TTS Exception: {str(e)}")
-            pass
+
+    if want_offline:
+        cached = cached_clip("pyttsx3", vn)
+        if cached:
+            return cached
 
     if want_offline and PYTTSX3_AVAILABLE:
         print("🎵 Trying pyttsx3 TTS (offline)...")
         attempted_methods.append("pyttsx3 TTS (offline)")
+        key = tts_cache.key(text, vn, lang_code, "pyttsx3")
+        wav_path = tts_cache.temp_path(key, "pyttsx3", ".wav")
+        mp3_path = tts_cache.temp_path(key, "pyttsx3", ".mp3")
         try:
             engine = pyttsx3.init()
             print("🎵 pyttsx3 engine initialized")
             # Try mapping for SAPI voices by name fragment
-            target_name = _default_voice_name(gender, accent, voice_name)
+            target_name = vn
             print(f"🎵 pyttsx3 target voice: {target_name}")
-            print(f"🎵 pyttsx3 processing text: '{text[:50]}{'...' if len(text) > 50 else ''}'")
             try:
                 # Some engines allow selecting by name; otherwise keep default
                 voices = engine.getProperty('voices')
-                print(f"🎵 pyttsx3 available voices: {len(voices) if voices else 0}")
                 for v in voices or []:
                     if isinstance(target_name, str) and v.name and target_name.split('-')[-1].lower() in v.name.lower():
                         engine.setProperty('voice', v.id)
@@ -153,11 +282,8 @@ def generate_tts(text: str, gender: str = "Male", lang: str | None = None, accen
                 print(f"⚠️ pyttsx3 voice selection error: {ve}")
                 pass
             engine.setProperty('rate', 170)
-            print(f"🎵 pyttsx3 saving to: {wav_path}")
             # Ensure text is properly encoded for pyttsx3
             clean_text = text.encode('ascii', 'ignore').decode('ascii') if any(ord(c) > 127 for c in text) else text
-            if clean_text != text:
-                print(f"🎵 pyttsx3 text cleaned for ASCII compatibility")
             engine.save_to_file(clean_text, wav_path)
             engine.runAndWait()
             engine.stop()
@@ -165,34 +291,42 @@ def generate_tts(text: str, gender: str = "Male", lang: str | None = None, accen
                 print(f"✅ pyttsx3 WAV created: {wav_path}")
                 # Try to convert to mp3 if ffmpeg available
                 if _wav_to_mp3(wav_path, mp3_path):
+                    _discard(wav_path)
+                    mp3_path = tts_cache.commit(mp3_path, key, "pyttsx3", ".mp3")
                     print(f"✅ pyttsx3 converted to MP3: {mp3_path}")
-                    try: os.remove(wav_path)
-                    except Exception: pass
                     return mp3_path
+                wav_path = tts_cache.commit(wav_path, key, "pyttsx3", ".wav")
                 print(f"✅ pyttsx3 returning WAV: {wav_path}")
                 return wav_path
             else:
                 print("❌ pyttsx3 failed: WAV file not created")
         except Exception as e:
             print(f"❌ pyttsx3 Exception: {str(e)}")
-            pass
+            _discard(wav_path)
+            _discard(mp3_path)
+
+    cached = cached_clip("gtts", "")
+    if cached:
+        return cached
 
     # Fallback: gTTS (online google) - with error handling
     print("🎵 Trying Google TTS (online fallback)...")
     attempted_methods.append("Google TTS (online fallback)")
+    key = tts_cache.key(text, "", lang_code, "gtts")
+    mp3_path = tts_cache.temp_path(key, "gtts", ".mp3")
     try:
         tts = gTTS(text=text, lang=lang_code)
         print(f"🎵 Google TTS object created with lang: {lang_code}")
         tts.save(mp3_path)
-        print(f"🎵 Google TTS saved to: {mp3_path}")
         if os.path.exists(mp3_path):
+            mp3_path = tts_cache.commit(mp3_path, key, "gtts", ".mp3")
             print(f"✅ Google TTS Success: {mp3_path}")
             return mp3_path
         else:
             print("❌ Google TTS failed: File not created")
     except Exception as e:
         print(f"❌ Google TTS Exception: {e}")
-        pass
+        _discard(mp3_path)
 
     # Enhanced error reporting
     error_msg = f"TTS generation failed. Attempted methods: {', '.join(attempted_methods)}"
@@ -207,24 +341,61 @@ def generate_tts(text: str, gender: str = "Male", lang: str | None = None, accen
     raise RuntimeError(error_msg)
 
 
+async def render_edge_clip(text: str, voice_name: str, lang_code: str = "en") -> str | None:
+    """
+    Cache-aware Edge synthesis usable from any event loop; returns the cached
+    path (existing or freshly written) or None if edge_tts produced nothing.
+    """
+    cached = tts_cache.lookup(text, voice_name, lang_code, "edge")
+    if cached:
+        return cached
+    key = tts_cache.key(text, voice_name, lang_code, "edge")
+    mp3_path = tts_cache.temp_path(key, "edge", ".mp3")
+    try:
+        # Save via edge_tts directly to mp3
+        comm = edge_tts.Communicate(text, voice=voice_name)
+        await comm.save(mp3_path)
+        if not os.path.exists(mp3_path):
+            return None
+        return tts_cache.commit(mp3_path, key, "edge", ".mp3")
+    except BaseException:
+        _discard(mp3_path)
+        raise
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
 # ----------------------------
 # Cleanup old TTS files
 # ----------------------------
-def cleanup_tts(older_than_seconds: int = 3600):
+def cleanup_tts(older_than_seconds: int = 3600, max_bytes: int | None = None):
     """
-    Delete temporary TTS files older than X seconds.
-    By default, deletes files older than 1 hour.
+    Bound the TTS cache (LRU by size) and delete legacy tts_<uuid> files
+    written before the cache existed, once they are older than X seconds.
     """
+    tts_cache.evict(max_bytes)
+
     out_dir = os.path.join("static", "tts")
     if not os.path.exists(out_dir):
         return
 
-    import time
     now = time.time()
 
+    # Temp files left behind by interrupted syntheses
+    for dirpath, _dirnames, filenames in os.walk(tts_cache.root):
+        for f in filenames:
+            fpath = os.path.join(dirpath, f)
+            if f.startswith(".tmp-") and now - os.path.getmtime(fpath) > older_than_seconds:
+                _discard(fpath)
+
     for f in os.listdir(out_dir):
         fpath = os.path.join(out_dir, f)
-        if os.path.isfile(fpath) and f.startswith("tts_") and f.endswith(".mp3"):
+        if os.path.isfile(fpath) and f.startswith("tts_") and f.endswith(_AUDIO_EXTS):
             if now - os.path.getmtime(fpath) > older_than_seconds:
                 try:
                     os.remove(fpath)
@@ -0,0 +1,141 @@
+# services/tts_prerender.py
+"""
+Pre-render syllabus statements into the TTS cache so /tts becomes a plain
+file read. Every clip is looked up in the content-addressed cache first, so
+an interrupted run simply resumes where it stopped.
+
+Usage:
+    python -m services.tts_prerender --days 1-30 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from services.syllabus import load_day_statements
+from services.tts import (
+    EDGE_AVAILABLE,
+    _default_voice_name,
+    _lang_code,
+    generate_tts,
+    render_edge_clip,
+    tts_cache,
+)
+
+DATA_SYLLABUS = "data/syllabus/english_spoken_syllabus_filled_ai.xlsx"
+
+# User.voice / User.gender values x the accents the frontend offers
+GENDERS = ("Male", "Female")
+ACCENTS = ("indian", "en-US")
+LANGS = ("english", "hinglish")
+
+# Voice names the frontend sends explicitly (static/js/guide.js mapToMsVoice)
+CLIENT_VOICE_NAMES = {
+    ("Male", "indian"): "hi-IN-PrabhatNeural",
+    ("Female", "indian"): "en-IN-KavyaNeural",
+    ("Male", "en-US"): "en-US-GuyNeural",
+    ("Female", "en-US"): "en-US-JennyNeural",
+}
+
+
+def voice_combinations(genders=GENDERS, accents=ACCENTS, langs=LANGS) -> list[tuple[str, str]]:
+    """Distinct (voice_name, lang_code) pairs a learner can end up requesting."""
+    combos = []
+    for gender in genders:
+        for accent in accents:
+            names = [_default_voice_name(gender, accent), CLIENT_VOICE_NAMES.get((gender, accent))]
+            for name in names:
+                for lang in langs:
+                    combo = (name, _lang_code(lang))
+                    if name and combo not in combos:
+                        combos.append(combo)
+    return combos
+
+
+def parse_day_range(spec: str) -> list[int]:
+    """'1-5,8,10-12' -> [1, 2, 3, 4, 5, 8, 10, 11, 12]"""
+    days = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            days.extend(range(int(lo), int(hi) + 1))
+        else:
+            days.append(int(part))
+    return sorted(set(days))
+
+
+async def _render_one(text, voice_name, lang_code, semaphore, stats):
+    if tts_cache.lookup(text, voice_name, lang_code, "edge"):
+        stats["cached"] += 1
+        return
+    async with semaphore:
+        try:
+            if EDGE_AVAILABLE:
+                path = await render_edge_clip(text, voice_name, lang_code)
+            else:
+                # No edge_tts here: go through the normal engine chain in a thread
+                path = await asyncio.to_thread(generate_tts, text, lang=lang_code, voice_name=voice_name)
+            stats["rendered" if path else "failed"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"❌ Prerender failed [{voice_name}/{lang_code}] '{text[:40]}': {e}")
+
+
+async def prerender_days(days, xlsx_path=DATA_SYLLABUS, combos=None, concurrency: int = 4) -> dict:
+    """Render every statement of every day for every voice combination."""
+    combos = combos or voice_combinations()
+    if EDGE_AVAILABLE:
+        # Edge clips do not depend on lang (see TTSCache.key): render each voice once
+        by_voice = {}
+        for voice_name, lang_code in combos:
+            by_voice.setdefault(voice_name, (voice_name, lang_code))
+        combos = list(by_voice.values())
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    stats = {"cached": 0, "rendered": 0, "failed": 0}
+    started = time.time()
+
+    for i, day in enumerate(days, 1):
+        statements = load_day_statements(xlsx_path, str(day))
+        texts = list(dict.fromkeys(s["text"] for s in statements if s.get("text")))
+        await asyncio.gather(*(
+            _render_one(text, voice_name, lang_code, semaphore, stats)
+            for text in texts
+            for voice_name, lang_code in combos
+        ))
+        elapsed = time.time() - started
+        eta = elapsed / i * (len(days) - i)
+        print(f"🎵 Prerender [{i}/{len(days)}] Day-{day}: {len(texts)} statements x {len(combos)} voices "
+              f"| rendered={stats['rendered']} cached={stats['cached']} failed={stats['failed']} "
+              f"| {elapsed:.0f}s elapsed, ~{eta:.0f}s left")
+
+    print(f"✅ Prerender complete: {stats}")
+    return stats
+
+
+def start_prerender_thread(days, **kwargs) -> threading.Thread:
+    """Run prerender_days in a daemon thread (e.g. from app startup)."""
+    thread = threading.Thread(target=lambda: asyncio.run(prerender_days(days, **kwargs)), daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render syllabus TTS audio into the cache")
+    parser.add_argument("--days", default="1-90", help="Day range, e.g. '1-30' or '1,2,5-7'")
+    parser.add_argument("--syllabus", default=DATA_SYLLABUS, help="Syllabus workbook path")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel Edge TTS requests")
+    parser.add_argument("--gender", choices=GENDERS, action="append", help="Limit to a voice gender (repeatable)")
+    parser.add_argument("--accent", choices=ACCENTS, action="append", help="Limit to an accent (repeatable)")
+    parser.add_argument("--lang", choices=LANGS, action="append", help="Limit to a language (repeatable)")
+    args = parser.parse_args()
+
+    combos = voice_combinations(args.gender or GENDERS, args.accent or ACCENTS, args.lang or LANGS)
+    asyncio.run(prerender_days(parse_day_range(args.days), args.syllabus, combos, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
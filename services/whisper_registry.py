@@ -0,0 +1,65 @@
+# services/whisper_registry.py
+"""
+Process-wide registry of faster-whisper models.
+
+Every transcription path (services.stt, app.py, core.ai_feedback,
+core.speech_utils) asks this module for its model, so a process holds one
+copy of the weights per (size, compute_type) instead of one per caller.
+
+Environment:
+    WHISPER_CPU_THREADS   threads per model (0 = CTranslate2 default)
+    WHISPER_NUM_WORKERS   parallel transcribe() calls a model accepts
+    WHISPER_PRELOAD       models to load at startup, e.g. "base" or "base:int8,small"
+"""
+
+import os
+import threading
+
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "")
+DEFAULT_SIZE = "base"
+DEFAULT_COMPUTE_TYPE = "int8"
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_whisper_model(size: str = DEFAULT_SIZE, compute_type: str = DEFAULT_COMPUTE_TYPE):
+    """Shared WhisperModel for (size, compute_type), loaded on first use."""
+    key = (size, compute_type)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            from faster_whisper import WhisperModel
+            print(f"⏳ Loading Whisper model ({size}, {compute_type}) ...")
+            model = WhisperModel(
+                size,
+                device="cpu",
+                compute_type=compute_type,
+                cpu_threads=WHISPER_CPU_THREADS,
+                num_workers=WHISPER_NUM_WORKERS,
+            )
+            _models[key] = model
+            print(f"✅ Whisper model loaded ({size}, {compute_type})")
+    return model
+
+
+def preload_models(spec: str | None = None) -> list[tuple[str, str]]:
+    """Load models listed as 'size[:compute_type],...' (defaults to WHISPER_PRELOAD)."""
+    loaded = []
+    for item in (spec if spec is not None else WHISPER_PRELOAD).split(","):
+        item = item.strip()
+        if not item:
+            continue
+        size, _, compute_type = item.partition(":")
+        get_whisper_model(size, compute_type or DEFAULT_COMPUTE_TYPE)
+        loaded.append((size, compute_type or DEFAULT_COMPUTE_TYPE))
+    return loaded
+
+
+def loaded_models() -> list[tuple[str, str]]:
+    return list(_models)
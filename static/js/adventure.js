@@ -1,14 +1,14 @@
 ﻿const vocabWords = [
-    { word: "apple", image: "/static/images/apple.png" },
-    { word: "dog", image: "/static/images/dog.png" },
-    { word: "cat", image: "/static/images/cat.png" },
-    { word: "ball", image: "/static/images/ball.png" },
-    { word: "book", image: "/static/images/book.png" },
-    { word: "car", image: "/static/images/car.png" },
-    { word: "chair", image: "/static/images/chair.png" },
-    { word: "banana", image: "/static/images/banana.png" },
-    { word: "tree", image: "/static/images/tree.png" },
-    { word: "house", image: "/static/images/house.png" }
+    { word: "apple", image: "/static/images/apple.png?w=160" },
+    { word: "dog", image: "/static/images/dog.png?w=160" },
+    { word: "cat", image: "/static/images/cat.png?w=160" },
+    { word: "ball", image: "/static/images/ball.png?w=160" },
+    { word: "book", image: "/static/images/book.png?w=160" },
+    { word: "car", image: "/static/images/car.png?w=160" },
+    { word: "chair", image: "/static/images/chair.png?w=160" },
+    { word: "banana", image: "/static/images/banana.png?w=160" },
+    { word: "tree", image: "/static/images/tree.png?w=160" },
+    { word: "house", image: "/static/images/house.png?w=160" }
 ];
 
 let score = 0;
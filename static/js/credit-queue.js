@@ -0,0 +1,124 @@
+// -------------------------
+// Credit event queue
+// -------------------------
+// Listen/speak credits are buffered here and posted to /api/credits/batch
+// every few seconds instead of one request (and one DB commit) per
+// sentence. Whatever is still queued when the page is hidden goes out with
+// sendBeacon. Events are kept in localStorage until the server confirms
+// them; every event has an id, so a re-sent event is only counted once.
+// The stored queue is per learner (CREDIT_QUEUE_USER, set by the page), so
+// on a shared device one learner's leftovers are never posted as another's.
+const CreditQueue = (function () {
+    const ENDPOINT = "/api/credits/batch";
+    const LEGACY_STORAGE_KEY = "boony_credit_queue";
+    const USER_ID = typeof CREDIT_QUEUE_USER !== "undefined" ? String(CREDIT_QUEUE_USER) : "";
+    const STORAGE_KEY = USER_ID ? `${LEGACY_STORAGE_KEY}:${USER_ID}` : null;
+    const FLUSH_INTERVAL_MS = 5000;
+    const MAX_BATCH = 50;
+
+    let queue = loadQueue();
+    let inFlight = false;
+    const listeners = [];
+
+    function loadQueue() {
+        try {
+            // Shared by everyone on this browser and of unknown owner: drop it
+            localStorage.removeItem(LEGACY_STORAGE_KEY);
+            return STORAGE_KEY ? JSON.parse(localStorage.getItem(STORAGE_KEY) || "[]") : [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function saveQueue() {
+        if (!STORAGE_KEY) return;
+        try {
+            localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+        } catch (e) {
+            // Storage full or disabled: the in-memory queue still flushes
+        }
+    }
+
+    function newEventId() {
+        if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+    }
+
+    // event: { day, activity, delta, statement_index }
+    function add(event) {
+        queue.push({
+            id: newEventId(),
+            day: event.day,
+            activity: event.activity,
+            delta: event.delta ?? 1,
+            statement_index: event.statement_index ?? null,
+            client_ts: Date.now()
+        });
+        saveQueue();
+    }
+
+    function acknowledge(batch) {
+        const sent = new Set(batch.map(e => e.id));
+        queue = queue.filter(e => !sent.has(e.id));
+        saveQueue();
+    }
+
+    async function flush() {
+        if (inFlight || queue.length === 0) return;
+        inFlight = true;
+        const batch = queue.slice(0, MAX_BATCH);
+        try {
+            const res = await fetch(ENDPOINT, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ events: batch }),
+                keepalive: true
+            });
+            if (res.ok) {
+                const data = await res.json();
+                // Rejected events (bad day/activity/delta) were skipped; the rest were applied
+                if (data.rejected && data.rejected.length) {
+                    console.warn("Credit events rejected:", data.rejected);
+                }
+                acknowledge(batch);
+                listeners.forEach(cb => cb(data.totals || {}));
+            } else if (res.status === 400) {
+                // The batch itself was malformed (not a list, too long): retrying cannot help
+                console.warn("Credit batch rejected:", await res.text());
+                acknowledge(batch);
+            }
+        } catch (e) {
+            // Offline or server down: keep the events for the next flush
+        } finally {
+            inFlight = false;
+        }
+        if (queue.length >= MAX_BATCH) flush();
+    }
+
+    // Page is going away: hand everything to the browser. Events stay queued
+    // until a later fetch confirms them; the server ignores the repeat.
+    function flushOnHide() {
+        if (queue.length === 0 || !navigator.sendBeacon) {
+            flush();
+            return;
+        }
+        for (let i = 0; i < queue.length; i += MAX_BATCH) {
+            const body = JSON.stringify({ events: queue.slice(i, i + MAX_BATCH) });
+            navigator.sendBeacon(ENDPOINT, new Blob([body], { type: "application/json" }));
+        }
+    }
+
+    // cb(totals) with { day: { listen, speak, ... } } after each confirmed flush
+    function onTotals(cb) {
+        listeners.push(cb);
+    }
+
+    setInterval(flush, FLUSH_INTERVAL_MS);
+    document.addEventListener("visibilitychange", () => {
+        if (document.visibilityState === "hidden") flushOnHide();
+    });
+    window.addEventListener("pagehide", flushOnHide);
+    if (queue.length) setTimeout(flush, 1000);  // leftovers from an earlier visit
+
+    return { add, flush, onTotals };
+})();
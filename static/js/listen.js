@@ -156,14 +156,12 @@ function addCredits(statementIndex) {
     let newCredit = parseInt(creditsEl.innerText || 0) + 1;
     creditsEl.innerText = newCredit;
 
-    fetch("/api/update-credit", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-            day: CURRENT_DAY,
-            value: 1,
-            statement_index: statementIndex
-        })
+    // Buffered; sent to /api/credits/batch in the background
+    CreditQueue.add({
+        day: CURRENT_DAY,
+        activity: "listen",
+        delta: 1,
+        statement_index: statementIndex
     });
 }
 
@@ -208,10 +208,11 @@ function addCredit() {
     currentCredits += 1;
     creditsEl.innerText = currentCredits;
 
-    // server update
-    fetch("/update_credits", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ credits: currentCredits, sentence_index: selectedIndex })
+    // server update (buffered; sent to /api/credits/batch in the background)
+    CreditQueue.add({
+        day: CURRENT_DAY,
+        activity: "speak",
+        delta: 1,
+        statement_index: selectedIndex
     });
 }